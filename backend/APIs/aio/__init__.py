@@ -0,0 +1,44 @@
+# backend/APIs/aio/__init__.py
+# Async counterparts of the routers in APIs/, used when USE_ASYNC_DB=true.
+#
+# Each async route runs the SAME sync handler through AsyncSession.run_sync, so the business
+# logic lives in one place. The handler's SQL goes through the async driver (psycopg 3), and the
+# event loop keeps serving other requests while this one waits on Postgres. Handlers that block
+# on anything else (the cart store) are run in a worker thread instead, see run_in_thread.
+from pydantic import TypeAdapter
+from fastapi import Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import SessionLocal
+
+
+async def run_endpoint(db: AsyncSession, endpoint, response_model=None, **kwargs):
+    """
+    Awaits the sync `endpoint(db=<sync session>, **kwargs)`.
+    When `response_model` is given, the result is serialized inside the session so
+    relationships (e.g. Product.category) load there, not lazily after the await.
+    A ready-made Response (e.g. an idempotent replay) is passed through as it is.
+    """
+    def call(sync_db):
+        result = endpoint(db=sync_db, **kwargs)
+        if response_model is not None and not isinstance(result, Response):
+            result = TypeAdapter(response_model).validate_python(result, from_attributes=True)
+        return result
+
+    return await db.run_sync(call)
+
+
+async def run_in_thread(endpoint, **kwargs):
+    """
+    Awaits the sync `endpoint(db=<sync session>, **kwargs)` in a worker thread, with a session of
+    its own from the sync engine. For handlers that block on something besides SQL (the cart
+    store's lock and Redis calls): under run_sync they would stall the whole event loop.
+    """
+    def call():
+        db = SessionLocal()
+        try:
+            return endpoint(db=db, **kwargs)
+        finally:
+            db.close()
+
+    return await run_in_threadpool(call)
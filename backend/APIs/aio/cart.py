@@ -0,0 +1,29 @@
+# backend/APIs/aio/cart.py
+from fastapi import APIRouter, Depends
+from APIs import cart
+from APIs.cart import CartItemRequest, get_current_user
+from APIs.aio import run_in_thread
+
+router = APIRouter(
+    prefix="/cart",
+    tags=["Cart Management"]
+)
+
+# The cart store blocks (its lock, Redis round trips) and touches Postgres only to read a cart
+# through, so these handlers run in worker threads rather than on the event loop
+
+@router.post("/add")
+async def add_to_cart(item: CartItemRequest, user_id: int = Depends(get_current_user)):
+    return await run_in_thread(cart.add_to_cart, item=item, user_id=user_id)
+
+@router.get("/")
+async def view_cart(user_id: int = Depends(get_current_user)):
+    return await run_in_thread(cart.view_cart, user_id=user_id)
+
+@router.put("/update")
+async def update_cart_item(item: CartItemRequest, user_id: int = Depends(get_current_user)):
+    return await run_in_thread(cart.update_cart_item, item=item, user_id=user_id)
+
+@router.delete("/remove/{product_id}")
+async def remove_from_cart(product_id: int, user_id: int = Depends(get_current_user)):
+    return await run_in_thread(cart.remove_from_cart, product_id=product_id, user_id=user_id)
@@ -0,0 +1,62 @@
+# backend/APIs/aio/orders.py
+from fastapi import APIRouter, Depends, Header, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from database import get_async_db, get_async_read_db
+from APIs import orders
+from APIs.cart import get_current_user
+from APIs.aio import run_endpoint, run_in_thread
+from services.cart_store import get_cart_store
+
+router = APIRouter(
+    prefix="/orders",
+    tags=["Orders Management"]
+)
+
+@router.post("/checkout")
+async def process_checkout(
+    delivery: Optional[orders.DeliveryRequest] = None,
+    db: AsyncSession = Depends(get_async_db),
+    user_id: int = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None)
+):
+    # Same steps as orders.process_checkout, but the cart store blocks: it runs in worker threads,
+    # and only the order itself goes through the async session
+    store = get_cart_store()
+    await run_in_thread(store.flush, user_ids=[user_id])
+    result, ordered = await run_endpoint(
+        db, orders.place_order, user_id=user_id, delivery=delivery, idempotency_key=idempotency_key
+    )
+    await run_in_threadpool(store.consume, user_id, ordered)
+    return result
+
+@router.get("/", response_model=List[orders.OrderListItem])
+async def read_orders(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    status: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+    user_id: int = Depends(get_current_user)
+):
+    return await run_endpoint(
+        db, orders.read_orders, List[orders.OrderListItem],
+        response=response, cursor=cursor, limit=limit, status=status, user_id=user_id
+    )
+
+@router.get("/{order_id}", response_model=orders.OrderDetail)
+async def read_order(order_id: int, db: AsyncSession = Depends(get_async_read_db), user_id: int = Depends(get_current_user)):
+    return await run_endpoint(db, orders.read_order, orders.OrderDetail, order_id=order_id, user_id=user_id)
+
+@router.post("/status", response_model=orders.BulkStatusResult)
+async def update_order_statuses(update: orders.BulkStatusUpdate, db: AsyncSession = Depends(get_async_db)):
+    return await run_endpoint(db, orders.update_order_statuses, update=update)
+
+@router.post("/fulfilment/claim", response_model=List[orders.OrderDetail])
+async def claim_fulfilment_work(claim: orders.ClaimRequest, db: AsyncSession = Depends(get_async_db)):
+    return await run_endpoint(db, orders.claim_fulfilment_work, List[orders.OrderDetail], claim=claim)
+
+@router.post("/{order_id}/status", response_model=orders.OrderDetail)
+async def update_order_status(order_id: int, update: orders.StatusUpdate, db: AsyncSession = Depends(get_async_db)):
+    return await run_endpoint(db, orders.update_order_status, orders.OrderDetail, order_id=order_id, update=update)
@@ -0,0 +1,108 @@
+# backend/APIs/aio/routers.py
+from fastapi import APIRouter, Depends, Header, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime
+from database import get_async_db, get_async_read_db
+from APIs import routers
+from APIs.aio import run_endpoint
+import schemas
+
+router = APIRouter(
+    prefix="/api",
+    tags=["Inventory Management"]
+)
+
+# --- Categories ---
+@router.get("/categories/", response_model=List[schemas.Category])
+async def read_categories(request: Request, skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_read_db)):
+    # The sync handler already returns a serialized (possibly cached) Response
+    return await run_endpoint(db, routers.read_categories, request=request, skip=skip, limit=limit)
+
+@router.post("/categories/", response_model=schemas.Category, status_code=status.HTTP_201_CREATED)
+async def create_category(category: schemas.CategoryCreate, db: AsyncSession = Depends(get_async_db)):
+    return await run_endpoint(db, routers.create_category, schemas.Category, category=category)
+
+# --- Products ---
+@router.get("/products/", response_model=List[schemas.Product])
+async def read_products(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    categoryId: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    return await run_endpoint(
+        db, routers.read_products,
+        request=request, cursor=cursor, limit=limit, categoryId=categoryId
+    )
+
+@router.post("/products/", response_model=schemas.Product, status_code=status.HTTP_201_CREATED)
+async def create_product(product: schemas.ProductCreate, db: AsyncSession = Depends(get_async_db)):
+    return await run_endpoint(db, routers.create_product, schemas.Product, product=product)
+
+@router.put("/products/{product_id}", response_model=schemas.Product)
+async def update_product(product_id: int, product: schemas.ProductUpdate, db: AsyncSession = Depends(get_async_db)):
+    return await run_endpoint(db, routers.update_product, schemas.Product, product_id=product_id, product=product)
+
+@router.delete("/products/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_product(product_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await run_endpoint(db, routers.delete_product, product_id=product_id)
+
+# --- Batches ---
+@router.get("/batches/", response_model=List[schemas.StockBatch])
+async def read_batches(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    productId: Optional[int] = None,
+    expiresBefore: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await run_endpoint(
+        db, routers.read_batches, List[schemas.StockBatch],
+        response=response, cursor=cursor, limit=limit, productId=productId, expiresBefore=expiresBefore
+    )
+
+@router.post("/batches/", response_model=schemas.StockBatch, status_code=status.HTTP_201_CREATED)
+async def create_batch(batch: schemas.StockBatchCreate, db: AsyncSession = Depends(get_async_db)):
+    return await run_endpoint(db, routers.create_batch, schemas.StockBatch, batch=batch)
+
+# --- Transactions ---
+@router.get("/transactions/", response_model=List[schemas.StockTransaction])
+async def read_transactions(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    batchId: Optional[int] = None,
+    transactionType: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    return await run_endpoint(
+        db, routers.read_transactions, List[schemas.StockTransaction],
+        response=response, cursor=cursor, limit=limit, batchId=batchId,
+        transactionType=transactionType, since=since, until=until
+    )
+
+@router.post("/transactions/", response_model=schemas.StockTransaction, status_code=status.HTTP_201_CREATED)
+async def create_transaction(
+    transaction: schemas.StockTransactionCreate,
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: Optional[str] = Header(None)
+):
+    return await run_endpoint(
+        db, routers.create_transaction, schemas.StockTransaction, transaction=transaction, idempotency_key=idempotency_key
+    )
+
+@router.put("/transactions/{transaction_id}", response_model=schemas.StockTransaction)
+async def update_transaction(transaction_id: int, transaction_update: schemas.StockTransactionUpdate, db: AsyncSession = Depends(get_async_db)):
+    return await run_endpoint(
+        db, routers.update_transaction, schemas.StockTransaction,
+        transaction_id=transaction_id, transaction_update=transaction_update
+    )
+
+@router.delete("/transactions/{transaction_id}", status_code=status.HTTP_405_METHOD_NOT_ALLOWED)
+async def delete_transaction(transaction_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await run_endpoint(db, routers.delete_transaction, transaction_id=transaction_id)
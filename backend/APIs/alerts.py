@@ -0,0 +1,165 @@
+# backend/APIs/alerts.py
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from database import get_db, dialect_insert
+from models.alert import ReorderThreshold
+from models.product import Product
+from services.alerts import MARKDOWN_DAYS, alert_engine, get_alert_engine
+from services.stock_levels import refresh_stock_levels
+
+router = APIRouter(
+    prefix="/api/alerts",
+    tags=["Alerts"]
+)
+
+class ReorderAlert(BaseModel):
+    productId: int
+    onHand: int
+    reorderPoint: int
+    reorderQuantity: int
+    suggestedQuantity: int
+    dailyDemand: float
+    daysOfCover: Optional[float] = None
+    thresholdSource: str  # "threshold" (set by purchasing) or "forecast"
+
+class ExpiryAlert(BaseModel):
+    batchId: int
+    productId: int
+    expiryDate: datetime
+    quantity: int
+    daysLeft: float
+    expired: bool
+
+class MarkdownCandidate(BaseModel):
+    batchId: int
+    productId: int
+    expiryDate: datetime
+    quantity: int
+    projectedUnsold: int
+    daysLeft: float
+    suggestedDiscountPercent: Optional[int] = None
+
+class AlertOverview(BaseModel):
+    reorderCount: int
+    expiringCount: int
+    markdownCount: int
+    reorder: List[ReorderAlert]
+    expiring: List[ExpiryAlert]
+    markdowns: List[MarkdownCandidate]
+
+class ThresholdUpdate(BaseModel):
+    reorderPoint: int = Field(ge=0)
+    reorderQuantity: int = Field(gt=0)
+
+class Threshold(ThresholdUpdate):
+    productId: int
+    source: str
+
+def _page(response: Response, result):
+    total, items = result
+    response.headers["X-Total-Count"] = str(total)
+    return items
+
+@router.get("", response_model=AlertOverview)
+def read_alerts(
+    withinDays: float = Query(MARKDOWN_DAYS, ge=0, le=365),
+    limit: int = Query(20, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """
+    Dashboard view: the most urgent alerts of each kind with their totals.
+    """
+    engine = get_alert_engine(db)
+    reorder_count, reorder = engine.reorder_alerts(0, limit)
+    expiring_count, expiring = engine.expiring(withinDays, 0, limit)
+    markdown_count, markdowns = engine.markdowns(withinDays, 0, limit)
+    return AlertOverview(
+        reorderCount=reorder_count, expiringCount=expiring_count, markdownCount=markdown_count,
+        reorder=reorder, expiring=expiring, markdowns=markdowns,
+    )
+
+@router.get("/reorder", response_model=List[ReorderAlert])
+def read_reorder_alerts(
+    response: Response,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=5000),
+    db: Session = Depends(get_db)
+):
+    """
+    Products at or below their reorder point, emptiest first, with a suggested order quantity
+    that tops stock up to reorderPoint + reorderQuantity. The total is in X-Total-Count.
+    """
+    return _page(response, get_alert_engine(db).reorder_alerts(offset, limit))
+
+@router.get("/expiring", response_model=List[ExpiryAlert])
+def read_expiry_alerts(
+    response: Response,
+    withinDays: float = Query(7, ge=0, le=365),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=5000),
+    db: Session = Depends(get_db)
+):
+    """
+    Non-empty batches already expired (still to be written off) or expiring within `withinDays`, soonest first.
+    """
+    return _page(response, get_alert_engine(db).expiring(withinDays, offset, limit))
+
+@router.get("/markdowns", response_model=List[MarkdownCandidate])
+def read_markdown_candidates(
+    response: Response,
+    withinDays: float = Query(MARKDOWN_DAYS, ge=0, le=365),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=5000),
+    db: Session = Depends(get_db)
+):
+    """
+    Batches expiring within `withinDays` that forecast demand will not sell through in time.
+    """
+    return _page(response, get_alert_engine(db).markdowns(withinDays, offset, limit))
+
+@router.get("/thresholds/{product_id}", response_model=Threshold)
+def read_threshold(product_id: int, db: Session = Depends(get_db)):
+    threshold = get_alert_engine(db).threshold(product_id)
+    if threshold is None:
+        if db.get(Product, product_id) is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        raise HTTPException(status_code=404, detail="No reorder threshold or demand forecast for this product")
+    point, quantity, source = threshold
+    return Threshold(productId=product_id, reorderPoint=point, reorderQuantity=quantity, source=source)
+
+@router.put("/thresholds/{product_id}", response_model=Threshold)
+def set_threshold(product_id: int, threshold: ThresholdUpdate, db: Session = Depends(get_db)):
+    if db.get(Product, product_id) is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    values = dict(threshold.model_dump(), updatedAt=datetime.now(timezone.utc))
+    stmt = dialect_insert(db, ReorderThreshold).values(productId=product_id, **values)
+    db.execute(stmt.on_conflict_do_update(index_elements=[ReorderThreshold.productId], set_=values))
+    db.commit()
+    alert_engine.notify(product_ids=[product_id])
+    get_alert_engine(db)
+    return Threshold(productId=product_id, source="threshold", **threshold.model_dump())
+
+@router.delete("/thresholds/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_threshold(product_id: int, db: Session = Depends(get_db)):
+    """
+    Back to the forecast-derived threshold.
+    """
+    db.query(ReorderThreshold).filter(ReorderThreshold.productId == product_id).delete()
+    # A deleted row leaves no updatedAt for other workers to poll; stamp the product's stock level
+    # instead (this process's engine hears of it through the commit hook)
+    refresh_stock_levels(db, product_ids=[product_id])
+    db.commit()
+    get_alert_engine(db)
+    return None
+
+@router.post("/rebuild")
+def rebuild_alerts(db: Session = Depends(get_db)):
+    """
+    Reloads this worker's alert engine from the database (normally only done every ALERT_REBUILD_SECONDS).
+    """
+    engine = get_alert_engine(db)
+    engine.rebuild(db)
+    return engine.stats()
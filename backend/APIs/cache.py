@@ -0,0 +1,35 @@
+# backend/APIs/cache.py
+from fastapi import APIRouter, status
+from pydantic import BaseModel
+from typing import Optional
+from services.cache import catalog_cache
+
+router = APIRouter(
+    prefix="/api/cache",
+    tags=["Cache"]
+)
+
+class CacheStats(BaseModel):
+    size: int
+    maxEntries: int
+    ttlSeconds: float
+    hits: int
+    misses: int
+    hitRatio: Optional[float] = None
+    evictions: int
+    expirations: int
+    invalidations: int
+
+@router.get("/catalog", response_model=CacheStats)
+def read_catalog_cache_stats():
+    """
+    Counters for this worker's catalog cache. A steady eviction count with a low hit ratio
+    means CATALOG_CACHE_SIZE is too small for the number of distinct pages being read.
+    """
+    return catalog_cache.stats()
+
+@router.delete("/catalog", status_code=status.HTTP_204_NO_CONTENT)
+def clear_catalog_cache():
+    # For catalog changes made outside the API (e.g. SQL run by hand)
+    catalog_cache.invalidate("categories", "products")
+    return None
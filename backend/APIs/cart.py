@@ -3,7 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from database import get_db
-from models.cart import Cart, CartItem
+from services.cart_store import get_cart_store
 
 router = APIRouter(
     prefix="/cart",
@@ -27,90 +27,59 @@ def get_current_user():
 # ---------------------------------
 
 
+# Cart state is served from the cart store (see services/cart_store.py) and written
+# behind to Postgres, so these routes normally never wait on the database.
+
 @router.post("/add")
 def add_to_cart(
     item: CartItemRequest, 
     db: Session = Depends(get_db), 
     user_id: int = Depends(get_current_user) # <-- Injected dynamically now!
 ):
-    cart = db.query(Cart).filter(Cart.user_id == user_id).first()
-    if not cart:
-        cart = Cart(user_id=user_id)
-        db.add(cart)
-        db.commit()
-        db.refresh(cart)
-        
-    existing_item = db.query(CartItem).filter(
-        CartItem.cart_id == cart.id, 
-        CartItem.product_id == item.product_id
-    ).first()
-    
-    if existing_item:
-        existing_item.quantity += item.quantity
-    else:
-        new_item = CartItem(cart_id=cart.id, product_id=item.product_id, quantity=item.quantity)
-        db.add(new_item)
-        
-    db.commit()
+    get_cart_store().add(db, user_id, item.product_id, item.quantity)
     return {"status": "success", "message": "Item added to cart"}
 
 @router.get("/")
 def view_cart(db: Session = Depends(get_db), user_id: int = Depends(get_current_user)):
-    cart = db.query(Cart).filter(Cart.user_id == user_id).first()
-    if not cart or not cart.items:
+    cart_id, items = get_cart_store().get(db, user_id)
+    if not items:
         return {"cart_id": None, "items": []}
         
     return {
-        "cart_id": cart.id,
-        "items": [{"product_id": i.product_id, "quantity": i.quantity} for i in cart.items]
+        "cart_id": cart_id,
+        "items": [{"product_id": product_id, "quantity": quantity} for product_id, quantity in items.items()]
     }
 
 @router.put("/update")
-def update_cart_item(item: CartItemRequest, db: Session = Depends(get_db)):
-    user_id = 1 # Hardcoded for now
+def update_cart_item(item: CartItemRequest, db: Session = Depends(get_db), user_id: int = Depends(get_current_user)):
+    store = get_cart_store()
     
     # 1. Find the user's cart
-    cart = db.query(Cart).filter(Cart.user_id == user_id).first()
-    if not cart:
+    cart_id, items = store.get(db, user_id)
+    if cart_id is None and not items:
         raise HTTPException(status_code=404, detail="Cart not found")
         
     # 2. Find the specific item
-    existing_item = db.query(CartItem).filter(
-        CartItem.cart_id == cart.id, 
-        CartItem.product_id == item.product_id
-    ).first()
-    
-    if not existing_item:
+    if item.product_id not in items:
         raise HTTPException(status_code=404, detail="Item not found in cart")
         
     # 3. Update quantity or remove if 0
-    if item.quantity <= 0:
-        db.delete(existing_item)
-        message = "Item removed from cart"
-    else:
-        existing_item.quantity = item.quantity
-        message = "Item quantity updated"
+    store.set(db, user_id, item.product_id, item.quantity)
+    message = "Item removed from cart" if item.quantity <= 0 else "Item quantity updated"
         
-    db.commit()
     return {"status": "success", "message": message}
 
 @router.delete("/remove/{product_id}")
-def remove_from_cart(product_id: int, db: Session = Depends(get_db)):
-    user_id = 1 # Hardcoded for now
+def remove_from_cart(product_id: int, db: Session = Depends(get_db), user_id: int = Depends(get_current_user)):
+    store = get_cart_store()
     
-    cart = db.query(Cart).filter(Cart.user_id == user_id).first()
-    if not cart:
+    cart_id, items = store.get(db, user_id)
+    if cart_id is None and not items:
         raise HTTPException(status_code=404, detail="Cart not found")
         
-    existing_item = db.query(CartItem).filter(
-        CartItem.cart_id == cart.id, 
-        CartItem.product_id == product_id
-    ).first()
-    
-    if not existing_item:
+    if product_id not in items:
         raise HTTPException(status_code=404, detail="Item not found in cart")
         
-    db.delete(existing_item)
-    db.commit()
+    store.set(db, user_id, product_id, 0)
     
     return {"status": "success", "message": "Item completely removed from cart"}
\ No newline at end of file
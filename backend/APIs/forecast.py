@@ -0,0 +1,103 @@
+# backend/APIs/forecast.py
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response, status
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from database import get_db, SessionLocal
+from models.forecast import DemandForecast
+from models.product import Product
+from services.pagination import decode_cursor, paginate
+
+router = APIRouter(
+    prefix="/api/forecast",
+    tags=["Demand Forecasting"]
+)
+
+class DailyForecast(BaseModel):
+    date: date
+    units: float
+
+class ProductForecast(BaseModel):
+    productId: int
+    generatedAt: datetime
+    historyStart: date
+    historyEnd: date
+    totalUnits: float
+    activeDays: int
+    mean7: float
+    mean28: float
+    std28: float
+    level: float
+    weekdayIndex: List[float]  # Monday first
+    next7Days: float
+    forecast: List[DailyForecast]
+
+def _to_response(row: DemandForecast) -> ProductForecast:
+    return ProductForecast(
+        productId=row.productId, generatedAt=row.generatedAt, historyStart=row.historyStart, historyEnd=row.historyEnd,
+        totalUnits=row.totalUnits, activeDays=row.activeDays, mean7=row.mean7, mean28=row.mean28, std28=row.std28,
+        level=row.level, weekdayIndex=row.weekdayIndex, next7Days=round(sum(row.forecast[:7]), 3),
+        forecast=[DailyForecast(date=row.historyEnd + timedelta(days=i + 1), units=u) for i, u in enumerate(row.forecast)],
+    )
+
+@router.get("", response_model=List[ProductForecast])
+def read_forecasts(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    categoryId: Optional[int] = None,
+    productId: Optional[List[int]] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Bulk read of the latest forecasts (e.g. for purchasing), paged by product id.
+    Products without demand in the history window have no forecast and are skipped.
+    """
+    query = db.query(DemandForecast)
+    if categoryId is not None:
+        query = query.join(Product, Product.id == DemandForecast.productId).filter(Product.categoryId == categoryId)
+    if productId:
+        query = query.filter(DemandForecast.productId.in_(productId))
+    if cursor:
+        (last_id,) = decode_cursor(cursor, int)
+        query = query.filter(DemandForecast.productId > last_id)
+    rows = paginate(query.order_by(DemandForecast.productId), limit, lambda f: (f.productId,), response)
+    return [_to_response(row) for row in rows]
+
+@router.post("/refresh")
+def refresh(background_tasks: BackgroundTasks, wait: bool = False, historyDays: int = Query(365, ge=28, le=3 * 365),
+            db: Session = Depends(get_db)):
+    """
+    Recomputes every forecast. Runs in the background (202) unless wait=true; normally this is
+    the nightly `python -m services.forecasting` job instead.
+    """
+    # Imported here so NumPy and pandas load on the first refresh, not with every worker
+    from services.forecasting import RefreshInProgress, refresh_forecasts
+
+    if wait:
+        try:
+            return refresh_forecasts(db, history_days=historyDays)
+        except RefreshInProgress:
+            raise HTTPException(status_code=409, detail="A forecast refresh is already running")
+
+    def run():
+        session = SessionLocal()
+        try:
+            refresh_forecasts(session, history_days=historyDays)
+        except RefreshInProgress:
+            pass
+        finally:
+            session.close()
+
+    background_tasks.add_task(run)
+    return Response(status_code=status.HTTP_202_ACCEPTED)
+
+@router.get("/{product_id}", response_model=ProductForecast)
+def read_forecast(product_id: int, db: Session = Depends(get_db)):
+    row = db.get(DemandForecast, product_id)
+    if row is None:
+        if db.get(Product, product_id) is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        raise HTTPException(status_code=404, detail="No demand history for this product yet")
+    return _to_response(row)
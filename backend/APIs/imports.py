@@ -0,0 +1,46 @@
+# backend/APIs/imports.py
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from database import get_db
+from services.bulk_import import ImportReport, iter_records, import_products, import_batches, CHUNK_SIZE, CSV_TYPES, NDJSON_TYPES
+
+router = APIRouter(
+    prefix="/api",
+    tags=["Bulk Import"]
+)
+
+# Send the file as the raw request body, e.g.
+#   curl -X POST -H "Content-Type: text/csv" --data-binary @delivery.csv http://localhost:8000/api/batches/bulk
+# CSV needs a header row with the same field names as the single-item endpoints.
+
+def _content_type(request: Request) -> str:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in CSV_TYPES | NDJSON_TYPES:
+        raise HTTPException(status_code=415, detail="Send the import as text/csv or application/x-ndjson.")
+    return content_type
+
+async def _run_import(request: Request, db: Session, write_chunk):
+    report = ImportReport()
+    chunk = []
+    async for line_no, record, error in iter_records(request.stream(), _content_type(request)):
+        report.processed += 1
+        if error:
+            report.error(line_no, error)
+            continue
+        chunk.append((line_no, record))
+        if len(chunk) >= CHUNK_SIZE:
+            # DB work runs off the event loop while the next chunk streams in
+            await run_in_threadpool(write_chunk, db, chunk, report)
+            chunk = []
+    if chunk:
+        await run_in_threadpool(write_chunk, db, chunk, report)
+    return report.as_dict()
+
+@router.post("/products/bulk")
+async def bulk_import_products(request: Request, db: Session = Depends(get_db)):
+    return await _run_import(request, db, import_products)
+
+@router.post("/batches/bulk")
+async def bulk_import_batches(request: Request, recordedBy: str = "System Auto-Log (Bulk Delivery)", db: Session = Depends(get_db)):
+    return await _run_import(request, db, lambda db, chunk, report: import_batches(db, chunk, report, recordedBy))
@@ -0,0 +1,32 @@
+# backend/APIs/metrics.py
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from database import engine
+from services.cache import catalog_cache
+from services.idempotency import results as idempotency_results
+from services.metrics import REGISTRY
+
+router = APIRouter(
+    tags=["Monitoring"]
+)
+
+# Read at scrape time
+REGISTRY.gauge("db_pool_checked_out", "Connections currently checked out of the pool.", lambda: engine.pool.checkedout())
+REGISTRY.gauge("db_pool_size", "Configured pool size (connections kept open).", lambda: engine.pool.size())
+REGISTRY.gauge(
+    "cache_entries", "Entries held by each in-process cache.",
+    lambda: {("catalog",): catalog_cache.stats()["size"], ("idempotency",): idempotency_results.stats()["size"]},
+    ("cache",),
+)
+REGISTRY.gauge(
+    "cache_hit_ratio", "Hit ratio of each in-process cache since start.",
+    lambda: {(name,): cache.stats()["hitRatio"] or 0.0 for name, cache in (("catalog", catalog_cache), ("idempotency", idempotency_results))},
+    ("cache",),
+)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    """
+    This worker's request, SQL and pool metrics in the Prometheus text exposition format.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
@@ -1,61 +1,305 @@
 # backend/APIs/orders.py
-from fastapi import APIRouter, Depends, HTTPException
+from collections import defaultdict
+from datetime import datetime, timezone
+from decimal import Decimal
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from pydantic import BaseModel, Field
+from sqlalchemy import select, insert, delete, tuple_
 from sqlalchemy.orm import Session
-from database import get_db
+from typing import List, Literal, Optional
+from database import get_db, get_read_db, run_with_retry
 from models.orders import Order, OrderItem, OrderStatusHistory, OrderDelivery
-from models.cart import Cart
+from models.order_summary import OrderSummary
+from models.cart import Cart, CartItem
+from models.product import Product
+from APIs.cart import get_current_user
+from services.cart_store import get_cart_store
+from services.fulfilment import transition_orders, claim_orders
+from services.idempotency import fingerprint, record_result, run_idempotent
+from services.order_summaries import record_checkout
+from services.recommendations import record_order
+from services.pagination import decode_cursor, paginate
+from services.stock_levels import refresh_stock_levels
+from services.stock import InsufficientStock, load_sellable_batches, allocate_fefo, deduct_batches, log_transactions
 
 router = APIRouter(
     prefix="/orders",
     tags=["Orders Management"]
 )
 
+class OrderLine(BaseModel):
+    productId: int
+    productName: Optional[str] = None
+    quantity: int
+    priceAtPurchase: float
+
+class StatusChange(BaseModel):
+    status: str
+    changedAt: datetime
+
+class DeliveryInfo(BaseModel):
+    customerName: str
+    deliveryAddress: str
+    driverName: Optional[str] = None
+
+class OrderListItem(BaseModel):
+    orderId: int
+    createdAt: datetime
+    status: str
+    statusChangedAt: Optional[datetime] = None
+    deliveryMethod: Optional[str] = None
+    totalAmount: float
+    lineCount: int
+    itemCount: int
+
+class OrderDetail(OrderListItem):
+    lines: List[OrderLine]
+    history: List[StatusChange]
+    delivery: Optional[DeliveryInfo] = None
+
+OrderStatus = Literal["Pending", "Paid", "Packed", "Out for Delivery", "Delivered", "Abort"]
+
+class StatusUpdate(BaseModel):
+    status: OrderStatus
+    worker: Optional[str] = None       # Packer / driver moving a claimed order on
+    driverName: Optional[str] = None   # Assigns the driver when going "Out for Delivery"
+
+class BulkStatusUpdate(StatusUpdate):
+    orderIds: List[int] = Field(min_length=1, max_length=1000)
+
+class RejectedTransition(BaseModel):
+    orderId: int
+    reason: str
+
+class BulkStatusResult(BaseModel):
+    updated: List[int]
+    rejected: List[RejectedTransition]
+
+class DeliveryRequest(BaseModel):
+    customerName: str = Field(min_length=1)
+    deliveryAddress: str = Field(min_length=1)
+
+class ClaimRequest(BaseModel):
+    worker: str = Field(min_length=1)
+    stage: Literal["pack", "deliver"]
+    limit: int = Field(10, ge=1, le=100)
+
+# The list reads only the scalar columns; lines / history stay in the row until the detail view
+_LIST_COLUMNS = [getattr(OrderSummary, name) for name in OrderListItem.model_fields]
+
+@router.get("/", response_model=List[OrderListItem])
+def read_orders(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    status: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    user_id: int = Depends(get_current_user)
+):
+    """
+    The current user's orders, newest first. One range scan of ix_order_summaries_user_created
+    per page; the cursor for the next page is in X-Next-Cursor.
+    """
+    query = db.query(*_LIST_COLUMNS).filter(OrderSummary.userId == user_id)
+    if status is not None:
+        query = query.filter(OrderSummary.status == status)
+    if cursor:
+        last_created, last_id = decode_cursor(cursor, datetime, int)
+        query = query.filter(tuple_(OrderSummary.createdAt, OrderSummary.orderId) < (last_created, last_id))
+    query = query.order_by(OrderSummary.createdAt.desc(), OrderSummary.orderId.desc())
+    return [row._asdict() for row in paginate(query, limit, lambda o: (o.createdAt, o.orderId), response)]
+
+@router.get("/{order_id}", response_model=OrderDetail)
+def read_order(order_id: int, db: Session = Depends(get_read_db), user_id: int = Depends(get_current_user)):
+    """
+    Lines, status history and delivery details of one order, from its summary row.
+    """
+    summary = db.get(OrderSummary, order_id)
+    if summary is None or summary.userId != user_id:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return summary
+
+@router.post("/status", response_model=BulkStatusResult)
+def update_order_statuses(update: BulkStatusUpdate, db: Session = Depends(get_db)):
+    """
+    Moves many orders to one status in a single set-based UPDATE, with a history row per order.
+    Orders whose current status does not allow the move are left as they are and listed in
+    `rejected`; the rest are committed.
+    """
+    def apply():
+        moved, rejected = transition_orders(db, update.orderIds, update.status, update.worker, update.driverName)
+        db.commit()
+        return moved, rejected
+
+    moved, rejected = run_with_retry(db, apply)
+    return BulkStatusResult(
+        updated=moved,
+        rejected=[RejectedTransition(orderId=order_id, reason=reason) for order_id, reason in rejected.items()],
+    )
+
+@router.post("/fulfilment/claim", response_model=List[OrderDetail])
+def claim_fulfilment_work(claim: ClaimRequest, db: Session = Depends(get_db)):
+    """
+    Hands the oldest waiting orders of a stage to one packer or driver. Concurrent claims never
+    return the same order; an order left unfinished is offered again once its claim expires.
+    """
+    def apply():
+        order_ids = claim_orders(db, claim.worker, claim.stage, claim.limit)
+        db.commit()
+        return order_ids
+
+    order_ids = run_with_retry(db, apply)
+    if not order_ids:
+        return []
+    summaries = {s.orderId: s for s in db.scalars(select(OrderSummary).where(OrderSummary.orderId.in_(order_ids)))}
+    return [summaries[order_id] for order_id in order_ids if order_id in summaries]
+
+@router.post("/{order_id}/status", response_model=OrderDetail)
+def update_order_status(order_id: int, update: StatusUpdate, db: Session = Depends(get_db)):
+    def apply():
+        moved, rejected = transition_orders(db, [order_id], update.status, update.worker, update.driverName)
+        db.commit()
+        return rejected
+
+    rejected = run_with_retry(db, apply)
+    if order_id in rejected:
+        reason = rejected[order_id]
+        raise HTTPException(status_code=404 if reason == "Order not found" else 409, detail=reason)
+    return db.get(OrderSummary, order_id)
+
 @router.post("/checkout")
-def process_checkout(db: Session = Depends(get_db)):
-    user_id = 1 # Hardcoded for now
-    
-    # 1. Fetch the active cart
-    cart = db.query(Cart).filter(Cart.user_id == user_id).first()
-    if not cart or not cart.items:
+def process_checkout(
+    delivery: Optional[DeliveryRequest] = None,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None)
+):
+    """
+    Turns the cart into a paid order. With a delivery address the order is a home delivery
+    (fulfilment: packed, then claimed by a driver); without one it is collected in store.
+    A retry with the same Idempotency-Key gets the first response back instead of a second order.
+    """
+    # Cart edits may still be waiting in the write-behind buffer; checkout must see every one of them
+    store = get_cart_store()
+    store.flush(db, [user_id])
+    result, ordered = place_order(db, user_id, delivery, idempotency_key)
+    # Only what the order took: an edit that landed after the flush stays in the cart
+    store.consume(user_id, ordered)
+    return result
+
+def place_order(db: Session, user_id: int, delivery: Optional[DeliveryRequest], idempotency_key: Optional[str]):
+    """
+    The database side of checkout, on a cart already flushed to Postgres (APIs/aio/orders.py
+    drives the cart store itself). Returns the response and the {product_id: quantity} ordered,
+    which is empty when the Idempotency-Key replayed an earlier order.
+    """
+    ordered = {}
+
+    def checkout():
+        # Concurrent checkouts lock overlapping batches; a deadlock victim simply runs again
+        result, taken = run_with_retry(db, lambda: _checkout(db, user_id, delivery))
+        ordered.update(taken)
+        return result
+
+    request = delivery.model_dump() if delivery else None
+    return run_idempotent(db, f"checkout:{user_id}", idempotency_key, fingerprint(request), 200, checkout), ordered
+
+def _checkout(db: Session, user_id: int, delivery: Optional[DeliveryRequest] = None):
+    # 1. Fetch the active cart lines in one query (no lazy loading of cart.items)
+    lines = db.execute(
+        select(Cart.id, CartItem.product_id, CartItem.quantity)
+        .join(CartItem, CartItem.cart_id == Cart.id)
+        .where(Cart.user_id == user_id)
+        .order_by(CartItem.id)
+    ).all()
+    if not lines:
         raise HTTPException(status_code=400, detail="Cart is empty")
-        
-    # 2. Create the immutable Order record
+    cart_id = lines[0].id
+
+    # The same product could sit on two cart lines; sell it as one quantity
+    requested = defaultdict(int)
+    for line in lines:
+        requested[line.product_id] += line.quantity
+    # Adding a negative quantity can leave a line at zero or below; nothing to sell for it
+    not_positive = [pid for pid, quantity in requested.items() if quantity <= 0]
+    if not_positive:
+        raise HTTPException(status_code=400, detail=f"Quantities must be positive for products: {not_positive}")
+
+    # 2. Load every product and its sellable batches at once, locking the batches we will sell from
+    batches, default_prices = load_sellable_batches(db, list(requested))
+    unstocked = [pid for pid in requested if pid not in batches]
+    if unstocked:
+        # Error path only: tell unknown products apart from ones that are merely sold out
+        known = set(db.scalars(select(Product.id).where(Product.id.in_(unstocked))))
+        missing = [pid for pid in unstocked if pid not in known]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Products not found: {missing}")
+
+    # 3. Allocate First-Expiry-First-Out and price each slice from the batch it came from
+    order_lines = []
+    deductions = {}
+    total_price = Decimal("0.00")
+    for product_id, quantity in requested.items():
+        try:
+            slices = allocate_fefo(product_id, quantity, batches[product_id])
+        except InsufficientStock as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        for batch_id, retail_price, take in slices:
+            price = retail_price if retail_price is not None else (default_prices[product_id] or Decimal("0.00"))
+            deductions[batch_id] = take
+            total_price += price * take
+            # Consecutive batches at the same price collapse into one order line
+            if order_lines and order_lines[-1]["product_id"] == product_id and order_lines[-1]["price_at_purchase"] == float(price):
+                order_lines[-1]["quantity"] += take
+            else:
+                order_lines.append({"product_id": product_id, "quantity": take, "price_at_purchase": float(price)})
+
+    # 4. Create the immutable Order record with its final total
+    now = datetime.now(timezone.utc)
     new_order = Order(
         user_id=user_id,
         current_status="Paid",
-        delivery_method="Store Pickup",
-        total_amount=0.0 # We will calculate this below
+        delivery_method="Home Delivery" if delivery else "Store Pickup",
+        total_amount=float(total_price),
+        created_at=now
     )
     db.add(new_order)
     db.flush() # Flushes to generate the new_order.id without fully committing yet
-    
-    # 3. Log the initial status for your Sales & Demand Forecasting ML model
-    status_log = OrderStatusHistory(order_id=new_order.id, status="Paid")
-    db.add(status_log)
-    
-    total_price = 0.0
-    
-    # 4. Transfer Cart items to Order items
-    for item in cart.items:
-        # NOTE: Since the Inventory module isn't built yet, we are faking the price.
-        # Later, you will query the Product table here to get the real price.
-        fake_price = 150.00 
-        
-        order_item = OrderItem(
-            order_id=new_order.id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            price_at_purchase=fake_price
-        )
-        db.add(order_item)
-        total_price += (fake_price * item.quantity)
-        
-    # 5. Finalize the order total and delete the temporary cart
-    new_order.total_amount = total_price
-    db.delete(cart)
-    
-    # 6. Commit the entire transaction safely
+
+    # 5. Log the initial status for your Sales & Demand Forecasting ML model
+    db.add(OrderStatusHistory(order_id=new_order.id, status="Paid", changed_at=now))
+    if delivery:
+        db.add(OrderDelivery(order_id=new_order.id, customer_name=delivery.customerName, delivery_address=delivery.deliveryAddress))
+
+    # 6. Bulk-write order lines, stock deductions and the 'sale' audit trail
+    db.execute(insert(OrderItem), [dict(line, order_id=new_order.id) for line in order_lines])
+    deduct_batches(db, deductions)
+    refresh_stock_levels(db, product_ids=list(requested))
+    log_transactions(db, [
+        {
+            "batchId": batch_id,
+            "transactionType": "sale",
+            "quantity": qty,
+            "recordedBy": f"Checkout (Order #{new_order.id})",
+            "timestamp": now,
+        }
+        for batch_id, qty in deductions.items()
+    ])
+
+    # 7. Order history / detail read model, published in the same commit
+    record_checkout(db, new_order, order_lines, now, delivery.model_dump() if delivery else None)
+
+    # 8. Delete the temporary cart without loading its items
+    db.execute(delete(CartItem).where(CartItem.cart_id == cart_id))
+    db.execute(delete(Cart).where(Cart.id == cart_id))
+
+    # 9. Commit the entire transaction safely (read the id first: commit expires it),
+    #    together with the response stored for an Idempotency-Key
+    result = {"status": "success", "message": "Checkout complete!", "order_id": new_order.id}
+    record_result(db, result)
     db.commit()
-    db.refresh(new_order)
-    
-    return {"status": "success", "message": "Checkout complete!", "order_id": new_order.id}
\ No newline at end of file
+
+    # 10. "Frequently bought together" picks the order up in the background
+    record_order(result["order_id"], requested)
+    return result, dict(requested)
@@ -0,0 +1,50 @@
+# backend/APIs/recommendations.py
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from database import get_read_db
+from models.product import Product
+from models.recommendation import ProductRecommendation
+from services.recommendations import TOP_K
+
+router = APIRouter(
+    prefix="/api/products",
+    tags=["Recommendations"]
+)
+
+class Recommendation(BaseModel):
+    productId: int
+    productName: Optional[str] = None    # Nullable on products, like sku
+    sku: Optional[str] = None
+    unit: Optional[str] = None
+    imageUrl: Optional[str] = None
+    defaultPrice: Optional[float] = None
+    orders: int          # Orders that contained both products
+    confidence: float    # Share of this product's orders that also contained the recommended one
+    lift: float          # How much likelier the pair is than chance (above 1: bought together on purpose)
+
+@router.get("/{product_id}/recommendations", response_model=List[Recommendation])
+def read_recommendations(
+    product_id: int,
+    limit: int = Query(5, ge=1, le=TOP_K),
+    db: Session = Depends(get_read_db)
+):
+    """
+    "Frequently bought together": the products most often in the same orders as this one, best
+    first. One primary-key range read of the precomputed product_recommendations table.
+    """
+    rows = db.execute(
+        select(
+            Product.id.label("productId"), Product.productName, Product.sku, Product.unit, Product.imageUrl, Product.defaultPrice,
+            ProductRecommendation.orders, ProductRecommendation.confidence, ProductRecommendation.lift,
+        )
+        .join(Product, Product.id == ProductRecommendation.otherId)
+        .where(ProductRecommendation.productId == product_id)
+        .order_by(ProductRecommendation.rank)
+        .limit(limit)
+    ).all()
+    if not rows and db.get(Product, product_id) is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return [row._asdict() for row in rows]
@@ -1,12 +1,20 @@
 # backend/APIs/routers.py
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
+from typing import List, Optional
 from datetime import datetime, timezone
-import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import schemas, database, models
+from database import run_with_retry
+from services.cache import catalog_cache, cached_json_response
+from services.idempotency import fingerprint, record_result, run_idempotent
+from services.stock import QUANTITY_EFFECT, apply_batch_delta
+from services.pagination import decode_cursor, paginate
+from services.stock_levels import refresh_stock_levels
+from services.ledger_archive import is_archived, with_archive
+from services.stock_snapshots import ledger_effect, record_ledger_edit
+from models.stock_level import ProductStockLevel
 
 router = APIRouter(
     prefix="/api",
@@ -22,30 +30,55 @@ def get_db():
         db.close()
 
 # --- Categories ---
+# Read-only listings take database.get_read_db (the read replica, when one is configured).
+# Catalog reads are served from catalog_cache (read-through, with ETag / If-None-Match 304s).
+# Every catalog write below invalidates the affected namespace AFTER its commit.
 @router.get("/categories/", response_model=List[schemas.Category])
-def read_categories(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return db.query(models.Category).offset(skip).limit(limit).all()
+def read_categories(request: Request, skip: int = 0, limit: int = 100, db: Session = Depends(database.get_read_db)):
+    return cached_json_response(
+        request, catalog_cache, "categories", (skip, limit), List[schemas.Category],
+        lambda response: db.query(models.Category).offset(skip).limit(limit).all()
+    )
 
 @router.post("/categories/", response_model=schemas.Category, status_code=status.HTTP_201_CREATED)
 def create_category(category: schemas.CategoryCreate, db: Session = Depends(get_db)):
     db_category = models.Category(**category.model_dump())
     db.add(db_category)
     db.commit()
+    catalog_cache.invalidate("categories")
     db.refresh(db_category)
     return db_category
 
 # --- Products ---
+# List endpoints below page by cursor: pass the X-Next-Cursor header of one page as ?cursor= for the next.
 @router.get("/products/", response_model=List[schemas.Product])
-def read_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return db.query(models.Product).offset(skip).limit(limit).all()
+def read_products(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    categoryId: Optional[int] = None,
+    db: Session = Depends(database.get_read_db)
+):
+    def load(response: Response):
+        query = db.query(models.Product).options(joinedload(models.Product.category))
+        if categoryId is not None:
+            query = query.filter(models.Product.categoryId == categoryId)
+        if cursor:
+            (last_id,) = decode_cursor(cursor, int)
+            query = query.filter(models.Product.id > last_id)
+        return paginate(query.order_by(models.Product.id), limit, lambda p: (p.id,), response)
+
+    return cached_json_response(request, catalog_cache, "products", (cursor, limit, categoryId), List[schemas.Product], load)
 
 @router.post("/products/", response_model=schemas.Product, status_code=status.HTTP_201_CREATED)
 def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)):
     db_product = models.Product(**product.model_dump())
     db.add(db_product)
+    db.flush()
+    product_id = db_product.id  # Read before commit expires it, which would cost a refresh
     db.commit()
-    db.refresh(db_product)
-    return db_product
+    catalog_cache.invalidate("products")
+    return _load_product(db, product_id)
 
 @router.put("/products/{product_id}", response_model=schemas.Product)
 def update_product(product_id: int, product: schemas.ProductUpdate, db: Session = Depends(get_db)):
@@ -56,8 +89,19 @@ def update_product(product_id: int, product: schemas.ProductUpdate, db: Session
     for key, value in product.model_dump(exclude_unset=True).items():
         setattr(db_product, key, value)
     db.commit()
-    db.refresh(db_product)
-    return db_product
+    catalog_cache.invalidate("products")
+    return _load_product(db, product_id)
+
+def _load_product(db: Session, product_id: int):
+    # Reloads a just-written product with its category in one joined query,
+    # instead of a refresh plus a lazy load of .category during serialization
+    return (
+        db.query(models.Product)
+        .options(joinedload(models.Product.category))
+        .populate_existing()
+        .filter(models.Product.id == product_id)
+        .one()
+    )
 
 @router.delete("/products/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_product(product_id: int, db: Session = Depends(get_db)):
@@ -71,21 +115,52 @@ def delete_product(product_id: int, db: Session = Depends(get_db)):
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found")
         
+    # Its (empty) stock summary row goes with it
+    db.query(ProductStockLevel).filter(ProductStockLevel.productId == product_id).delete()
     db.delete(db_product)
     db.commit()
+    catalog_cache.invalidate("products")
     return None
 
 # --- Batches ---
 @router.get("/batches/", response_model=List[schemas.StockBatch])
-def read_batches(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return db.query(models.StockBatch).offset(skip).limit(limit).all()
+def read_batches(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    productId: Optional[int] = None,
+    expiresBefore: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    # Each batch is serialized with its product and that product's category
+    query = db.query(models.StockBatch).options(
+        joinedload(models.StockBatch.product).joinedload(models.Product.category)
+    )
+    if productId is not None:
+        query = query.filter(models.StockBatch.productId == productId)
+    if expiresBefore is not None:
+        query = query.filter(models.StockBatch.expiryDate < expiresBefore)
+    if cursor:
+        (last_id,) = decode_cursor(cursor, int)
+        query = query.filter(models.StockBatch.id > last_id)
+    return paginate(query.order_by(models.StockBatch.id), limit, lambda b: (b.id,), response)
 
 @router.post("/batches/", response_model=schemas.StockBatch, status_code=status.HTTP_201_CREATED)
 def create_batch(batch: schemas.StockBatchCreate, db: Session = Depends(get_db)):
     db_batch = models.StockBatch(**batch.model_dump())
     db.add(db_batch)
-    db.commit()
-    db.refresh(db_batch)
+    try:
+        db.flush() # Generates db_batch.id so the audit row can reference it in the same commit
+    except IntegrityError:
+        db.rollback()
+        exists = db.scalar(select(models.StockBatch.id).filter_by(productId=batch.productId, batchNumber=batch.batchNumber))
+        if exists is None:
+            raise
+        # uq_stock_batches_product_batch; re-deliveries of a batch go through POST /batches/bulk
+        raise HTTPException(
+            status_code=409,
+            detail=f"Batch {batch.batchNumber} already exists for product {batch.productId} (id {exists})"
+        )
     
     # Automatically log the initial stock delivery to the Transaction Audit Trail
     if db_batch.currentQuantity > 0:
@@ -97,90 +172,143 @@ def create_batch(batch: schemas.StockBatchCreate, db: Session = Depends(get_db))
             timestamp=datetime.now(timezone.utc)
         )
         db.add(initial_transaction)
-        db.commit()
-        
-    return db_batch
+
+    batch_id = db_batch.id
+    refresh_stock_levels(db, product_ids=[db_batch.productId])
+    db.commit()
+    return (
+        db.query(models.StockBatch)
+        .options(joinedload(models.StockBatch.product).joinedload(models.Product.category))
+        .populate_existing()
+        .filter(models.StockBatch.id == batch_id)
+        .one()
+    )
 
 # --- Transactions ---
 @router.get("/transactions/", response_model=List[schemas.StockTransaction])
-def read_transactions(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return db.query(models.StockTransaction).order_by(models.StockTransaction.timestamp.desc()).offset(skip).limit(limit).all()
+def read_transactions(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    batchId: Optional[int] = None,
+    transactionType: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: Session = Depends(database.get_read_db)
+):
+    # Newest first, keyed on (timestamp, id) so rows sharing a timestamp are never skipped or repeated
+    if cursor:
+        last_timestamp, last_id = decode_cursor(cursor, datetime, int)
 
-@router.post("/transactions/", response_model=schemas.StockTransaction, status_code=status.HTTP_201_CREATED)
-def create_transaction(transaction: schemas.StockTransactionCreate, db: Session = Depends(get_db)):
-    # Retrieve linked Batch securely
-    db_batch = db.query(models.StockBatch).filter(models.StockBatch.id == transaction.batchId).first()
-    if not db_batch:
-        raise HTTPException(status_code=400, detail="Linked Batch not found.")
+    def page(ledger):
+        query = select(ledger.id, ledger.batchId, ledger.transactionType, ledger.quantity, ledger.recordedBy, ledger.timestamp)
+        if batchId is not None:
+            query = query.where(ledger.batchId == batchId)
+        if transactionType is not None:
+            query = query.where(ledger.transactionType == transactionType)
+        if since is not None:
+            query = query.where(ledger.timestamp >= since)
+        if until is not None:
+            query = query.where(ledger.timestamp < until)
+        if cursor:
+            # The plain bound lets Postgres skip archive partitions newer than the cursor
+            query = query.where(ledger.timestamp <= last_timestamp, tuple_(ledger.timestamp, ledger.id) < (last_timestamp, last_id))
+        return query.order_by(ledger.timestamp.desc(), ledger.id.desc()).limit(limit + 1)
 
-    # Calculate quantity mutation rule
-    if transaction.transactionType in ['stock_in', 'return']:
-        db_batch.currentQuantity += transaction.quantity
-        
-    elif transaction.transactionType == 'sale':
-        if db_batch.currentQuantity < transaction.quantity:
-            raise HTTPException(status_code=400, detail=f"Insufficient stock processing sale. Only {db_batch.currentQuantity} remaining.")
-        db_batch.currentQuantity -= transaction.quantity
-        
-    elif transaction.transactionType == 'adjustment':
-        # Adjustment quantity handles both positive and negative direct additions
-        db_batch.currentQuantity += transaction.quantity
-        
-    else:
+    # Windows older than the last few months also read the archived months
+    rows = with_archive("stock_transactions", page, since)
+    query = db.query(rows).order_by(rows.c.timestamp.desc(), rows.c.id.desc())
+    return paginate(query, limit, lambda t: (t.timestamp, t.id), response)
+
+@router.post("/transactions/", response_model=schemas.StockTransaction, status_code=status.HTTP_201_CREATED)
+def create_transaction(
+    transaction: schemas.StockTransactionCreate,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None)
+):
+    """
+    Records a ledger entry and applies it to its batch. A retry with the same Idempotency-Key
+    gets the first response back instead of moving the stock twice.
+    """
+    if transaction.transactionType not in QUANTITY_EFFECT:
         raise HTTPException(status_code=400, detail="Invalid transactionType. Expected: stock_in, sale, adjustment, return.")
 
-    # Construct the actual transaction object, stamping it with UTC time
-    db_transaction = models.StockTransaction(
-        **transaction.model_dump(),
-        timestamp=datetime.now(timezone.utc)
+    def work():
+        # Calculate quantity mutation rule and push it to the batch as one atomic UPDATE.
+        # Sales are guarded in SQL so two tills can never sell the same last unit.
+        delta = QUANTITY_EFFECT[transaction.transactionType] * transaction.quantity
+        new_quantity = apply_batch_delta(db, transaction.batchId, delta, guard=transaction.transactionType == 'sale')
+        if new_quantity is None:
+            db.rollback()
+            _raise_rejected_mutation(db, transaction.batchId)
+        refresh_stock_levels(db, batch_ids=[transaction.batchId])
+
+        # Construct the actual transaction object, stamping it with UTC time
+        db_transaction = models.StockTransaction(
+            **transaction.model_dump(),
+            timestamp=datetime.now(timezone.utc)
+        )
+        db.add(db_transaction)
+        db.flush()
+        record_result(db, lambda: schemas.StockTransaction.model_validate(db_transaction).model_dump(mode="json"))
+        db.commit()
+        db.refresh(db_transaction)
+        return db_transaction
+
+    return run_idempotent(
+        db, "transactions", idempotency_key, fingerprint(transaction.model_dump()), status.HTTP_201_CREATED,
+        lambda: run_with_retry(db, work)
     )
-    
-    # Push both modifications atomically
-    db.add(db_transaction)
-    db.add(db_batch)
-    db.commit()
-    db.refresh(db_transaction)
-    return db_transaction
 
 @router.put("/transactions/{transaction_id}", response_model=schemas.StockTransaction)
 def update_transaction(transaction_id: int, transaction_update: schemas.StockTransactionUpdate, db: Session = Depends(get_db)):
-    db_transaction = db.query(models.StockTransaction).filter(models.StockTransaction.id == transaction_id).first()
-    if not db_transaction:
-        raise HTTPException(status_code=404, detail="Transaction not found")
+    def work():
+        # Lock the ledger row so two editors cannot reverse the same original effect twice
+        db_transaction = db.query(models.StockTransaction).filter(models.StockTransaction.id == transaction_id).with_for_update().first()
+        if not db_transaction:
+            if is_archived(db, "stock_transactions", transaction_id):
+                raise HTTPException(status_code=409, detail="Transaction is archived and can no longer be edited. Record an adjustment instead.")
+            raise HTTPException(status_code=404, detail="Transaction not found")
 
-    db_batch = db.query(models.StockBatch).filter(models.StockBatch.id == db_transaction.batchId).first()
-    if not db_batch:
-        raise HTTPException(status_code=400, detail="Linked Batch not found.")
+        update_data = transaction_update.model_dump(exclude_unset=True)
 
-    update_data = transaction_update.model_dump(exclude_unset=True)
-    
-    new_type = update_data.get('transactionType', db_transaction.transactionType)
-    new_quantity = update_data.get('quantity', db_transaction.quantity)
-
-    # 1. Reverse the effect of the ORIGINAL transaction
-    if db_transaction.transactionType in ['stock_in', 'return']:
-        db_batch.currentQuantity -= db_transaction.quantity
-    elif db_transaction.transactionType == 'sale':
-        db_batch.currentQuantity += db_transaction.quantity
-    elif db_transaction.transactionType == 'adjustment':
-        db_batch.currentQuantity -= db_transaction.quantity
-
-    # 2. Apply the effect of the NEW transaction
-    if new_type in ['stock_in', 'return']:
-        db_batch.currentQuantity += new_quantity
-    elif new_type == 'sale':
-        db_batch.currentQuantity -= new_quantity
-    elif new_type == 'adjustment':
-        db_batch.currentQuantity += new_quantity
-
-    for key, value in update_data.items():
-        setattr(db_transaction, key, value)
-
-    db.add(db_transaction)
-    db.add(db_batch)
-    db.commit()
-    db.refresh(db_transaction)
-    return db_transaction
+        new_type = update_data.get('transactionType', db_transaction.transactionType)
+        new_quantity = update_data.get('quantity', db_transaction.quantity)
+
+        # Reverse the effect of the ORIGINAL transaction and apply the NEW one as a single net delta
+        delta = (
+            QUANTITY_EFFECT.get(new_type, 0) * new_quantity
+            - QUANTITY_EFFECT.get(db_transaction.transactionType, 0) * db_transaction.quantity
+        )
+        new_batch_quantity = apply_batch_delta(db, db_transaction.batchId, delta, guard=new_type == 'sale')
+        if new_batch_quantity is None:
+            batch_id = db_transaction.batchId
+            db.rollback()
+            _raise_rejected_mutation(db, batch_id)
+        refresh_stock_levels(db, batch_ids=[db_transaction.batchId])
+        # Stock snapshots taken after this row counted its original effect
+        record_ledger_edit(
+            db, db_transaction.batchId, db_transaction.timestamp,
+            ledger_effect(new_type, new_quantity) - ledger_effect(db_transaction.transactionType, db_transaction.quantity),
+        )
+
+        for key, value in update_data.items():
+            setattr(db_transaction, key, value)
+
+        db.commit()
+        db.refresh(db_transaction)
+        return db_transaction
+
+    return run_with_retry(db, work)
+
+def _raise_rejected_mutation(db: Session, batch_id: int):
+    """
+    Explains why a guarded batch UPDATE matched no row: the batch is gone or the sale would oversell.
+    """
+    remaining = db.query(models.StockBatch.currentQuantity).filter(models.StockBatch.id == batch_id).scalar()
+    if remaining is None:
+        raise HTTPException(status_code=400, detail="Linked Batch not found.")
+    raise HTTPException(status_code=400, detail=f"Insufficient stock processing sale. Only {remaining} remaining.")
 
 @router.delete("/transactions/{transaction_id}", status_code=status.HTTP_405_METHOD_NOT_ALLOWED)
 def delete_transaction(transaction_id: int, db: Session = Depends(get_db)):
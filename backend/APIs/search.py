@@ -0,0 +1,51 @@
+# backend/APIs/search.py
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from database import get_read_db
+from services.search import search_products, suggest_products
+import schemas
+
+router = APIRouter(
+    prefix="/api/products",
+    tags=["Product Search"]
+)
+
+class CategoryFacet(BaseModel):
+    categoryId: Optional[int] = None
+    name: Optional[str] = None
+    count: int
+
+class ProductSearchResult(BaseModel):
+    total: int
+    results: List[schemas.Product]
+    facets: List[CategoryFacet]
+
+class ProductSuggestion(BaseModel):
+    id: int
+    productName: Optional[str] = None    # Both nullable on products
+    sku: Optional[str] = None
+
+@router.get("/search", response_model=ProductSearchResult)
+def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    categoryId: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Ranked, typo-tolerant search over name, SKU, supplier and description, with per-category
+    match counts. Pass a facet's categoryId back to narrow the results to that category.
+    """
+    return search_products(db, q, categoryId, limit, offset)
+
+@router.get("/suggest", response_model=List[ProductSuggestion])
+def suggest(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_read_db)
+):
+    # Search-box autocomplete: product names starting with q
+    return [{"id": pid, "productName": name, "sku": sku} for pid, name, sku in suggest_products(db, q, limit)]
@@ -0,0 +1,88 @@
+# backend/APIs/stock_levels.py
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from database import get_db
+from models.product import Product
+from models.stock_level import ProductStockLevel
+from services.pagination import decode_cursor, paginate
+from services.stock_levels import live_levels, reconcile_stock_levels
+from services.stock_snapshots import levels_as_of, take_snapshot
+
+router = APIRouter(
+    prefix="/api",
+    tags=["Stock Levels"]
+)
+
+class StockLevel(BaseModel):
+    productId: int
+    totalOnHand: int
+    earliestExpiry: Optional[datetime] = None
+    liveBatches: int
+
+@router.get("/stock-levels", response_model=List[StockLevel])
+def read_stock_levels(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=5000),
+    categoryId: Optional[int] = None,
+    productId: Optional[List[int]] = Query(None),
+    as_of: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Sellable stock per product, read from the product_stock_levels projection in one
+    primary-key join (products with no summary row have no live stock).
+
+    With ?as_of= the page's levels are instead rebuilt for that instant from the nearest stock
+    snapshot before it plus the ledger since; X-Stock-Snapshot names the snapshot used.
+    """
+    query = db.query(
+        Product.id.label("productId"),
+        ProductStockLevel.totalOnHand,
+        ProductStockLevel.earliestExpiry,
+        ProductStockLevel.liveBatches,
+    ).outerjoin(ProductStockLevel, ProductStockLevel.productId == Product.id)
+    if categoryId is not None:
+        query = query.filter(Product.categoryId == categoryId)
+    if productId:
+        query = query.filter(Product.id.in_(productId))
+    if cursor:
+        (last_id,) = decode_cursor(cursor, int)
+        query = query.filter(Product.id > last_id)
+    rows = paginate(query.order_by(Product.id), limit, lambda r: (r.productId,), response)
+
+    if as_of is not None:
+        fresh, snapshot = levels_as_of(db, as_of, [r.productId for r in rows]) if rows else ({}, None)
+        response.headers["X-Stock-Snapshot"] = snapshot.takenAt.isoformat() if snapshot is not None else "none"
+    else:
+        # A summary whose earliest batch has expired since it was written is recomputed for this page
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        stale = [r.productId for r in rows if r.earliestExpiry is not None and r.earliestExpiry <= now]
+        fresh = live_levels(db, stale) if stale else {}
+
+    levels = []
+    for r in rows:
+        total, earliest, count = fresh.get(r.productId, (r.totalOnHand or 0, r.earliestExpiry, r.liveBatches or 0))
+        levels.append(StockLevel(productId=r.productId, totalOnHand=total, earliestExpiry=earliest, liveBatches=count))
+    return levels
+
+@router.post("/stock-levels/reconcile")
+def reconcile(db: Session = Depends(get_db)):
+    """
+    Rebuilds every summary row from the StockTransaction ledger and reports batches whose
+    currentQuantity has drifted from it.
+    """
+    return reconcile_stock_levels(db)
+
+@router.post("/stock-levels/snapshots", status_code=201)
+def create_snapshot(db: Session = Depends(get_db)):
+    """
+    Takes a stock snapshot now instead of waiting for the cron run (python -m services.stock_snapshots).
+    """
+    try:
+        return take_snapshot(db)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
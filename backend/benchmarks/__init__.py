@@ -0,0 +1,2 @@
+# backend/benchmarks/__init__.py
+# Stand-alone performance scripts. Run from the backend directory, e.g. `python -m benchmarks.stock_contention`.
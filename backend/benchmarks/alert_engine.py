@@ -0,0 +1,156 @@
+# backend/benchmarks/alert_engine.py
+"""
+Scale benchmark for the reorder / expiry alert engine.
+
+Seeds products with several non-empty batches each (300k batches by default) and explicit
+reorder thresholds, then reports: the full rebuild time, the latency of applying a committed
+stock mutation (refresh_stock_levels + commit, then catch_up), the background poll (only
+its first run has rows to reload), and the latency of reading a page of each alert kind at random offsets.
+The seeded rows are removed afterwards.
+
+Usage (against the DATABASE_URL in the environment):
+    python -m benchmarks.alert_engine --products 50000 --batches-per-product 6 --mutations 500
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert, delete, select
+from database import Base, SessionLocal, engine
+from models.category import Category
+from models.product import Product
+from models.batch import StockBatch
+from models.alert import ReorderThreshold
+from models.stock_level import ProductStockLevel
+from services.alerts import AlertEngine
+from services.stock import apply_batch_delta
+from services.stock_levels import on_stock_committed, refresh_stock_levels
+from benchmarks.product_search import percentiles
+
+INSERT_ROWS = 10000
+
+
+def seed(products: int, batches_per_product: int, tag: str):
+    rng = random.Random(42)
+    db = SessionLocal()
+    try:
+        (category_id,) = db.execute(insert(Category).returning(Category.id), [{"name": f"alerts-{tag}"}]).scalars()
+        product_ids = []
+        for i in range(0, products, INSERT_ROWS):
+            product_ids.extend(db.execute(insert(Product).returning(Product.id, sort_by_parameter_order=True), [
+                {"categoryId": category_id, "productName": f"Item {n}", "sku": f"{tag}-{n:06d}", "unit": "pcs",
+                 "supplierName": "Benchmark", "defaultPrice": 1}
+                for n in range(i, min(products, i + INSERT_ROWS))
+            ]).scalars())
+
+        now = datetime.now(timezone.utc)
+        rows = []
+        for pid in product_ids:
+            for n in range(batches_per_product):
+                rows.append({
+                    "productId": pid, "batchNumber": f"{tag}-{n}", "currentQuantity": rng.randint(1, 60),
+                    "retailPrice": 1, "expiryDate": now + timedelta(days=rng.uniform(-3, 120)),
+                })
+            if len(rows) >= INSERT_ROWS:
+                db.execute(insert(StockBatch), rows)
+                rows = []
+        if rows:
+            db.execute(insert(StockBatch), rows)
+        for i in range(0, len(product_ids), INSERT_ROWS):
+            db.execute(insert(ReorderThreshold), [
+                {"productId": pid, "reorderPoint": rng.randint(10, 150), "reorderQuantity": 50, "updatedAt": now - timedelta(hours=1)}
+                for pid in product_ids[i:i + INSERT_ROWS]
+            ])
+        db.commit()
+        return category_id, product_ids
+    finally:
+        db.close()
+
+
+def cleanup(category_id: int, product_ids):
+    db = SessionLocal()
+    try:
+        for i in range(0, len(product_ids), INSERT_ROWS):
+            chunk = product_ids[i:i + INSERT_ROWS]
+            db.execute(delete(ReorderThreshold).where(ReorderThreshold.productId.in_(chunk)))
+            db.execute(delete(ProductStockLevel).where(ProductStockLevel.productId.in_(chunk)))
+            db.execute(delete(StockBatch).where(StockBatch.productId.in_(chunk)))
+            db.execute(delete(Product).where(Product.id.in_(chunk)))
+        db.execute(delete(Category).where(Category.id == category_id))
+        db.commit()
+    finally:
+        db.close()
+
+
+def timed(fn, runs):
+    samples = []
+    for args in runs:
+        started = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - started) * 1000)
+    return percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--batches-per-product", type=int, default=6)
+    parser.add_argument("--mutations", type=int, default=500)
+    parser.add_argument("--reads", type=int, default=500)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    tag = f"AL{uuid.uuid4().hex[:6]}"
+    started = time.perf_counter()
+    category_id, product_ids = seed(args.products, args.batches_per_product, tag)
+    seeded_s = time.perf_counter() - started
+
+    # A private engine, so the benchmark does not depend on (or disturb) the process-wide one
+    alerts = AlertEngine()
+    on_stock_committed(alerts.notify)
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        alerts.rebuild(db)
+        rebuild_s = time.perf_counter() - started
+
+        rng = random.Random(7)
+        batch_ids = list(db.scalars(select(StockBatch.id).where(StockBatch.productId.in_(product_ids[:2000]))))
+        db.rollback()
+
+        def mutate(batch_id):
+            # One till sale: the same statements create_transaction runs, then the engine catches up
+            if apply_batch_delta(db, batch_id, -1, guard=True) is not None:
+                refresh_stock_levels(db, batch_ids=[batch_id])
+            db.commit()
+            alerts.catch_up(db)
+
+        mutation = timed(mutate, [(rng.choice(batch_ids),) for _ in range(args.mutations)])
+        poll = timed(lambda: alerts.catch_up(db, poll=True), [() for _ in range(50)])
+
+        stats = alerts.stats()
+        reorder_total = max(1, stats["reorder"])
+        reads = {
+            "reorder": timed(alerts.reorder_alerts, [(rng.randrange(reorder_total), 100) for _ in range(args.reads)]),
+            "expiring": timed(lambda o: alerts.expiring(7, o, 100), [(rng.randrange(5000),) for _ in range(args.reads)]),
+            "markdowns": timed(lambda: alerts.markdowns(7, 0, 100), [() for _ in range(args.reads // 10)]),
+        }
+    finally:
+        db.close()
+        cleanup(category_id, product_ids)
+
+    print(json.dumps({
+        "dialect": engine.dialect.name,
+        "seed_s": round(seeded_s, 1),
+        "engine": stats,
+        "rebuild_s": round(rebuild_s, 2),
+        "mutation_to_alert": mutation,
+        "idle_poll": poll,
+        "page_of_100": reads,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
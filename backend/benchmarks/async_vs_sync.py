@@ -0,0 +1,93 @@
+# backend/benchmarks/async_vs_sync.py
+"""
+Load test comparing the sync routers with the async (USE_ASYNC_DB=true) stack.
+
+For each mode a uvicorn server is started on the given port against the current DATABASE_URL.
+Then `--clients` concurrent HTTP clients each issue `--requests` GETs round-robin over
+`--paths`. The report gives throughput and p50/p99 latency per mode as JSON.
+
+Usage:
+    python -m benchmarks.async_vs_sync --clients 500 --requests 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import httpx
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def start_server(async_mode: bool, port: int, app: str = "main:app", factory: bool = False) -> subprocess.Popen:
+    env = dict(os.environ, USE_ASYNC_DB="true" if async_mode else "false")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning"] + (["--factory"] if factory else []),
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("uvicorn did not come up within 30s")
+
+
+async def drive(base_url: str, clients: int, requests: int, paths) -> dict:
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as http:
+        async def client(n: int):
+            nonlocal errors
+            for i in range(requests):
+                started = time.perf_counter()
+                response = await http.get(paths[(n + i) % len(paths)])
+                latencies.append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(n) for n in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--paths", nargs="+", default=["/api/products/?limit=50", "/api/transactions/?limit=50", "/cart/"])
+    args = parser.parse_args()
+
+    report = {}
+    for mode in ("sync", "async"):
+        server = start_server(mode == "async", args.port)
+        try:
+            report[mode] = asyncio.run(drive(f"http://127.0.0.1:{args.port}", args.clients, args.requests, args.paths))
+        finally:
+            server.terminate()
+            server.wait()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
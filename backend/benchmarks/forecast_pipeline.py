@@ -0,0 +1,171 @@
+# backend/benchmarks/forecast_pipeline.py
+"""
+Throughput / memory benchmark for the demand-forecasting pipeline.
+
+Seeds a catalog (50k SKUs by default) with a year of synthetic demand: online orders
+(Order + OrderItem) and in-store 'sale' ledger rows, drawn from known per-product daily
+rates with a weekday pattern. Then runs `refresh_forecasts` and reports wall time, the
+peak traced memory of a second run, and how well the smoothed level recovers the true rates.
+
+Usage (against the DATABASE_URL in the environment; orders belong to --user-id):
+    python -m benchmarks.forecast_pipeline --products 50000 --order-lines 1000000 --budget-mb 32
+"""
+import argparse
+import json
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from sqlalchemy import insert, delete, select
+from database import Base, SessionLocal, engine
+from models.category import Category
+from models.product import Product
+from models.batch import StockBatch
+from models.transaction import StockTransaction
+from models.orders import Order, OrderItem
+from models.forecast import DemandForecast
+from services.forecasting import refresh_forecasts
+
+WEEKDAY_PATTERN = np.array([0.8, 0.85, 0.9, 1.0, 1.15, 1.4, 0.9])  # Monday first
+INSERT_ROWS = 10000
+
+
+def _insert(db, model, rows, returning=None):
+    out = []
+    for i in range(0, len(rows), INSERT_ROWS):
+        stmt = insert(model)
+        if returning is not None:
+            out.extend(db.execute(stmt.returning(returning, sort_by_parameter_order=True), rows[i:i + INSERT_ROWS]).scalars())
+        else:
+            db.execute(stmt, rows[i:i + INSERT_ROWS])
+    return out
+
+
+def seed(products: int, order_lines: int, store_sales: int, user_id: int, tag: str):
+    rng = np.random.default_rng(42)
+    db = SessionLocal()
+    try:
+        (category_id,) = _insert(db, Category, [{"name": f"forecast-{tag}"}], returning=Category.id)
+        product_ids = np.array(_insert(db, Product, [
+            {"categoryId": category_id, "productName": f"Item {i}", "sku": f"{tag}-{i:06d}", "unit": "pcs",
+             "supplierName": "Benchmark", "defaultPrice": 1}
+            for i in range(products)
+        ], returning=Product.id))
+        expiry = datetime.now(timezone.utc) + timedelta(days=365)
+        batch_ids = np.array(_insert(db, StockBatch, [
+            {"productId": int(pid), "batchNumber": f"{tag}-B", "currentQuantity": 0, "expiryDate": expiry}
+            for pid in product_ids
+        ], returning=StockBatch.id))
+
+        # Popularity ~ Zipf; each event lands on a day weighted by the weekday pattern
+        popularity = 1 / np.arange(1, products + 1) ** 0.8
+        popularity = rng.permutation(popularity / popularity.sum())
+        today = datetime.now(timezone.utc).replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+        first_day = today - timedelta(days=365)
+        day_weekdays = (np.arange(365) + first_day.weekday()) % 7
+        day_weights = WEEKDAY_PATTERN[day_weekdays] / WEEKDAY_PATTERN[day_weekdays].sum()
+
+        def draw(n):
+            who = rng.choice(products, size=n, p=popularity)
+            day = np.sort(rng.choice(365, size=n, p=day_weights))
+            seconds = rng.integers(8 * 3600, 21 * 3600, size=n)
+            qty = rng.integers(1, 4, size=n)
+            stamps = [first_day + timedelta(days=int(d), seconds=int(s)) for d, s in zip(day, seconds)]
+            return who, stamps, qty
+
+        # Online orders of ~4 lines each
+        who, stamps, qty = draw(order_lines)
+        order_ids = np.array(_insert(db, Order, [
+            {"user_id": user_id, "total_amount": 0, "current_status": "Paid", "delivery_method": "Store Pickup", "created_at": stamps[i]}
+            for i in range(0, order_lines, 4)
+        ], returning=Order.id))
+        _insert(db, OrderItem, [
+            {"order_id": int(order_ids[i // 4]), "product_id": int(product_ids[w]), "quantity": int(q), "price_at_purchase": 1.0}
+            for i, (w, q) in enumerate(zip(who, qty))
+        ])
+
+        # In-store till sales straight into the ledger
+        who, stamps, qty = draw(store_sales)
+        _insert(db, StockTransaction, [
+            {"batchId": int(batch_ids[w]), "transactionType": "sale", "quantity": int(q), "recordedBy": "Till 1", "timestamp": t}
+            for w, q, t in zip(who, qty, stamps)
+        ])
+        db.commit()
+
+        # Expected units per day: events x mean quantity (2) x popularity / days
+        true_rate = (order_lines + store_sales) * 2 * popularity / 365
+        return category_id, product_ids, true_rate
+    finally:
+        db.close()
+
+
+def cleanup(category_id: int, product_ids):
+    db = SessionLocal()
+    try:
+        ids = [int(p) for p in product_ids]
+        batches = select(StockBatch.id).where(StockBatch.productId.in_(ids))
+        orders = select(OrderItem.order_id).where(OrderItem.product_id.in_(ids))
+        db.execute(delete(StockTransaction).where(StockTransaction.batchId.in_(batches)))
+        order_ids = list(db.scalars(orders.distinct()))
+        db.execute(delete(OrderItem).where(OrderItem.order_id.in_(order_ids)))
+        db.execute(delete(Order).where(Order.id.in_(order_ids)))
+        db.execute(delete(StockBatch).where(StockBatch.productId.in_(ids)))
+        db.execute(delete(DemandForecast).where(DemandForecast.productId.in_(ids)))
+        db.execute(delete(Product).where(Product.id.in_(ids)))
+        db.execute(delete(Category).where(Category.id == category_id))
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--order-lines", type=int, default=1000000)
+    parser.add_argument("--store-sales", type=int, default=250000)
+    parser.add_argument("--budget-mb", type=int, default=32)
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--keep", action="store_true", help="leave the seeded rows in place")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    tag = f"FC{uuid.uuid4().hex[:6]}"
+    started = time.perf_counter()
+    category_id, product_ids, true_rate = seed(args.products, args.order_lines, args.store_sales, args.user_id, tag)
+    seeded_s = time.perf_counter() - started
+
+    db = SessionLocal()
+    try:
+        summary = refresh_forecasts(db, budget_mb=args.budget_mb)
+        # Second, traced run for the memory peak (tracing slows it down too much to time)
+        tracemalloc.start()
+        refresh_forecasts(db, budget_mb=args.budget_mb)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        levels = dict(db.execute(
+            select(DemandForecast.productId, DemandForecast.mean28).where(DemandForecast.productId.in_([int(p) for p in product_ids]))
+        ).all())
+    finally:
+        db.close()
+
+    # The 28-day mean is an unbiased estimate of the true daily rate
+    estimated = np.array([levels.get(int(p), 0.0) for p in product_ids])
+    top = np.argsort(true_rate)[-1000:]
+    report = {
+        "dialect": engine.dialect.name,
+        "products": args.products,
+        "demandEvents": args.order_lines + args.store_sales,
+        "seed_s": round(seeded_s, 1),
+        "pipeline": summary,
+        "peak_traced_mb": round(peak / 2**20, 1),
+        "rate_correlation_top1000": round(float(np.corrcoef(true_rate[top], estimated[top])[0, 1]), 3),
+        "total_units_ratio": round(float(estimated.sum() / true_rate.sum()), 3),
+    }
+    print(json.dumps(report, indent=2), flush=True)
+    if not args.keep:
+        cleanup(category_id, product_ids)
+
+
+if __name__ == "__main__":
+    main()
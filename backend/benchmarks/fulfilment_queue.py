@@ -0,0 +1,185 @@
+# backend/benchmarks/fulfilment_queue.py
+"""
+Concurrency benchmark for the fulfilment queue and status transitions.
+
+Seeds paid orders (half of them home deliveries), then:
+  1. packers   - --workers threads, each claiming --batch orders at a time from the "pack"
+                 stage and moving them to Packed, until the stage is empty;
+  2. drivers   - the same number of threads claiming home deliveries, taking them out for
+                 delivery and delivering them;
+  3. pickups   - every store-pickup order marked collected by bulk transitions of --bulk orders.
+Checks that no order was claimed twice within a stage, that every order ended Delivered with
+one history row per transition and its driver recorded, and reports throughput and latencies.
+The seeded rows are removed afterwards.
+
+Usage (against the DATABASE_URL in the environment, with user 1 present; SQLite serializes
+writers, so the concurrency numbers are only meaningful on Postgres):
+    python -m benchmarks.fulfilment_queue --orders 5000 --workers 8 --batch 10 --bulk 500
+"""
+import argparse
+import json
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, func, insert, select
+from database import Base, SessionLocal, engine, run_with_retry
+from models.orders import Order, OrderStatusHistory, OrderDelivery
+from models.order_summary import OrderSummary
+from services.fulfilment import PAID, PACKED, OUT_FOR_DELIVERY, DELIVERED, claim_orders, transition_orders
+from benchmarks.product_search import percentiles
+
+INSERT_ROWS = 5000
+
+
+def seed(orders: int, user_id: int):
+    start = datetime.now(timezone.utc) - timedelta(days=1)
+    db = SessionLocal()
+    try:
+        order_ids = []
+        for i in range(0, orders, INSERT_ROWS):
+            order_ids.extend(db.execute(insert(Order).returning(Order.id, sort_by_parameter_order=True), [
+                {"user_id": user_id, "current_status": PAID, "total_amount": 10.0, "created_at": start + timedelta(seconds=n),
+                 "delivery_method": "Home Delivery" if n % 2 else "Store Pickup"}
+                for n in range(i, min(orders, i + INSERT_ROWS))
+            ]).scalars())
+        deliveries = order_ids[1::2]
+        for i in range(0, len(order_ids), INSERT_ROWS):
+            db.execute(insert(OrderStatusHistory), [
+                {"order_id": order_id, "status": PAID, "changed_at": start} for order_id in order_ids[i:i + INSERT_ROWS]
+            ])
+        for i in range(0, len(deliveries), INSERT_ROWS):
+            db.execute(insert(OrderDelivery), [
+                {"order_id": order_id, "customer_name": "Benchmark", "delivery_address": f"{order_id} Queue Street"}
+                for order_id in deliveries[i:i + INSERT_ROWS]
+            ])
+        db.commit()
+        return order_ids, deliveries
+    finally:
+        db.close()
+
+
+def cleanup(order_ids):
+    db = SessionLocal()
+    try:
+        for i in range(0, len(order_ids), INSERT_ROWS):
+            chunk = order_ids[i:i + INSERT_ROWS]
+            for model, column in ((OrderSummary, OrderSummary.orderId), (OrderStatusHistory, OrderStatusHistory.order_id),
+                                  (OrderDelivery, OrderDelivery.order_id), (Order, Order.id)):
+                db.execute(delete(model).where(column.in_(chunk)))
+        db.commit()
+    finally:
+        db.close()
+
+
+def run_workers(workers: int, stage: str, batch: int, steps):
+    """
+    Starts `workers` threads that claim from `stage` until it is empty, moving each claimed
+    batch through `steps` (statuses). Returns (claims per order, claim latencies, seconds).
+    """
+    claimed = Counter()
+    latencies = []
+    lock = threading.Lock()
+    errors = []
+
+    def work(name):
+        db = SessionLocal()
+        try:
+            while True:
+                started = time.perf_counter()
+                order_ids = run_with_retry(db, lambda: _commit(db, claim_orders(db, name, stage, batch)))
+                elapsed = (time.perf_counter() - started) * 1000
+                if not order_ids:
+                    return
+                for status in steps:
+                    moved, rejected = run_with_retry(db, lambda: _commit(db, transition_orders(db, order_ids, status, worker=name)))
+                    if rejected:
+                        raise AssertionError(f"{name}: {status} rejected {rejected}")
+                with lock:
+                    latencies.append(elapsed)
+                    claimed.update(order_ids)
+        except Exception as e:  # surfaced after join
+            errors.append(repr(e))
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=work, args=(f"{stage}-{n}",)) for n in range(workers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise SystemExit("\n".join(errors))
+    return claimed, latencies, time.perf_counter() - started
+
+
+def _commit(db, result):
+    db.commit()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=10)
+    parser.add_argument("--bulk", type=int, default=500)
+    parser.add_argument("--user", type=int, default=1)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    order_ids, deliveries = seed(args.orders, args.user)
+    try:
+        packed, pack_latency, pack_s = run_workers(args.workers, "pack", args.batch, [PACKED])
+        driven, drive_latency, drive_s = run_workers(args.workers, "deliver", args.batch, [OUT_FOR_DELIVERY, DELIVERED])
+
+        pickups = sorted(set(order_ids) - set(deliveries))
+        bulk_ms = []
+        db = SessionLocal()
+        try:
+            for i in range(0, len(pickups), args.bulk):
+                started = time.perf_counter()
+                moved, rejected = transition_orders(db, pickups[i:i + args.bulk], DELIVERED)
+                db.commit()
+                bulk_ms.append((time.perf_counter() - started) * 1000)
+                assert not rejected, rejected
+
+            statuses = dict(db.execute(
+                select(Order.current_status, func.count()).where(Order.id.in_(order_ids)).group_by(Order.current_status)
+            ).all())
+            history = Counter(db.scalars(select(OrderStatusHistory.order_id).where(OrderStatusHistory.order_id.in_(order_ids))))
+            without_driver = db.scalar(
+                select(func.count()).select_from(OrderDelivery)
+                .where(OrderDelivery.order_id.in_(deliveries), OrderDelivery.driver_name.is_(None))
+            )
+            db.rollback()
+        finally:
+            db.close()
+    finally:
+        cleanup(order_ids)
+
+    expected_history = {order_id: 3 for order_id in pickups} | {order_id: 4 for order_id in deliveries}
+    checks = {
+        "packed_once": set(packed) == set(order_ids) and max(packed.values()) == 1,
+        "driven_once": set(driven) == set(deliveries) and max(driven.values()) == 1,
+        "all_delivered": statuses == {DELIVERED: len(order_ids)},
+        "history_rows_match": history == Counter(expected_history),
+        "drivers_assigned": without_driver == 0,
+    }
+    print(json.dumps({
+        "dialect": engine.dialect.name,
+        "orders": args.orders,
+        "workers": args.workers,
+        "batch": args.batch,
+        "pack": {"orders_per_s": round(len(packed) / pack_s), "claim": percentiles(pack_latency)},
+        "deliver": {"orders_per_s": round(len(driven) / drive_s), "claim": percentiles(drive_latency)},
+        "bulk_transition": {"orders": args.bulk, **percentiles(bulk_ms)},
+        "checks": checks,
+    }, indent=2))
+    if not all(checks.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# backend/benchmarks/ledger_archive.py
+"""
+Ledger rollover benchmark: recent-window reads before and after archiving old months.
+
+Seeds --rows stock_transactions spread evenly over the last --months months (a stock_in per
+batch, then sales) with batch quantities matching the ledger. It times GET /api/transactions/
+reads (first page, one batch's page, the last 7 days, a page from a year ago), archives every
+month older than LEDGER_HOT_MONTHS, and times the same reads again. It then exports and verifies
+each archived month and reconciles the stock levels, which must find no drift: on-hand totals
+have to come out the same from the archived months' totals.
+
+Archiving moves every old ledger row in the database, so run it against a scratch database.
+
+Usage (DATABASE_URL unset: a throwaway SQLite file):
+    python -m benchmarks.ledger_archive --rows 1000000 --months 12
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "ledger_archive.db"))
+
+from datetime import datetime, timedelta, timezone  # noqa: E402
+from fastapi import Response  # noqa: E402
+from sqlalchemy import func, insert, select, update  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+import models  # noqa: E402,F401  (registers every table)
+from models.category import Category  # noqa: E402
+from models.product import Product  # noqa: E402
+from models.batch import StockBatch  # noqa: E402
+from models.transaction import StockTransaction  # noqa: E402
+from models.ledger_archive import LedgerArchive  # noqa: E402
+from APIs.routers import read_transactions  # noqa: E402
+from services import ledger_archive  # noqa: E402
+from services.stock_levels import reconcile_stock_levels  # noqa: E402
+from benchmarks.product_search import percentiles  # noqa: E402
+
+INSERT_ROWS = 10000
+
+
+def seed(rows: int, months: int, batches: int):
+    rng = random.Random(7)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    start = now - timedelta(days=30 * months)
+    db = SessionLocal()
+    try:
+        (category_id,) = db.execute(insert(Category).returning(Category.id), [{"name": "ledger-bench"}]).scalars()
+        (product_id,) = db.execute(insert(Product).returning(Product.id), [{
+            "categoryId": category_id, "productName": "Ledger bench", "sku": "LEDGER-BENCH", "unit": "pcs",
+            "supplierName": "Benchmark", "defaultPrice": 1,
+        }]).scalars()
+        batch_ids = db.execute(insert(StockBatch).returning(StockBatch.id, sort_by_parameter_order=True), [
+            {"productId": product_id, "batchNumber": f"LEDGER-{n}", "currentQuantity": 0, "retailPrice": 1,
+             "expiryDate": now + timedelta(days=400)}
+            for n in range(batches)
+        ]).scalars().all()
+
+        on_hand = {batch_id: 10 ** 7 for batch_id in batch_ids}
+        db.execute(insert(StockTransaction), [
+            {"batchId": batch_id, "transactionType": "stock_in", "quantity": 10 ** 7, "recordedBy": "bench", "timestamp": start}
+            for batch_id in batch_ids
+        ])
+        step = (now - start) / rows
+        chunk = []
+        for n in range(rows - batches):
+            batch_id = rng.choice(batch_ids)
+            quantity = rng.randint(1, 3)
+            on_hand[batch_id] -= quantity
+            chunk.append({"batchId": batch_id, "transactionType": "sale", "quantity": quantity, "recordedBy": "bench till",
+                          "timestamp": start + step * (n + batches)})
+            if len(chunk) == INSERT_ROWS:
+                db.execute(insert(StockTransaction), chunk)
+                chunk = []
+        if chunk:
+            db.execute(insert(StockTransaction), chunk)
+        for batch_id, quantity in on_hand.items():
+            db.execute(update(StockBatch).where(StockBatch.id == batch_id).values(currentQuantity=quantity))
+        db.commit()
+        return batch_ids
+    finally:
+        db.close()
+
+
+def reads(db, batch_id: int, runs: int) -> dict:
+    now = datetime.now(timezone.utc)
+
+    def call(**filters):
+        started = time.perf_counter()
+        read_transactions(Response(), cursor=None, limit=100, batchId=filters.get("batchId"), transactionType=None,
+                          since=filters.get("since"), until=filters.get("until"), db=db)
+        db.rollback()
+        return (time.perf_counter() - started) * 1000
+
+    cases = {
+        "first_page": {},
+        "batch_page": {"batchId": batch_id},
+        "last_7_days": {"since": now - timedelta(days=7)},
+        "year_ago_page": {"since": now - timedelta(days=365), "until": now - timedelta(days=360)},
+    }
+    return {name: percentiles([call(**filters) for _ in range(runs)]) for name, filters in cases.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--batches", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--export-dir", default=os.path.join(tempfile.gettempdir(), "ledger-archive-bench"))
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    batch_ids = seed(args.rows, args.months, args.batches)
+    report = {"dialect": engine.dialect.name, "rows": args.rows, "months": args.months,
+              "seed_s": round(time.perf_counter() - started, 1)}
+
+    db = SessionLocal()
+    try:
+        report["before"] = reads(db, batch_ids[0], args.runs)
+
+        started = time.perf_counter()
+        archived = ledger_archive.archive_due(db)
+        report["archive_s"] = round(time.perf_counter() - started, 1)
+        report["archived_rows"] = sum(archived["stock_transactions"].values())
+        report["hot_rows"] = db.scalar(select(func.count()).select_from(StockTransaction))
+        report["after"] = reads(db, batch_ids[0], args.runs)
+
+        months = db.scalars(select(LedgerArchive.month).where(LedgerArchive.tableName == "stock_transactions")).all()
+        started = time.perf_counter()
+        for month in months:
+            ledger_archive.export_month(db, "stock_transactions", month, args.export_dir)
+        report["export_s"] = round(time.perf_counter() - started, 1)
+        verified = [ledger_archive.verify_month(db, month) for month in months]
+        drift = reconcile_stock_levels(db)
+    finally:
+        db.close()
+
+    report["checks"] = {
+        "months_verified": all(not v["mismatchedBatches"] and v["exportMatches"] for v in verified),
+        "no_stock_drift": drift["driftedBatches"] == 0,
+        "rows_conserved": report["archived_rows"] + report["hot_rows"] == args.rows,
+    }
+    print(json.dumps(report, indent=2))
+    if not all(report["checks"].values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+# backend/benchmarks/load.py
+"""
+Load test of the whole backend: seeded catalog, concurrent clients, JSON report, baseline compare.
+
+Seeds a realistic data set once per --tag (categories, products, several stock batches per
+product with a ledger history behind each, and a filled cart per --users id), then runs
+--concurrency clients for --duration seconds. Each client repeatedly picks a scenario by --mix
+weight, from a random generator seeded with --seed and its client number, so two runs issue
+the same sequence of requests:
+
+  catalog   GET /api/categories/, GET /api/products/?categoryId=, GET /api/products/search
+  stock     POST /api/transactions/ (a sale), GET /api/transactions/?batchId=
+  checkout  POST /cart/add (1-3 lines), GET /cart/, POST /orders/checkout, GET /orders/{id}
+
+Requests go to main.app in-process (httpx over ASGI, no sockets) by default, to a uvicorn server
+started here with --serve, or to a running server at --url. The report has overall throughput
+and, per step, request count, errors, p50/p95/p99 latency and SQL statements (from the
+X-SQL-Statements header). In-process and --serve runs read the cart user from an X-Bench-User
+header, so every --users id has its own cart; a server at --url sees user 1 only, so give it a
+single --users id. Checkouts of one user never overlap (they would share the cart).
+
+--compare checks a run (or the saved report given with --against) against a baseline report
+and exits non-zero on a regression: a step's p95 up by more than --tolerance percent (and by at
+least --min-delta-ms), overall throughput down by more than --tolerance percent, a step issuing
+more SQL statements than before, or a higher error rate.
+
+Usage (DATABASE_URL unset: a throwaway SQLite file, which serializes writes; point it at a scratch
+Postgres database for real numbers, with the --users ids present in users):
+    python -m benchmarks.load --concurrency 32 --duration 30 --output baseline.json
+    python -m benchmarks.load --concurrency 32 --duration 30 --compare baseline.json
+    python -m benchmarks.load --compare baseline.json --against candidate.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "load.db"))
+
+from datetime import datetime, timedelta, timezone  # noqa: E402
+import httpx  # noqa: E402
+from fastapi import Request  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+from database import SessionLocal, engine  # noqa: E402
+from main import app  # noqa: E402
+from migrations import upgrade  # noqa: E402
+from models.category import Category  # noqa: E402
+from models.product import Product  # noqa: E402
+from models.batch import StockBatch  # noqa: E402
+from models.transaction import StockTransaction  # noqa: E402
+from APIs.cart import get_current_user  # noqa: E402
+from services.cart_store import write_carts  # noqa: E402
+from services.query_stats import STATEMENT_HEADER  # noqa: E402
+from services.stock_levels import refresh_stock_levels  # noqa: E402
+from benchmarks.async_vs_sync import start_server  # noqa: E402
+from benchmarks.product_search import percentiles  # noqa: E402
+
+INSERT_ROWS = 5000
+BENCH_USER_HEADER = "X-Bench-User"
+SEARCH_TERMS = ["milk", "bread", "rice", "apple", "tea", "oil", "sugar", "cheese", "soap", "juice"]
+UNITS = ["pcs", "kg", "l", "pack"]
+
+
+# --- Data -------------------------------------------------------------------
+
+def seed(tag: str, categories: int, products_per_category: int, batches_per_product: int,
+         history: int, users, cart_items: int):
+    """
+    Creates the data set for `tag` unless it is already there. Returns (product, batch, category ids).
+    """
+    upgrade(engine)
+    db = SessionLocal()
+    try:
+        category_ids = db.scalars(select(Category.id).where(Category.name.like(f"load-{tag}-%"))).all()
+        if not category_ids:
+            category_ids = _seed_catalog(db, tag, categories, products_per_category, batches_per_product, history)
+        product_ids = db.scalars(select(Product.id).where(Product.categoryId.in_(category_ids)).order_by(Product.id)).all()
+        batch_ids = db.scalars(select(StockBatch.id).where(StockBatch.productId.in_(product_ids)).order_by(StockBatch.id)).all()
+
+        # Every user starts from a filled cart (write_carts commits)
+        rng = random.Random(tag)
+        write_carts(db, {uid: {pid: rng.randint(1, 3) for pid in rng.sample(product_ids, min(cart_items, len(product_ids)))}
+                         for uid in users})
+        return product_ids, batch_ids, category_ids
+    finally:
+        db.close()
+
+
+def _seed_catalog(db, tag: str, categories: int, products_per_category: int, batches_per_product: int, history: int):
+    rng = random.Random(tag)
+    now = datetime.now(timezone.utc)
+    category_ids = db.execute(insert(Category).returning(Category.id, sort_by_parameter_order=True), [
+        {"name": f"load-{tag}-{c}"} for c in range(categories)
+    ]).scalars().all()
+
+    products = [
+        {"categoryId": category_id, "productName": f"{rng.choice(SEARCH_TERMS).title()} {tag} {c}-{n}",
+         "sku": f"LOAD-{tag}-{c}-{n}", "unit": rng.choice(UNITS), "supplierName": f"Supplier {rng.randint(1, 40)}",
+         "defaultPrice": round(rng.uniform(0.5, 30), 2)}
+        for c, category_id in enumerate(category_ids) for n in range(products_per_category)
+    ]
+    product_ids = []
+    for i in range(0, len(products), INSERT_ROWS):
+        product_ids += db.execute(insert(Product).returning(Product.id, sort_by_parameter_order=True), products[i:i + INSERT_ROWS]).scalars().all()
+
+    # Plenty of stock, so sales and checkouts never run a batch dry during a run
+    batches = [
+        {"productId": pid, "batchNumber": f"LOAD-{tag}-{pid}-{n}", "currentQuantity": 100000,
+         "retailPrice": round(rng.uniform(0.5, 30), 2), "expiryDate": now + timedelta(days=rng.randint(20, 365))}
+        for pid in product_ids for n in range(batches_per_product)
+    ]
+    batch_ids = []
+    for i in range(0, len(batches), INSERT_ROWS):
+        batch_ids += db.execute(insert(StockBatch).returning(StockBatch.id, sort_by_parameter_order=True), batches[i:i + INSERT_ROWS]).scalars().all()
+
+    # Ledger history: the delivery of each batch, then sales spread over the last 90 days
+    rows = []
+    for batch_id in batch_ids:
+        sales = [rng.randint(1, 5) for _ in range(history)]
+        received = now - timedelta(days=90)
+        rows.append({"batchId": batch_id, "transactionType": "stock_in", "quantity": 100000 + sum(sales),
+                     "recordedBy": "load seed", "timestamp": received})
+        rows += [{"batchId": batch_id, "transactionType": "sale", "quantity": quantity, "recordedBy": "load seed",
+                  "timestamp": received + timedelta(minutes=rng.randint(1, 90 * 24 * 60))} for quantity in sales]
+        if len(rows) >= INSERT_ROWS:
+            db.execute(insert(StockTransaction), rows)
+            rows = []
+    if rows:
+        db.execute(insert(StockTransaction), rows)
+
+    refresh_stock_levels(db, product_ids=product_ids)
+    db.commit()
+    return category_ids
+
+
+def bench_user(request: Request) -> int:
+    return int(request.headers.get(BENCH_USER_HEADER, "1"))
+
+
+def bench_app():
+    """
+    uvicorn factory for --serve: main.app with the cart user taken from the X-Bench-User header.
+    """
+    app.dependency_overrides[get_current_user] = bench_user
+    return app
+
+
+# --- Scenarios --------------------------------------------------------------
+
+class Client:
+    """
+    One virtual user's session: records latency, status and SQL statements of every step.
+    """
+    def __init__(self, http: httpx.AsyncClient, user_id: int, rng: random.Random, data, stats):
+        self.http = http
+        self.user_id = user_id
+        self.rng = rng
+        self.product_ids, self.batch_ids, self.category_ids = data
+        self.stats = stats
+
+    async def call(self, method: str, step: str, url: str = None, expect=(200,), **kwargs):
+        headers = {BENCH_USER_HEADER: str(self.user_id), **kwargs.pop("headers", {})}
+        started = time.perf_counter()
+        try:
+            response = await self.http.request(method, url or step, headers=headers, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        elapsed = (time.perf_counter() - started) * 1000
+        entry = self.stats.setdefault(f"{method} {step}", {"latencies": [], "statements": [], "errors": {}})
+        entry["latencies"].append(elapsed)
+        if response is None or response.status_code not in expect:
+            status = "connection" if response is None else str(response.status_code)
+            entry["errors"][status] = entry["errors"].get(status, 0) + 1
+            return None
+        statements = response.headers.get(STATEMENT_HEADER)
+        if statements is not None:
+            entry["statements"].append(int(statements))
+        return response
+
+
+async def catalog(client: Client, user_lock):
+    await client.call("GET", "/api/categories/")
+    await client.call("GET", "/api/products/", params={"categoryId": client.rng.choice(client.category_ids), "limit": 50})
+    await client.call("GET", "/api/products/search", params={"q": client.rng.choice(SEARCH_TERMS)})
+
+
+async def stock(client: Client, user_lock):
+    batch_id = client.rng.choice(client.batch_ids)
+    await client.call("POST", "/api/transactions/", expect=(200, 201), json={
+        "batchId": batch_id, "transactionType": "sale", "quantity": 1, "recordedBy": "load test",
+    })
+    await client.call("GET", "/api/transactions/", params={"batchId": batch_id, "limit": 20})
+
+
+async def checkout(client: Client, user_lock):
+    async with user_lock:
+        for product_id in client.rng.sample(client.product_ids, client.rng.randint(1, 3)):
+            await client.call("POST", "/cart/add", json={"product_id": product_id, "quantity": client.rng.randint(1, 2)})
+        await client.call("GET", "/cart/")
+        response = await client.call("POST", "/orders/checkout", headers={"Idempotency-Key": uuid.uuid4().hex})
+    if response is not None:
+        order_id = response.json()["order_id"]
+        await client.call("GET", "/orders/{order_id}", f"/orders/{order_id}")
+
+
+SCENARIOS = {"catalog": catalog, "stock": stock, "checkout": checkout}
+
+
+async def drive(http: httpx.AsyncClient, args, data) -> dict:
+    stats, flows = {}, {name: 0 for name in SCENARIOS}
+    names, weights = zip(*args.mix.items())
+    user_locks = {uid: asyncio.Lock() for uid in args.users}
+    deadline = time.perf_counter() + args.duration
+
+    async def run_client(n: int):
+        user_id = args.users[n % len(args.users)]
+        client = Client(http, user_id, random.Random(args.seed * 100003 + n), data, stats)
+        while time.perf_counter() < deadline:
+            name = client.rng.choices(names, weights)[0]
+            await SCENARIOS[name](client, user_locks[user_id])
+            flows[name] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_client(n) for n in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    steps = {}
+    for step, entry in sorted(stats.items()):
+        count = len(entry["latencies"])
+        steps[step] = {
+            "requests": count,
+            "errors": sum(entry["errors"].values()),
+            "error_statuses": entry["errors"],
+            "rps": round(count / elapsed, 1),
+            **percentiles(entry["latencies"]),
+            "sql_mean": round(sum(entry["statements"]) / len(entry["statements"]), 2) if entry["statements"] else None,
+            "sql_max": max(entry["statements"], default=None),
+        }
+    requests = sum(step["requests"] for step in steps.values())
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "requests": requests,
+        "errors": sum(step["errors"] for step in steps.values()),
+        "throughput_rps": round(requests / elapsed, 1),
+        "flows": flows,
+        "steps": steps,
+    }
+
+
+async def run_in_process(args, data) -> dict:
+    bench_app()
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with app.router.lifespan_context(app):
+        # A 500 is reported like it would be over HTTP, not raised into the client
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load", limits=limits, timeout=60) as http:
+            return await drive(http, args, data)
+
+
+async def run_http(args, data, url: str) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as http:
+        return await drive(http, args, data)
+
+
+# --- Comparison -------------------------------------------------------------
+
+def compare(baseline: dict, current: dict, tolerance: float, min_delta_ms: float):
+    """
+    Returns the regressions of `current` against `baseline` as readable lines (empty: none).
+    """
+    regressions = []
+    floor = baseline["throughput_rps"] * (1 - tolerance / 100)
+    if current["throughput_rps"] < floor:
+        regressions.append(f"throughput {current['throughput_rps']} rps, baseline {baseline['throughput_rps']} rps")
+    for step, before in baseline["steps"].items():
+        after = current["steps"].get(step)
+        if after is None or not after["requests"]:
+            continue
+        delta = after["p95_ms"] - before["p95_ms"]
+        if delta > min_delta_ms and after["p95_ms"] > before["p95_ms"] * (1 + tolerance / 100):
+            regressions.append(f"{step}: p95 {after['p95_ms']} ms, baseline {before['p95_ms']} ms")
+        if before["sql_max"] is not None and after["sql_max"] is not None and after["sql_max"] > before["sql_max"]:
+            regressions.append(f"{step}: {after['sql_max']} SQL statements, baseline {before['sql_max']}")
+        if after["errors"] / after["requests"] > before["errors"] / max(before["requests"], 1):
+            regressions.append(f"{step}: {after['errors']}/{after['requests']} errors, baseline {before['errors']}/{before['requests']}")
+    return regressions
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r} (one of {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20, help="seconds")
+    parser.add_argument("--mix", type=parse_mix, default="catalog=6,stock=2,checkout=2", help="scenario weights")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--users", type=int, nargs="+", default=[1], help="user ids the clients shop as")
+    parser.add_argument("--tag", default="v1", help="names the seeded data set; an existing one is reused")
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--products-per-category", type=int, default=50)
+    parser.add_argument("--batches-per-product", type=int, default=3)
+    parser.add_argument("--history", type=int, default=20, help="ledger rows per batch")
+    parser.add_argument("--cart-items", type=int, default=5)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="drive a running server instead of main.app in-process")
+    target.add_argument("--serve", action="store_true", help="start uvicorn on --port and drive it over HTTP")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--compare", help="baseline report to check against")
+    parser.add_argument("--against", help="saved report to compare instead of running")
+    parser.add_argument("--tolerance", type=float, default=10, help="percent")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    if args.against:
+        if not args.compare:
+            parser.error("--against needs --compare")
+        with open(args.against) as f:
+            report = json.load(f)
+    else:
+        data = seed(args.tag, args.categories, args.products_per_category, args.batches_per_product,
+                    args.history, args.users, args.cart_items)
+        product_ids, batch_ids, _ = data
+
+        if args.serve:
+            server = start_server(os.getenv("USE_ASYNC_DB", "false").lower() == "true", args.port,
+                                  app="benchmarks.load:bench_app", factory=True)
+            try:
+                results = asyncio.run(run_http(args, data, f"http://127.0.0.1:{args.port}"))
+            finally:
+                server.terminate()
+                server.wait()
+        elif args.url:
+            results = asyncio.run(run_http(args, data, args.url))
+        else:
+            results = asyncio.run(run_in_process(args, data))
+
+        report = {
+            "target": args.url or ("uvicorn" if args.serve else "in-process"),
+            "database": engine.dialect.name,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "mix": args.mix,
+            "seed": args.seed,
+            "data": {"products": len(product_ids), "batches": len(batch_ids), "ledger_rows_per_batch": args.history + 1},
+            **results,
+        }
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        report["regressions"] = compare(baseline, report, args.tolerance, args.min_delta_ms)
+    print(json.dumps(report, indent=2))
+    if report.get("regressions"):
+        print("\n".join(report["regressions"]), file=sys.stderr)
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# backend/benchmarks/metrics_overhead.py
+"""
+Overhead of the request instrumentation (RequestMetricsMiddleware and the SQL timing events).
+
+Calls the ASGI app in-process (no sockets, so the comparison is not drowned in network noise)
+for a few read routes, alternating in short blocks between the app's full middleware stack and
+the same stack without RequestMetricsMiddleware and with the engine listeners removed (so drift
+in the database or the machine hits both sides alike), and reports the latency of each plus the
+relative overhead at p50. The first request after each switch is not counted: adding or removing
+engine listeners makes SQLAlchemy rebuild its event dispatch on the next execution. Exits non-zero when the median overhead is above --max-overhead percent.
+
+Usage (against the DATABASE_URL in the environment, with some catalog data loaded):
+    python -m benchmarks.metrics_overhead --requests 2000 --max-overhead 2
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from main import app
+from services import query_stats
+from services.query_stats import RequestMetricsMiddleware
+from benchmarks.product_search import percentiles
+
+PATHS = ["/api/products/", "/api/transactions/", "/api/stock-levels", "/test-db"]
+BLOCK = 20
+LISTENERS = [
+    ("before_cursor_execute", query_stats._start_statement),
+    ("after_cursor_execute", query_stats._end_statement),
+    ("handle_error", query_stats._failed_statement),
+]
+
+
+@contextmanager
+def uninstrumented():
+    for name, fn in LISTENERS:
+        event.remove(Engine, name, fn)
+    try:
+        yield
+    finally:
+        for name, fn in LISTENERS:
+            event.listen(Engine, name, fn)
+
+
+async def request(asgi, path: str) -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 0), "server": ("bench", 80),
+        "app": app,
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await asgi(scope, receive, send)
+    return status
+
+
+async def timed_request(asgi, path: str) -> float:
+    started = time.perf_counter()
+    status = await request(asgi, path)
+    elapsed = (time.perf_counter() - started) * 1000
+    if status != 200:
+        raise SystemExit(f"GET {path} returned {status}")
+    return elapsed
+
+
+def middleware_stacks():
+    # The app's full stack (CORS, error handling, routing), with and without RequestMetricsMiddleware
+    instrumented = app.build_middleware_stack()
+    configured = app.user_middleware
+    app.user_middleware = [m for m in configured if m.cls is not RequestMetricsMiddleware]
+    try:
+        bare = app.build_middleware_stack()
+    finally:
+        app.user_middleware = configured
+    return instrumented, bare
+
+
+async def measure(path: str, count: int):
+    instrumented, bare = middleware_stacks()
+    for _ in range(50):  # Warm caches and the pool
+        await timed_request(instrumented, path)
+    on, off = [], []
+    for _ in range(max(1, count // BLOCK)):
+        await timed_request(instrumented, path)
+        on += [await timed_request(instrumented, path) for _ in range(BLOCK)]
+        with uninstrumented():
+            await timed_request(bare, path)
+            off += [await timed_request(bare, path) for _ in range(BLOCK)]
+    on_p50, off_p50 = statistics.median(on), statistics.median(off)
+    return {
+        "instrumented": percentiles(on),
+        "bare": percentiles(off),
+        "overhead_pct": round((on_p50 - off_p50) / off_p50 * 100, 2),
+    }
+
+
+async def main_async(args):
+    async with app.router.lifespan_context(app):
+        return {path: await measure(path, args.requests) for path in PATHS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per route and side")
+    parser.add_argument("--max-overhead", type=float, default=2.0, help="Percent")
+    args = parser.parse_args()
+
+    routes = asyncio.run(main_async(args))
+    overhead = statistics.median(route["overhead_pct"] for route in routes.values())
+    print(json.dumps({"routes": routes, "median_overhead_pct": overhead, "max_overhead_pct": args.max_overhead}, indent=2))
+    if overhead > args.max_overhead:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
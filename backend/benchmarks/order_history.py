@@ -0,0 +1,130 @@
+# backend/benchmarks/order_history.py
+"""
+Order history read benchmark.
+
+Seeds one user with 2,000 orders (plus the same number spread over other users) and their
+summary rows, then times the first page of GET /orders/, a deep page reached by cursor and
+GET /orders/{id}, counting the SQL statements of each. On Postgres it also prints the plan of
+the first-page query, which should be a single index scan of ix_order_summaries_user_created.
+The seeded rows are removed afterwards.
+
+Usage (against the DATABASE_URL in the environment; user ids --user and above must exist
+in users when the database enforces the foreign key):
+    python -m benchmarks.order_history --orders 2000 --user 1
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from fastapi import Response
+from sqlalchemy import delete, insert, select, text
+from database import Base, SessionLocal, engine
+from models.orders import Order
+from models.order_summary import OrderSummary
+from APIs.orders import read_orders, read_order
+from services.query_stats import count_statements
+from benchmarks.product_search import percentiles
+
+INSERT_ROWS = 5000
+
+
+def seed(user_id: int, orders: int, other_users):
+    rng = random.Random(42)
+    start = datetime.now(timezone.utc) - timedelta(days=730)
+    owners = [user_id] * orders + [rng.choice(other_users) for _ in range(orders)] if other_users else [user_id] * orders
+    rng.shuffle(owners)
+    db = SessionLocal()
+    try:
+        order_ids = []
+        for i in range(0, len(owners), INSERT_ROWS):
+            chunk = owners[i:i + INSERT_ROWS]
+            rows = [
+                {"user_id": owner, "current_status": "Delivered", "delivery_method": "Store Pickup",
+                 "total_amount": round(rng.uniform(5, 120), 2), "created_at": start + timedelta(minutes=30 * (i + n))}
+                for n, owner in enumerate(chunk)
+            ]
+            ids = list(db.execute(insert(Order).returning(Order.id, sort_by_parameter_order=True), rows).scalars())
+            order_ids.extend(ids)
+            db.execute(insert(OrderSummary), [
+                {"orderId": order_id, "userId": row["user_id"], "createdAt": row["created_at"], "status": row["current_status"],
+                 "statusChangedAt": row["created_at"], "deliveryMethod": row["delivery_method"], "totalAmount": row["total_amount"],
+                 "lineCount": 3, "itemCount": 5,
+                 "lines": [{"productId": n, "productName": f"Item {n}", "quantity": 1, "priceAtPurchase": 1.0} for n in range(3)],
+                 "history": [{"status": "Delivered", "changedAt": row["created_at"].isoformat()}], "delivery": None}
+                for order_id, row in zip(ids, rows)
+            ])
+        db.commit()
+        return order_ids
+    finally:
+        db.close()
+
+
+def cleanup(order_ids):
+    db = SessionLocal()
+    try:
+        for i in range(0, len(order_ids), INSERT_ROWS):
+            chunk = order_ids[i:i + INSERT_ROWS]
+            db.execute(delete(OrderSummary).where(OrderSummary.orderId.in_(chunk)))
+            db.execute(delete(Order).where(Order.id.in_(chunk)))
+        db.commit()
+    finally:
+        db.close()
+
+
+def timed(fn, runs):
+    samples, statements = [], 0
+    for _ in range(runs):
+        with count_statements() as counter:
+            started = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - started) * 1000)
+        statements = max(statements, counter.count)
+    return dict(percentiles(samples), statements=statements)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--user", type=int, default=1)
+    parser.add_argument("--other-users", type=int, nargs="*", default=[], help="user ids to give the background orders to")
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    order_ids = seed(args.user, args.orders, args.other_users)
+    db = SessionLocal()
+    try:
+        def page(cursor=None):
+            response = Response()
+            rows = read_orders(response, cursor=cursor, limit=20, status=None, db=db, user_id=args.user)
+            db.rollback()
+            return rows, response.headers.get("X-Next-Cursor")
+
+        # Walk half-way down the history to get a deep cursor
+        cursor = None
+        for _ in range(args.orders // 40):
+            _, cursor = page(cursor)
+        newest = page()[0][0]["orderId"]
+
+        report = {
+            "dialect": engine.dialect.name,
+            "orders_for_user": args.orders,
+            "first_page": timed(lambda: page(), args.runs),
+            "deep_page": timed(lambda: page(cursor), args.runs),
+            "detail": timed(lambda: (read_order(newest, db=db, user_id=args.user), db.rollback()), args.runs),
+        }
+        if engine.dialect.name == "postgresql":
+            stmt = (select(OrderSummary.orderId).where(OrderSummary.userId == args.user)
+                    .order_by(OrderSummary.createdAt.desc(), OrderSummary.orderId.desc()).limit(21))
+            sql = str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+            report["first_page_plan"] = [line for (line,) in db.execute(text("EXPLAIN " + sql))]
+    finally:
+        db.close()
+        cleanup(order_ids)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# backend/benchmarks/product_search.py
+"""
+Latency benchmark for product search and autocomplete.
+
+Seeds a synthetic catalog (200k SKUs by default) and times `suggest_products` with random
+1-4 character prefixes and `search_products` with random words, typos and SKU fragments,
+in-process, so only the database + ranking cost is measured. Fails if autocomplete p99
+exceeds the budget. The seeded rows are removed afterwards.
+
+Usage (against the DATABASE_URL in the environment):
+    python -m benchmarks.product_search --products 200000 --queries 2000 --budget-ms 20
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+import uuid
+from sqlalchemy import insert, delete, text
+from database import Base, SessionLocal, engine
+from models.category import Category
+from models.product import Product
+from services.search import search_products, suggest_products
+
+ADJECTIVES = ["organic", "fresh", "frozen", "smoked", "roasted", "spicy", "sweet", "salted", "low fat", "wholegrain",
+              "premium", "classic", "golden", "crispy", "creamy", "natural", "family", "mini", "jumbo", "light"]
+NOUNS = ["apples", "bananas", "mango", "pineapple", "basmati rice", "red lentils", "coconut milk", "cheddar",
+         "yoghurt", "bread", "biscuits", "chicken", "sausages", "tuna", "sardines", "tea", "coffee", "noodles",
+         "chili powder", "curry paste", "butter", "ghee", "papadam", "cashews", "ice cream", "orange juice"]
+SUPPLIERS = ["Keells", "Maliban", "Elephant House", "Prima", "Munchee", "Anchor", "Harischandra", "Pelwatte"]
+UNITS = ["kg", "g", "pcs", "l", "ml", "pack"]
+
+
+def seed(products: int, tag: str):
+    rng = random.Random(42)
+    db = SessionLocal()
+    try:
+        category_ids = list(db.execute(
+            insert(Category).returning(Category.id), [{"name": f"search-{tag}-{i}"} for i in range(25)]
+        ).scalars())
+        rows = []
+        for i in range(products):
+            name = f"{rng.choice(SUPPLIERS)} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {rng.choice([100, 250, 400, 500, 1000])}{rng.choice(UNITS)}"
+            rows.append({
+                "categoryId": rng.choice(category_ids), "productName": name.title(), "sku": f"{tag}-{i:07d}",
+                "unit": rng.choice(UNITS), "supplierName": rng.choice(SUPPLIERS),
+                "description": f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} sourced locally", "defaultPrice": 100,
+            })
+            if len(rows) == 10000:
+                db.execute(insert(Product), rows)
+                rows = []
+        if rows:
+            db.execute(insert(Product), rows)
+        db.commit()
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text("ANALYZE products"))
+            db.commit()
+        return category_ids
+    finally:
+        db.close()
+
+
+def cleanup(tag: str, category_ids):
+    db = SessionLocal()
+    try:
+        db.execute(delete(Product).where(Product.sku.like(f"{tag}-%")))
+        db.execute(delete(Category).where(Category.id.in_(category_ids)))
+        db.commit()
+    finally:
+        db.close()
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda p: ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+    return {
+        "p50_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(pick(0.95), 3),
+        "p99_ms": round(pick(0.99), 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def timed(fn, queries):
+    db = SessionLocal()
+    try:
+        fn(db, queries[0])  # warm-up (also builds the in-process index on SQLite)
+        samples = []
+        for q in queries:
+            started = time.perf_counter()
+            fn(db, q)
+            samples.append((time.perf_counter() - started) * 1000)
+        return samples
+    finally:
+        db.close()
+
+
+def typo(word: str, rng: random.Random) -> str:
+    i = rng.randrange(1, len(word) - 1)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--budget-ms", type=float, default=20.0, help="autocomplete p99 budget")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    tag = f"SRCH{uuid.uuid4().hex[:6]}"
+    started = time.perf_counter()
+    category_ids = seed(args.products, tag)
+    seeded_s = time.perf_counter() - started
+
+    try:
+        rng = random.Random(7)
+        vocabulary = [w for phrase in ADJECTIVES + NOUNS + SUPPLIERS for w in phrase.split()]
+        prefixes = [w[:rng.randint(1, 4)] for w in (rng.choice(vocabulary) for _ in range(args.queries))]
+        searches = [
+            rng.choice([
+                lambda: rng.choice(vocabulary),
+                lambda: f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)[:4]}",
+                lambda: typo(rng.choice([w for w in vocabulary if len(w) > 4]), rng),
+                lambda: f"{tag}-{rng.randrange(args.products):07d}"[:-2],
+            ])()
+            for _ in range(args.queries // 4)
+        ]
+
+        autocomplete = timed(lambda db, q: suggest_products(db, q, 10), prefixes)
+        search = timed(lambda db, q: search_products(db, q, limit=20), searches)
+    finally:
+        cleanup(tag, category_ids)
+
+    report = {
+        "dialect": engine.dialect.name,
+        "products": args.products,
+        "seed_s": round(seeded_s, 2),
+        "autocomplete": dict(queries=len(prefixes), **percentiles(autocomplete)),
+        "search": dict(queries=len(searches), **percentiles(search)),
+        "budget_ms": args.budget_ms,
+    }
+    print(json.dumps(report, indent=2))
+    if report["autocomplete"]["p99_ms"] > args.budget_ms:
+        raise SystemExit(f"Autocomplete p99 {report['autocomplete']['p99_ms']} ms is over the {args.budget_ms} ms budget")
+
+
+if __name__ == "__main__":
+    main()
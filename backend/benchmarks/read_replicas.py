@@ -0,0 +1,222 @@
+# backend/benchmarks/read_replicas.py
+"""
+Multi-worker serving with a read replica: read-your-writes, replica routing and rolling reloads.
+
+Starts `uvicorn main:app --workers N` against DATABASE_URL (primary) and REPLICA_DATABASE_URL
+and drives it over HTTP, one connection per request so consecutive requests land on different
+workers. For each read-only area (catalog, transaction listing, order history) a client writes,
+then:
+  read_your_writes  every read by the writing client within the window sees its write
+  stale_reads       reads by another client that came back without the write (served by the replica)
+  converged_ms      time until the other client sees the write too, once the replica caught up
+Finally SIGHUP makes uvicorn replace its workers one by one while clients keep reading; every
+request during the reload must still succeed.
+
+Two SQLite files stand in for a primary and a streaming replica: the replica is refreshed from
+the primary (SQLite backup) only when the script says so, so stale_reads must be all of the
+other client's reads. Against Postgres streaming replication the refresh just waits for the
+replica to replay the primary's WAL, and stale_reads is whatever the replication lag allowed.
+With more than one worker, CATALOG_CACHE_BUS=redis (and REDIS_URL) is what lets the catalog
+converge before CATALOG_CACHE_TTL runs out.
+
+Exits non-zero when a write is not read back, SQLite routing misses the replica, a read never
+converges, or a request fails during the reload.
+
+Usage (DATABASE_URL / REPLICA_DATABASE_URL unset: two throwaway SQLite files; on Postgres, user 1
+must exist on the primary):
+    CART_STORE=redis CATALOG_CACHE_BUS=redis python -m benchmarks.read_replicas --workers 4
+"""
+import argparse
+import json
+import os
+import signal
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+_scratch = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(_scratch, "primary.db"))
+os.environ.setdefault("REPLICA_DATABASE_URL", "sqlite:///" + os.path.join(_scratch, "replica.db"))
+
+from datetime import datetime, timedelta, timezone  # noqa: E402
+import httpx  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from database import engine, replica_engine  # noqa: E402
+from migrations import upgrade  # noqa: E402
+from benchmarks.startup import start, stop  # noqa: E402
+
+
+def catch_up():
+    """
+    Brings the replica up to the primary's current state: a full copy for SQLite, a wait for
+    WAL replay for Postgres.
+    """
+    if engine.dialect.name == "sqlite":
+        source, target = sqlite3.connect(engine.url.database), sqlite3.connect(replica_engine.url.database)
+        with target:
+            source.backup(target)
+        source.close()
+        target.close()
+        return
+    with engine.connect() as primary:
+        lsn = primary.execute(text("SELECT pg_current_wal_lsn()")).scalar()
+    deadline = time.monotonic() + 30
+    with replica_engine.connect() as replica:
+        while not replica.execute(text("SELECT pg_last_wal_replay_lsn() >= CAST(:lsn AS pg_lsn)"), {"lsn": lsn}).scalar():
+            if time.monotonic() > deadline:
+                raise RuntimeError("replica did not replay the primary's WAL within 30s")
+            time.sleep(0.01)
+
+
+def worker_pids(master: int) -> set:
+    pids = set()
+    for entry in os.listdir("/proc"):
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                if int(f.read().rsplit(")", 1)[1].split()[1]) == master:
+                    pids.add(int(entry))
+        except (OSError, ValueError, IndexError):
+            continue
+    return pids
+
+
+def client(base_url: str) -> httpx.Client:
+    # No keep-alive: every request opens its own connection, so the workers take turns
+    return httpx.Client(base_url=base_url, timeout=30, limits=httpx.Limits(max_keepalive_connections=0))
+
+
+def scenarios(writer: httpx.Client, tag: str):
+    """
+    The writes under test. Yields (name, sees) per area, where sees(http) reads the area and says
+    whether the write is there.
+    """
+    expiry = (datetime.now(timezone.utc) + timedelta(days=10)).isoformat()
+    category = writer.post("/api/categories/", json={"name": f"Replica {tag}"}).raise_for_status().json()
+    yield "catalog", lambda http: any(c["id"] == category["id"] for c in http.get("/api/categories/", params={"limit": 1000}).json())
+
+    product = writer.post("/api/products/", json={
+        "productName": f"Replica item {tag}", "sku": f"RR-{tag}", "unit": "pcs", "supplierName": "RR", "categoryId": category["id"],
+    }).raise_for_status().json()
+    batch = writer.post("/api/batches/", json={
+        "productId": product["id"], "batchNumber": f"RR-{tag}", "currentQuantity": 50, "retailPrice": "1.00", "expiryDate": expiry,
+    }).raise_for_status().json()
+    sale = writer.post("/api/transactions/", json={
+        "batchId": batch["id"], "transactionType": "sale", "quantity": 1, "recordedBy": "RR till",
+    }).raise_for_status().json()
+    yield "transactions", lambda http: any(t["id"] == sale["id"] for t in http.get("/api/transactions/", params={"batchId": batch["id"]}).json())
+
+    writer.post("/cart/add", json={"product_id": product["id"], "quantity": 1}).raise_for_status()
+    order_id = writer.post("/orders/checkout").raise_for_status().json()["order_id"]
+    yield "orders", lambda http: http.get(f"/orders/{order_id}").status_code == 200
+
+
+def check_area(name, sees, writer, observer, reads: int, window: float) -> dict:
+    written = time.monotonic()
+    own = [sees(writer) for _ in range(reads)]
+    other = [sees(observer) for _ in range(reads)]
+    if time.monotonic() - written > window:
+        raise RuntimeError(f"{name}: reads took longer than the {window}s window; raise --window")
+    catch_up()
+    caught_up = time.monotonic()
+    deadline = caught_up + 120
+    while not sees(observer):
+        if time.monotonic() > deadline:
+            return {"area": name, "read_your_writes": f"{sum(own)}/{reads}", "stale_reads": f"{reads - sum(other)}/{reads}", "converged_ms": None}
+        time.sleep(0.05)
+    return {
+        "area": name,
+        "read_your_writes": f"{sum(own)}/{reads}",
+        "stale_reads": f"{reads - sum(other)}/{reads}",
+        "converged_ms": round((time.monotonic() - caught_up) * 1000, 1),
+    }
+
+
+def rolling_reload(proc, base_url: str, workers: int) -> dict:
+    old = worker_pids(proc.pid)
+    stats = {"requests": 0, "errors": 0}
+    done = threading.Event()
+
+    def read():
+        with client(base_url) as http:
+            while not done.is_set():
+                try:
+                    ok = http.get("/api/categories/").status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                stats["requests"] += 1
+                stats["errors"] += not ok
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for thread in readers:
+        thread.start()
+    started = time.monotonic()
+    os.kill(proc.pid, signal.SIGHUP)
+    while len(worker_pids(proc.pid) - old) < workers:
+        if time.monotonic() - started > 60 * workers:
+            break
+        time.sleep(0.1)
+    replaced = time.monotonic() - started
+    time.sleep(0.5)  # A little traffic against the new workers only
+    done.set()
+    for thread in readers:
+        thread.join()
+    return {"workers_replaced": len(worker_pids(proc.pid) - old) >= workers, "seconds": round(replaced, 2), **stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--reads", type=int, default=10, help="reads per client and area inside the window")
+    parser.add_argument("--window", type=float, default=10.0, help="READ_YOUR_WRITES_SECONDS for the server")
+    args = parser.parse_args()
+    if args.workers > 1 and os.getenv("CART_STORE") != "redis":
+        parser.error("more than one worker needs CART_STORE=redis (and REDIS_URL): the checkout may land on another worker than the cart")
+
+    upgrade(engine)
+    catch_up()
+    env = dict(os.environ, READ_YOUR_WRITES_SECONDS=str(args.window))
+    base_url = f"http://127.0.0.1:{args.port}"
+    with httpx.Client(timeout=30) as http:
+        # As in docker-compose.prod.yml: a replacement worker importing the app under load needs more than 5s
+        proc, _ = start(http, args.port, args.workers, env, ("--timeout-worker-healthcheck", "30"))
+    try:
+        with client(base_url) as writer, client(base_url) as observer:
+            # Every worker has the catalog page cached before the write
+            for _ in range(args.workers * 4):
+                observer.get("/api/categories/", params={"limit": 1000})
+            areas = [check_area(name, sees, writer, observer, args.reads, args.window)
+                     for name, sees in scenarios(writer, uuid.uuid4().hex[:8])]
+        reload = rolling_reload(proc, base_url, args.workers)
+    finally:
+        stop(proc)
+
+    simulated = engine.dialect.name == "sqlite"
+    problems = []
+    for area in areas:
+        if area["read_your_writes"] != f"{args.reads}/{args.reads}":
+            problems.append(f"{area['area']}: the writer did not read back its write ({area['read_your_writes']})")
+        if simulated and area["stale_reads"] != f"{args.reads}/{args.reads}":
+            problems.append(f"{area['area']}: not every read of the other client went to the replica ({area['stale_reads']})")
+        if area["converged_ms"] is None:
+            problems.append(f"{area['area']}: the other client never saw the write")
+    if reload["errors"] or not reload["workers_replaced"]:
+        problems.append(f"reload: {reload['errors']} failed requests, workers replaced: {reload['workers_replaced']}")
+
+    print(json.dumps({
+        "database": engine.dialect.name,
+        "replica": "simulated (SQLite copy)" if simulated else "streaming",
+        "workers": args.workers,
+        "catalog_cache_bus": os.getenv("CATALOG_CACHE_BUS", "local"),
+        "areas": areas,
+        "reload": reload,
+        "problems": problems,
+    }, indent=2))
+    if problems:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
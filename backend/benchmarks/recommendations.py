@@ -0,0 +1,222 @@
+# backend/benchmarks/recommendations.py
+"""
+"Frequently bought together": rebuild cost, read latency and incremental exactness.
+
+Seeds a catalog and --orders synthetic baskets (Zipf popularity, plus planted product pairs that
+are bought together far more often than chance), then:
+  rebuild      times the full rebuild over the first (1 - --fold-in-share) of the orders
+  fold_in      checks out the rest through fold_in in batches of --batch (one background cycle
+               each) and reports orders per second
+  exact        a second full rebuild over all orders must give the same co-occurrence matrix and
+               the same (product, rank, partner, orders) lists as rebuild + fold-ins; lift is
+               only refreshed for the products in each fold-in (the order total and partners'
+               counts move under the others), so lift_drift reports how far it strayed
+  planted      share of planted partners that come out as their product's first recommendation
+  read         p50/p95 of the recommendations endpoint against the on-request alternative, a
+               self-join of order_items grouped by partner
+Exits non-zero when the incremental result differs from the rebuild.
+
+The rebuild replaces every product's recommendations, so this runs against a throwaway SQLite
+file unless DATABASE_URL points somewhere else (use a scratch database; orders belong to
+--user-id).
+Usage:
+    python -m benchmarks.recommendations --products 5000 --orders 200000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import uuid
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "recommendations.db"))
+
+from datetime import datetime, timedelta, timezone  # noqa: E402
+import numpy as np  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import select, text  # noqa: E402
+from database import SessionLocal, engine  # noqa: E402
+from main import app  # noqa: E402
+from migrations import upgrade  # noqa: E402
+from models.category import Category  # noqa: E402
+from models.product import Product  # noqa: E402
+from models.orders import Order, OrderItem  # noqa: E402
+from models.recommendation import ProductCooccurrence, ProductRecommendation  # noqa: E402
+from services.recommendations import fold_in, rebuild_recommendations  # noqa: E402
+from benchmarks.forecast_pipeline import _insert  # noqa: E402
+from benchmarks.product_search import percentiles  # noqa: E402
+
+SELF_JOIN = text("""
+    SELECT other.product_id, COUNT(DISTINCT other.order_id) AS orders
+    FROM order_items AS mine
+    JOIN order_items AS other ON other.order_id = mine.order_id AND other.product_id != mine.product_id
+    WHERE mine.product_id = :product_id
+    GROUP BY other.product_id
+    ORDER BY orders DESC, other.product_id
+    LIMIT 5
+""")
+
+
+def baskets(rng, products: int, orders: int, planted: int):
+    """
+    Yields one list of product indexes per order: 1 + Poisson(3) Zipf-distributed products, and
+    in a third of the orders one of the planted pairs (i, i + 1) for even i < 2 * planted.
+    """
+    popularity = 1 / np.arange(1, products + 1) ** 0.8
+    popularity = rng.permutation(popularity / popularity.sum())
+    sizes = 1 + rng.poisson(3, size=orders)
+    picks = iter(rng.choice(products, size=int(sizes.sum()), p=popularity).tolist())
+    pairs = rng.integers(0, planted, size=orders) * 2
+    with_pair = rng.random(orders) < 1 / 3
+    for size, pair, planted_here in zip(sizes, pairs, with_pair):
+        basket = [next(picks) for _ in range(size)]
+        if planted_here:
+            basket += [int(pair), int(pair) + 1]
+        yield sorted(set(basket))
+
+
+def seed(products: int, orders: int, planted: int, user_id: int, tag: str):
+    """
+    Returns the product ids and [(order_id, product_ids)] in order id order.
+    """
+    rng = np.random.default_rng(42)
+    db = SessionLocal()
+    try:
+        (category_id,) = _insert(db, Category, [{"name": f"recommendations-{tag}"}], returning=Category.id)
+        product_ids = _insert(db, Product, [
+            {"categoryId": category_id, "productName": f"Item {i}", "sku": f"{tag}-{i:06d}", "unit": "pcs",
+             "supplierName": "Benchmark", "defaultPrice": 1}
+            for i in range(products)
+        ], returning=Product.id)
+        drawn = [[product_ids[i] for i in basket] for basket in baskets(rng, products, orders, planted)]
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        order_ids = _insert(db, Order, [
+            {"user_id": user_id, "total_amount": 0, "current_status": "Paid", "delivery_method": "Store Pickup",
+             "created_at": now - timedelta(days=30)}
+            for _ in drawn
+        ], returning=Order.id)
+        _insert(db, OrderItem, [
+            {"order_id": order_id, "product_id": product_id, "quantity": 1, "price_at_purchase": 1.0}
+            for order_id, basket in zip(order_ids, drawn) for product_id in basket
+        ])
+        db.commit()
+        return product_ids, list(zip(order_ids, drawn))
+    finally:
+        db.close()
+
+
+def snapshot(db):
+    matrix = set(db.execute(select(ProductCooccurrence.productId, ProductCooccurrence.otherId, ProductCooccurrence.orders)))
+    lists = {
+        (p, rank): (other, n, confidence, lift)
+        for p, rank, other, n, confidence, lift in db.execute(select(
+            ProductRecommendation.productId, ProductRecommendation.rank, ProductRecommendation.otherId,
+            ProductRecommendation.orders, ProductRecommendation.confidence, ProductRecommendation.lift,
+        ))
+    }
+    return matrix, lists
+
+
+def timed(fn, arguments):
+    samples = []
+    for argument in arguments:
+        started = time.perf_counter()
+        fn(argument)
+        samples.append((time.perf_counter() - started) * 1000)
+    return percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--orders", type=int, default=200000)
+    parser.add_argument("--planted", type=int, default=100, help="product pairs bought together on purpose")
+    parser.add_argument("--fold-in-share", type=float, default=0.05, help="share of the orders added by fold-ins")
+    parser.add_argument("--batch", type=int, default=50, help="orders per fold-in")
+    parser.add_argument("--reads", type=int, default=500)
+    parser.add_argument("--user-id", type=int, default=1)
+    args = parser.parse_args()
+
+    upgrade(engine)
+    started = time.perf_counter()
+    product_ids, orders = seed(args.products, args.orders, args.planted, args.user_id, f"RC{uuid.uuid4().hex[:6]}")
+    seeded_s = time.perf_counter() - started
+    split = int(len(orders) * (1 - args.fold_in_share))
+
+    db = SessionLocal()
+    try:
+        # Rebuild over the history only: the last orders are "new" checkouts, made to look unseen
+        # by rebuilding as of the moment before them
+        last_history_id = orders[split - 1][0]
+        db.execute(text("UPDATE orders SET current_status = 'Cancelled' WHERE id > :id"), {"id": last_history_id})
+        rebuild = rebuild_recommendations(db)
+        db.execute(text("UPDATE orders SET current_status = 'Paid' WHERE id > :id"), {"id": last_history_id})
+        db.commit()
+
+        new = orders[split:]
+        started = time.perf_counter()
+        for i in range(0, len(new), args.batch):
+            fold_in(db, new[i:i + args.batch])
+        fold_in_s = time.perf_counter() - started
+        matrix, incremental = snapshot(db)
+
+        full = rebuild_recommendations(db)
+        full_matrix, rebuilt = snapshot(db)
+
+        # Read path: the endpoint (HTTP included) and both queries on their own, for popular products
+        popular = list(db.scalars(
+            select(ProductRecommendation.productId).where(ProductRecommendation.rank == 1)
+            .order_by(ProductRecommendation.orders.desc()).limit(args.reads)
+        ))
+        client = TestClient(app)
+        endpoint = timed(lambda p: client.get(f"/api/products/{p}/recommendations").raise_for_status(), popular)
+        precomputed = timed(lambda p: db.execute(
+            select(ProductRecommendation.otherId, ProductRecommendation.orders)
+            .where(ProductRecommendation.productId == p).order_by(ProductRecommendation.rank).limit(5)
+        ).all(), popular)
+        self_join = timed(lambda p: db.execute(SELF_JOIN, {"product_id": p}).all(), popular)
+    finally:
+        db.close()
+
+    same_lists = {key: value[:2] for key, value in incremental.items()} == {key: value[:2] for key, value in rebuilt.items()}
+    drift = [abs(incremental[key][3] / value[3] - 1) for key, value in rebuilt.items() if key in incremental]
+    firsts = {p: value[0] for (p, rank), value in rebuilt.items() if rank == 1}
+    found = sum(firsts.get(product_ids[i]) == product_ids[i + 1] and firsts.get(product_ids[i + 1]) == product_ids[i]
+                for i in range(0, args.planted * 2, 2))
+    problems = []
+    if matrix != full_matrix:
+        problems.append(f"co-occurrence matrix differs from the rebuild in {len(matrix ^ full_matrix)} rows")
+    if not same_lists:
+        problems.append("recommendation lists differ from the rebuild")
+
+    print(json.dumps({
+        "dialect": engine.dialect.name,
+        "products": args.products,
+        "orders": len(orders),
+        "seed_s": round(seeded_s, 1),
+        "rebuild": rebuild,
+        "full_rebuild": full,
+        "fold_in": {
+            "orders": len(new),
+            "batch": args.batch,
+            "orders_per_s": round(len(new) / fold_in_s),
+            "ms_per_batch": round(fold_in_s * 1000 / -(-len(new) // args.batch), 1),
+        },
+        "exact": {
+            "matrix": matrix == full_matrix,
+            "lists": same_lists,
+            "lift_drift_pct": {
+                "mean": round(100 * float(np.mean(drift)) if drift else 0.0, 2),
+                "max": round(100 * max(drift, default=0.0), 2),
+            },
+        },
+        "planted_found": f"{found}/{args.planted}",
+        "read": {"endpoint": endpoint, "precomputed_sql": precomputed, "self_join_sql": self_join},
+        "problems": problems,
+    }, indent=2))
+    if problems:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
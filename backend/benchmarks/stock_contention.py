@@ -0,0 +1,113 @@
+# backend/benchmarks/stock_contention.py
+"""
+Concurrency stress test for the stock mutation path.
+
+Many workers hammer ONE hot batch with 'sale' transactions through `create_transaction`.
+Afterwards the numbers must reconcile exactly:
+    initial stock - final stock == units sold == SUM(sale transactions on the batch)
+and the batch must never go negative. Throughput is reported per worker count so we can
+see whether it scales.
+
+Usage (against the DATABASE_URL in the environment):
+    python -m benchmarks.stock_contention --workers 1 4 16 --sales 200
+"""
+import argparse
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException
+from sqlalchemy import func
+from database import Base, SessionLocal, engine
+import models
+import schemas
+from APIs.routers import create_transaction
+
+
+def seed_hot_batch(initial_quantity: int) -> int:
+    db = SessionLocal()
+    try:
+        tag = uuid.uuid4().hex[:8]
+        category = models.Category(name=f"bench-{tag}")
+        db.add(category)
+        db.flush()
+        product = models.Product(
+            categoryId=category.id, productName=f"Hot item {tag}", sku=f"BENCH-{tag}",
+            unit="pcs", supplierName="Benchmark", defaultPrice=1,
+        )
+        db.add(product)
+        db.flush()
+        batch = models.StockBatch(
+            productId=product.id, batchNumber=f"HOT-{tag}", retailPrice=1,
+            expiryDate=datetime.now(timezone.utc) + timedelta(days=30), currentQuantity=initial_quantity,
+        )
+        db.add(batch)
+        db.commit()
+        return batch.id
+    finally:
+        db.close()
+
+
+def sell_once(batch_id: int, quantity: int) -> bool:
+    db = SessionLocal()
+    try:
+        create_transaction(
+            schemas.StockTransactionCreate(batchId=batch_id, transactionType="sale", quantity=quantity, recordedBy="bench"),
+            db=db, idempotency_key=None,
+        )
+        return True
+    except HTTPException:
+        return False  # Rejected by the oversell guard
+    finally:
+        db.close()
+
+
+def run(workers: int, sales: int, quantity: int) -> dict:
+    # Stock for only half the attempted sales, so the guard is exercised under contention
+    initial = (sales * quantity) // 2
+    batch_id = seed_hot_batch(initial)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda _: sell_once(batch_id, quantity), range(sales)))
+    elapsed = time.perf_counter() - started
+
+    db = SessionLocal()
+    try:
+        final = db.query(models.StockBatch.currentQuantity).filter(models.StockBatch.id == batch_id).scalar()
+        ledger = db.query(func.coalesce(func.sum(models.StockTransaction.quantity), 0)).filter(
+            models.StockTransaction.batchId == batch_id, models.StockTransaction.transactionType == "sale"
+        ).scalar()
+    finally:
+        db.close()
+
+    sold = sum(results) * quantity
+    return {
+        "workers": workers,
+        "attempts": sales,
+        "accepted": sum(results),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_ops_s": round(sales / elapsed, 1),
+        "initial": initial,
+        "final": final,
+        "reconciled": final >= 0 and initial - final == sold == ledger,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--sales", type=int, default=500, help="sale attempts per run")
+    parser.add_argument("--quantity", type=int, default=1, help="units per sale")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    report = [run(w, args.sales, args.quantity) for w in args.workers]
+    print(json.dumps(report, indent=2))
+    if not all(r["reconciled"] for r in report):
+        raise SystemExit("Stock did not reconcile under contention")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# backend/benchmarks/stock_snapshots.py
+"""
+Point-in-time stock levels: GET /api/stock-levels?as_of= by full ledger replay vs from snapshots.
+
+Seeds --rows stock_transactions over the last --days days (a stock_in per batch, then sales,
+returns and adjustments; some batches expire part-way through) and times as-of reads at random
+instants while no snapshot exists, so each one replays the whole ledger up to its instant. It
+then takes a snapshot every --every hours across the history (recording how long each took and
+the peak Python memory while it ran, which stays flat however long the ledger is) and times the
+same reads again. Every read must return exactly what the full replay returned.
+
+Finally it edits an old sale, as update_transaction does, and checks that as-of now still agrees
+with the live stock levels, i.e. that the edit reached every snapshot taken after the sale.
+
+Usage (DATABASE_URL unset: a throwaway SQLite file):
+    python -m benchmarks.stock_snapshots --rows 1000000 --days 90 --every 24
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "stock_snapshots.db"))
+
+from datetime import datetime, timedelta, timezone  # noqa: E402
+from fastapi import Response  # noqa: E402
+from sqlalchemy import insert, select, update  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+import models  # noqa: E402,F401  (registers every table)
+from models.category import Category  # noqa: E402
+from models.product import Product  # noqa: E402
+from models.batch import StockBatch  # noqa: E402
+from models.transaction import StockTransaction  # noqa: E402
+from APIs.stock_levels import read_stock_levels  # noqa: E402
+from APIs.routers import update_transaction  # noqa: E402
+from services.stock_levels import live_levels  # noqa: E402
+from services.stock_snapshots import take_snapshot  # noqa: E402
+import schemas  # noqa: E402
+from benchmarks.product_search import percentiles  # noqa: E402
+
+INSERT_ROWS = 10000
+MOVES = [("sale", 0.85), ("return", 0.05), ("adjustment", 0.10)]
+
+
+def seed(rows: int, days: int, products: int, batches_per_product: int):
+    rng = random.Random(11)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    start = now - timedelta(days=days)
+    db = SessionLocal()
+    try:
+        (category_id,) = db.execute(insert(Category).returning(Category.id), [{"name": "snapshot-bench"}]).scalars()
+        product_ids = db.execute(insert(Product).returning(Product.id, sort_by_parameter_order=True), [
+            {"categoryId": category_id, "productName": f"Snapshot bench {n}", "sku": f"SNAP-{n}", "unit": "pcs",
+             "supplierName": "Benchmark", "defaultPrice": 1}
+            for n in range(products)
+        ]).scalars().all()
+        # One batch in ten expires somewhere inside the seeded history
+        batch_ids = db.execute(insert(StockBatch).returning(StockBatch.id, sort_by_parameter_order=True), [
+            {"productId": product_id, "batchNumber": f"SNAP-{product_id}-{n}", "currentQuantity": 0, "retailPrice": 1,
+             "expiryDate": start + timedelta(days=rng.uniform(0, days)) if rng.random() < 0.1 else now + timedelta(days=400)}
+            for product_id in product_ids for n in range(batches_per_product)
+        ]).scalars().all()
+
+        on_hand = {batch_id: 10 ** 6 for batch_id in batch_ids}
+        db.execute(insert(StockTransaction), [
+            {"batchId": batch_id, "transactionType": "stock_in", "quantity": 10 ** 6, "recordedBy": "bench", "timestamp": start}
+            for batch_id in batch_ids
+        ])
+        kinds, weights = zip(*MOVES)
+        step = (now - start) / rows
+        chunk = []
+        for n in range(len(batch_ids), rows):
+            batch_id = rng.choice(batch_ids)
+            kind = rng.choices(kinds, weights)[0]
+            quantity = rng.randint(1, 3) if kind != "adjustment" else rng.randint(-5, 5)
+            on_hand[batch_id] += -quantity if kind == "sale" else quantity
+            chunk.append({"batchId": batch_id, "transactionType": kind, "quantity": quantity, "recordedBy": "bench till",
+                          "timestamp": start + step * n})
+            if len(chunk) == INSERT_ROWS:
+                db.execute(insert(StockTransaction), chunk)
+                chunk = []
+        if chunk:
+            db.execute(insert(StockTransaction), chunk)
+        for batch_id, quantity in on_hand.items():
+            db.execute(update(StockBatch).where(StockBatch.id == batch_id).values(currentQuantity=quantity))
+        db.commit()
+        return start, now
+    finally:
+        db.close()
+
+
+def as_of_reads(db, instants) -> tuple:
+    timings, levels = [], []
+    for instant in instants:
+        started = time.perf_counter()
+        page = read_stock_levels(Response(), cursor=None, limit=5000, categoryId=None, productId=None, as_of=instant, db=db)
+        timings.append((time.perf_counter() - started) * 1000)
+        levels.append([level.model_dump() for level in page])
+        db.rollback()
+    return percentiles(timings), levels
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=300000)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--every", type=float, default=24.0, help="Hours between snapshots")
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--batches", type=int, default=3, help="Batches per product")
+    parser.add_argument("--reads", type=int, default=30)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    start, now = seed(args.rows, args.days, args.products, args.batches)
+    report = {"dialect": engine.dialect.name, "rows": args.rows, "days": args.days, "seed_s": round(time.perf_counter() - started, 1)}
+
+    rng = random.Random(5)
+    instants = sorted(start + (now - start) * rng.random() for _ in range(args.reads))
+    db = SessionLocal()
+    try:
+        report["full_replay"], replayed = as_of_reads(db, instants)
+
+        taken, peaks = [], []
+        instant = start + timedelta(hours=args.every)
+        while instant < now:
+            tracemalloc.start()
+            began = time.perf_counter()
+            take_snapshot(db, instant)
+            taken.append((time.perf_counter() - began) * 1000)
+            peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+            tracemalloc.stop()
+            instant += timedelta(hours=args.every)
+        report["snapshots"] = {"count": len(taken), "take_ms": percentiles(taken), "peak_kib": round(max(peaks), 1)}
+
+        report["from_snapshot"], snapshotted = as_of_reads(db, instants)
+
+        # Edit a sale from the first day (reached by every snapshot) the way PUT /api/transactions/{id} does
+        sale = db.scalars(
+            select(StockTransaction).where(StockTransaction.transactionType == "sale").order_by(StockTransaction.timestamp).limit(1)
+        ).one()
+        update_transaction(sale.id, schemas.StockTransactionUpdate(quantity=sale.quantity + 1), db=db)
+        db.rollback()
+        product_ids = db.scalars(select(Product.id).order_by(Product.id)).all()
+        live = live_levels(db, product_ids)
+        db.rollback()
+        _, (latest,) = as_of_reads(db, [datetime.now(timezone.utc)])
+    finally:
+        db.close()
+
+    report["checks"] = {
+        "snapshots_match_replay": snapshotted == replayed,
+        "edit_reaches_snapshots": all(
+            (level["totalOnHand"], level["liveBatches"]) == (live[level["productId"]][0], live[level["productId"]][2])
+            for level in latest
+        ),
+    }
+    print(json.dumps(report, indent=2))
+    if not all(report["checks"].values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,187 @@
 # backend/database.py
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import sessionmaker, declarative_base
+from services.metrics import REGISTRY
+from services.query_stats import TimedQueuePool, TimedAsyncQueuePool
+import math
 import os
+import time
 
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://admin:secretpassword@db:5432/grocery_management")
 
-engine = create_engine(DATABASE_URL)
+def _env_flag(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes", "on")
+
+# Connection pool tuning, shared by the sync and async engines
+POOL_SETTINGS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+    "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),  # seconds; stay under server/proxy idle limits
+    "pool_pre_ping": _env_flag("DB_POOL_PRE_PING", "true"),
+}
+
+# The pool classes only add timing of the wait for a free connection (GET /metrics)
+engine = create_engine(DATABASE_URL, poolclass=TimedQueuePool, **POOL_SETTINGS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Strict loading (DB_RAISE_ON_LAZY_LOAD=true, set by tests/conftest.py): a relationship that
+# a query did not eager-load raises on access instead of quietly emitting one SELECT per row.
+if _env_flag("DB_RAISE_ON_LAZY_LOAD"):
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session, raiseload
+
+    @event.listens_for(Session, "do_orm_execute")
+    def _raise_on_lazy_load(state):
+        if state.is_select and not state.is_relationship_load:
+            state.statement = state.statement.options(raiseload("*", sql_only=True))
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# --- Read replica (REPLICA_DATABASE_URL) ---
+# Read-only endpoints (catalog, transaction listing, order history) take their session from
+# get_read_db, which is bound to the replica; everything else keeps using the primary. A client
+# that has just written is sent to the primary for READ_YOUR_WRITES_SECONDS (and past the catalog
+# cache), so it never reads back a replica that has not replayed its own change yet. The window
+# is carried in a cookie set by ReadYourWritesMiddleware, which works across workers and nodes;
+# keep it above the replica's normal lag. Without REPLICA_DATABASE_URL every session goes to the
+# primary.
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+READ_YOUR_WRITES_COOKIE = "primary_until"
+
+replica_engine = create_engine(REPLICA_DATABASE_URL, poolclass=TimedQueuePool, **POOL_SETTINGS) if REPLICA_DATABASE_URL else engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+
+READ_SESSIONS = REGISTRY.counter(
+    "db_read_sessions_total", "Sessions opened for read-only endpoints, by the database serving them.", ("target",))
+
+def wrote_recently(request: Request) -> bool:
+    # Inside the read-your-writes window of a write under the same path prefix
+    if not REPLICA_DATABASE_URL:
+        return False
+    try:
+        until = float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0))
+    except ValueError:
+        return False
+    # A value further ahead than one window was not set by us: ignore it
+    return time.time() < until <= time.time() + READ_YOUR_WRITES_SECONDS
+
+def reads_from_primary(request: Request) -> bool:
+    return not REPLICA_DATABASE_URL or wrote_recently(request)
+
+def get_read_db(request: Request):
+    primary = reads_from_primary(request)
+    READ_SESSIONS.inc(labels=("primary" if primary else "replica",))
+    db = (SessionLocal if primary else ReadSessionLocal)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+_SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+class ReadYourWritesMiddleware:
+    """
+    Sets the READ_YOUR_WRITES_COOKIE on every successful write (any method but GET/HEAD/OPTIONS
+    answered below 400), so the client's reads stay on the primary until the replica caught up.
+    The cookie is scoped to the write's first path segment: a checkout keeps /orders reads on the
+    primary, while adding to the cart does not take the shopper's catalog reads off the replica.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in _SAFE_METHODS:
+            return await self.app(scope, receive, send)
+        prefix = "/" + scope["path"].lstrip("/").split("/", 1)[0]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = (
+                    f"{READ_YOUR_WRITES_COOKIE}={time.time() + READ_YOUR_WRITES_SECONDS:.3f}; "
+                    f"Max-Age={math.ceil(READ_YOUR_WRITES_SECONDS)}; Path={prefix}; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+# --- Opt-in async stack (USE_ASYNC_DB=true) ---
+# Routes in APIs/aio are served from an AsyncEngine, so a request waiting on Postgres
+# no longer holds one of the threadpool's worker threads.
+# The driver is psycopg 3 in async mode rather than asyncpg: asyncpg rejects the timezone-aware
+# datetime.now(timezone.utc) values our models write into plain DateTime columns.
+USE_ASYNC_DB = _env_flag("USE_ASYNC_DB")
+
+def _async_url(url: str) -> str:
+    if url.startswith("postgresql://") or url.startswith("postgresql+psycopg2://"):
+        return "postgresql+psycopg://" + url.split("://", 1)[1]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _async_url(DATABASE_URL))
+
+async_engine = None
+AsyncSessionLocal = None
+if USE_ASYNC_DB:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=TimedAsyncQueuePool, **POOL_SETTINGS)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False)
+
+async_replica_engine = async_engine
+AsyncReadSessionLocal = AsyncSessionLocal
+if USE_ASYNC_DB and REPLICA_DATABASE_URL:
+    async_replica_engine = create_async_engine(
+        os.getenv("ASYNC_REPLICA_DATABASE_URL", _async_url(REPLICA_DATABASE_URL)), poolclass=TimedAsyncQueuePool, **POOL_SETTINGS)
+    AsyncReadSessionLocal = async_sessionmaker(async_replica_engine, autoflush=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db(request: Request):
+    # Same routing as get_read_db
+    primary = reads_from_primary(request)
+    READ_SESSIONS.inc(labels=("primary" if primary else "replica",))
+    async with (AsyncSessionLocal if primary else AsyncReadSessionLocal)() as db:
+        yield db
+
+def dialect_insert(db, model):
+    """
+    INSERT construct for the session's dialect, so callers can use .on_conflict_do_update()
+    on Postgres in production and on SQLite in tests.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
+
+# Postgres SQLSTATEs that mean "nothing was written, try the whole transaction again"
+RETRYABLE_SQLSTATES = {"40001", "40P01"}  # serialization_failure, deadlock_detected
+
+def run_with_retry(db, work, attempts: int = 3):
+    """
+    Runs `work()` (which must commit its own transaction) and re-runs it after a rollback
+    when Postgres aborts it with a serialization failure or deadlock.
+    """
+    for attempt in range(attempts):
+        try:
+            return work()
+        except DBAPIError as e:
+            db.rollback()
+            sqlstate = getattr(e.orig, "pgcode", None) or getattr(e.orig, "sqlstate", None)
+            if sqlstate not in RETRYABLE_SQLSTATES or attempt == attempts - 1:
+                raise
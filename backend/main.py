@@ -1,21 +1,37 @@
 from fastapi import FastAPI, Depends, HTTPException
 from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
-from database import engine, get_db, Base
-from models import * 
-import importlib
-import pkgutil
-import APIs  
+from database import get_db, USE_ASYNC_DB, REPLICA_DATABASE_URL, ReadYourWritesMiddleware
+from migrations import HEAD, at_head
+from services.query_stats import RequestMetricsMiddleware
+from APIs import alerts, cache, forecast, imports, metrics, recommendations, search, stock_levels
+if USE_ASYNC_DB:
+    # Served by their async twins (APIs/aio)
+    from APIs.aio import cart, orders, routers
+else:
+    from APIs import cart, orders, routers
+try:
+    # Kept out of git like models/user_management.py, but served whenever the checkout has it
+    import APIs.userManagement as userManagement
+except ModuleNotFoundError as exc:
+    if exc.name != "APIs.userManagement":
+        raise
+    userManagement = None
 
-Base.metadata.create_all(bind=engine)
+# The schema is not created here: run `python -m migrations` before starting the app. Startup
+# never touches the database, so workers come up even while it is still unreachable.
 
 app = FastAPI(title="Ransara Supermarket API")
+app.add_middleware(RequestMetricsMiddleware)
+if REPLICA_DATABASE_URL:
+    # Keeps a client that just wrote on the primary (see database.get_read_db)
+    app.add_middleware(ReadYourWritesMiddleware)
 
-for _, module_name, _ in pkgutil.iter_modules(APIs.__path__):
-    module = importlib.import_module(f"APIs.{module_name}")
-    
-
-    if hasattr(module, "router"):
+# Every router, in registration order (where paths overlap, the earlier one wins).
+# A new module in APIs/ has to be added here.
+for module in (alerts, cache, cart, forecast, imports, metrics, orders, recommendations, routers, search, stock_levels, userManagement):
+    if module is not None:
         app.include_router(module.router)
 
 @app.get("/")
@@ -28,4 +44,26 @@ def test_database_connection(db: Session = Depends(get_db)):
         result = db.execute(text("SELECT 1"))
         return {"status": "success", "message": "Successfully connected to PostgreSQL!"}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database connection failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Database connection failed: {str(e)}")
+
+@app.get("/health/live")
+def liveness():
+    """
+    Liveness probe: the process is up and serving requests. Never touches the database, so a
+    database outage does not get healthy workers restarted.
+    """
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def readiness(db: Session = Depends(get_db)):
+    """
+    Readiness probe: the database answers and has every migration this build expects.
+    503 until then, so the load balancer holds traffic back.
+    """
+    try:
+        migrated = at_head(db)
+    except SQLAlchemyError:
+        raise HTTPException(status_code=503, detail="Database unreachable or not migrated")
+    if not migrated:
+        raise HTTPException(status_code=503, detail=f"Database schema is behind this build (expects migration {HEAD})")
+    return {"status": "ready", "schema": HEAD}
@@ -0,0 +1,104 @@
+# backend/migrations/0001_baseline.py
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, MetaData, Numeric, String, Table, Text
+from database import Base
+
+# The schema as main.py used to create it at boot, before migrations existed, frozen here: every
+# change to the models since then ships as a migration of its own. Only runs against databases
+# created that way, so create_all just adds whatever tables they lack.
+
+
+def baseline() -> MetaData:
+    metadata = MetaData()
+    # users is defined by the untracked models/user_management.py (see models/__init__.py) and
+    # has no migration here; it is only needed as the target of the user_id foreign keys
+    users = Base.metadata.tables.get("users")
+    if users is not None:
+        users.to_metadata(metadata)
+
+    Table(
+        "categories", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("name", String, unique=True, index=True),
+    )
+    Table(
+        "products", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("categoryId", Integer, ForeignKey("categories.id")),
+        Column("productName", String, index=True),
+        Column("sku", String, unique=True, index=True),
+        Column("unit", String),
+        Column("imageUrl", String, nullable=True),
+        Column("supplierName", String),
+        Column("description", Text, nullable=True),
+        Column("defaultPrice", Numeric(10, 2), nullable=True),
+    )
+    Table(
+        "stock_batches", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("productId", Integer, ForeignKey("products.id")),
+        Column("batchNumber", String, index=True),
+        Column("manufactureDate", DateTime, nullable=True),
+        Column("expiryDate", DateTime),
+        Column("retailPrice", Numeric(10, 2)),
+        Column("currentQuantity", Integer),
+    )
+    Table(
+        "stock_transactions", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("batchId", Integer, ForeignKey("stock_batches.id")),
+        Column("transactionType", String),
+        Column("quantity", Integer),
+        Column("recordedBy", String),
+        Column("timestamp", DateTime),
+    )
+    Table(
+        "carts", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("user_id", Integer, ForeignKey("users.user_id"), unique=True, nullable=False),
+        Column("created_at", DateTime),
+        Column("updated_at", DateTime),
+    )
+    Table(
+        "cart_items", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("cart_id", Integer, ForeignKey("carts.id"), nullable=False),
+        Column("product_id", Integer, nullable=False),
+        Column("quantity", Integer, nullable=False),
+    )
+    Table(
+        "orders", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("user_id", Integer, ForeignKey("users.user_id"), nullable=False),
+        Column("total_amount", Float),
+        Column("current_status", String),
+        Column("delivery_method", String),
+        Column("created_at", DateTime),
+    )
+    Table(
+        "order_status_history", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("order_id", Integer, ForeignKey("orders.id"), nullable=False),
+        Column("status", String, nullable=False),
+        Column("changed_at", DateTime),
+    )
+    Table(
+        "order_deliveries", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("order_id", Integer, ForeignKey("orders.id"), unique=True, nullable=False),
+        Column("driver_name", String),
+        Column("customer_name", String, nullable=False),
+        Column("delivery_address", String, nullable=False),
+    )
+    Table(
+        "order_items", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("order_id", Integer, ForeignKey("orders.id"), nullable=False),
+        Column("product_id", Integer, nullable=False),
+        Column("quantity", Integer, nullable=False),
+        Column("price_at_purchase", Float, nullable=False),
+    )
+    return metadata
+
+
+def upgrade(connection):
+    baseline().create_all(connection)
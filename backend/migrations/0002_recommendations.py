@@ -0,0 +1,11 @@
+# backend/migrations/0002_recommendations.py
+from models.recommendation import ProductCooccurrence, ProductRecommendation, RecommendationState
+
+# Basket-analysis recommendations (services/recommendations.py). The tables start empty: checkouts
+# fill them from then on, and `python -m services.recommendations` counts the existing orders.
+# checkfirst: a create-at-boot build from after this change may have made them already. What this
+# creates comes from the current models, so later migrations of these tables skip what exists.
+
+def upgrade(connection):
+    for model in (ProductCooccurrence, ProductRecommendation, RecommendationState):
+        model.__table__.create(connection, checkfirst=True)
@@ -0,0 +1,29 @@
+# backend/migrations/0003_product_search.py
+from sqlalchemy import text
+
+# Postgres search indexes for /api/products/search and /suggest (models/product.py). The model
+# adds them with DDL events that only fire when the products table is created, so databases that
+# already had it get them here; IF NOT EXISTS skips what such an event already made. Adding the
+# stored column rewrites the products table once. SQLite searches in process and needs none.
+
+STATEMENTS = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    ALTER TABLE products ADD COLUMN IF NOT EXISTS search_document tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce("productName", '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(sku, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce("supplierName", '')), 'C') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'D')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_products_search_document ON products USING gin (search_document)",
+    'CREATE INDEX IF NOT EXISTS ix_products_name_sku_trgm ON products USING gin ("productName" gin_trgm_ops, sku gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS ix_products_name_prefix ON products ((lower("productName") COLLATE "C"))',
+)
+
+
+def upgrade(connection):
+    if connection.dialect.name != "postgresql":
+        return
+    for statement in STATEMENTS:
+        connection.execute(text(statement))
@@ -0,0 +1,20 @@
+# backend/migrations/0004_order_claims.py
+from sqlalchemy import DateTime, String, inspect, text
+
+# Fulfilment queue (services/fulfilment.py): the claim columns on orders, the status queue index
+# and the per-order status history index. Skips whatever a create-at-boot database already has.
+
+COLUMNS = (("claimed_by", String()), ("claimed_at", DateTime()))
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS ix_orders_status_created ON orders (current_status, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_order_status_history_order_id ON order_status_history (order_id)",
+)
+
+
+def upgrade(connection):
+    existing = {column["name"] for column in inspect(connection).get_columns("orders")}
+    for name, type_ in COLUMNS:
+        if name not in existing:
+            connection.execute(text(f"ALTER TABLE orders ADD COLUMN {name} {type_.compile(dialect=connection.dialect)}"))
+    for statement in INDEXES:
+        connection.execute(text(statement))
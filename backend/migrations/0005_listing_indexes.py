@@ -0,0 +1,18 @@
+# backend/migrations/0005_listing_indexes.py
+from sqlalchemy import text
+
+# Keyset pagination of products, batches and the ledger, and FEFO batch lookups at checkout.
+
+STATEMENTS = (
+    'CREATE INDEX IF NOT EXISTS ix_products_category_id ON products ("categoryId", id)',
+    'CREATE INDEX IF NOT EXISTS ix_stock_batches_product_id ON stock_batches ("productId", id)',
+    'CREATE INDEX IF NOT EXISTS ix_stock_batches_product_expiry ON stock_batches ("productId", "expiryDate")',
+    'CREATE INDEX IF NOT EXISTS ix_stock_transactions_timestamp_id ON stock_transactions (timestamp, id)',
+    'CREATE INDEX IF NOT EXISTS ix_stock_transactions_batch_timestamp_id ON stock_transactions ("batchId", timestamp, id)',
+    'CREATE INDEX IF NOT EXISTS ix_stock_transactions_type_timestamp_id ON stock_transactions ("transactionType", timestamp, id)',
+)
+
+
+def upgrade(connection):
+    for statement in STATEMENTS:
+        connection.execute(text(statement))
@@ -0,0 +1,23 @@
+# backend/migrations/0006_stock_batch_upsert_key.py
+from sqlalchemy import text
+
+# One batch number per product: the conflict target of the bulk delivery upserts
+# (services/bulk_import.py). A unique index rather than a constraint, as SQLite cannot add one to
+# an existing table; ON CONFLICT accepts either.
+
+DUPLICATES = """
+    SELECT "productId", "batchNumber", COUNT(*) FROM stock_batches
+    WHERE "batchNumber" IS NOT NULL
+    GROUP BY "productId", "batchNumber" HAVING COUNT(*) > 1
+    LIMIT 5
+"""
+
+
+def upgrade(connection):
+    duplicates = connection.execute(text(DUPLICATES)).all()
+    if duplicates:
+        listed = ", ".join(f"product {p} batch {b!r} ({n} rows)" for p, b, n in duplicates)
+        raise RuntimeError(f"stock_batches has repeated (productId, batchNumber) pairs; merge them first: {listed}")
+    connection.execute(text(
+        'CREATE UNIQUE INDEX IF NOT EXISTS uq_stock_batches_product_batch ON stock_batches ("productId", "batchNumber")'
+    ))
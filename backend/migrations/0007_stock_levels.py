@@ -0,0 +1,8 @@
+# backend/migrations/0007_stock_levels.py
+from models.stock_level import ProductStockLevel
+
+# Per-product stock-level projection (services/stock_levels.py). Starts empty; the reconcile job
+# (POST /api/stock-levels/reconcile) builds it from the batches.
+
+def upgrade(connection):
+    ProductStockLevel.__table__.create(connection, checkfirst=True)
@@ -0,0 +1,16 @@
+# backend/migrations/0008_demand_forecasts.py
+from sqlalchemy import text
+from models.forecast import DemandForecast
+
+# Demand forecasts (services/forecasting.py) and the indexes its sales-history scan reads.
+
+STATEMENTS = (
+    "CREATE INDEX IF NOT EXISTS ix_order_items_order_id ON order_items (order_id)",
+    "CREATE INDEX IF NOT EXISTS ix_order_items_product_order ON order_items (product_id, order_id)",
+)
+
+
+def upgrade(connection):
+    DemandForecast.__table__.create(connection, checkfirst=True)
+    for statement in STATEMENTS:
+        connection.execute(text(statement))
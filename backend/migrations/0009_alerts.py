@@ -0,0 +1,9 @@
+# backend/migrations/0009_alerts.py
+from sqlalchemy import text
+from models.alert import ReorderThreshold
+
+# Reorder thresholds and the cross-product expiry index of the alert engine (services/alerts.py).
+
+def upgrade(connection):
+    ReorderThreshold.__table__.create(connection, checkfirst=True)
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_stock_batches_expiry ON stock_batches ("expiryDate")'))
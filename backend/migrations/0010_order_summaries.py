@@ -0,0 +1,10 @@
+# backend/migrations/0010_order_summaries.py
+from sqlalchemy import text
+from models.order_summary import OrderSummary
+
+# Denormalized order summaries (services/order_summaries.py) and the per-user orders index.
+# Existing orders get their summaries from `python -m services.order_summaries`.
+
+def upgrade(connection):
+    OrderSummary.__table__.create(connection, checkfirst=True)
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_orders_user_created ON orders (user_id, created_at)"))
@@ -0,0 +1,7 @@
+# backend/migrations/0011_idempotency_keys.py
+from models.idempotency import IdempotencyKey
+
+# Stored responses of Idempotency-Key writes (services/idempotency.py).
+
+def upgrade(connection):
+    IdempotencyKey.__table__.create(connection, checkfirst=True)
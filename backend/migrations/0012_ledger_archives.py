@@ -0,0 +1,9 @@
+# backend/migrations/0012_ledger_archives.py
+from models.ledger_archive import StockTransactionArchive, OrderStatusHistoryArchive, BatchLedgerMonth, LedgerArchive
+
+# Monthly ledger archives (services/ledger_archive.py). On Postgres the two archives are
+# partitioned parents; their monthly partitions are created by the rollover itself.
+
+def upgrade(connection):
+    for model in (StockTransactionArchive, OrderStatusHistoryArchive, BatchLedgerMonth, LedgerArchive):
+        model.__table__.create(connection, checkfirst=True)
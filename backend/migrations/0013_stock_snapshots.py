@@ -0,0 +1,8 @@
+# backend/migrations/0013_stock_snapshots.py
+from models.stock_snapshot import StockSnapshot, StockSnapshotBatch
+
+# Point-in-time stock snapshots (services/stock_snapshots.py).
+
+def upgrade(connection):
+    for model in (StockSnapshot, StockSnapshotBatch):
+        model.__table__.create(connection, checkfirst=True)
@@ -0,0 +1,17 @@
+# backend/migrations/0014_recommendation_gaps.py
+from sqlalchemy import Integer, inspect, text
+from models.recommendation import RecommendationGap
+
+# Which orders the last recommendations rebuild read (services/recommendations.py): the low end of
+# its id range on recommendation_state, and the ids inside the range it did not read. Until the
+# next rebuild fills them in, the range starts at 0 without gaps: the old "every order up to
+# rebuiltThroughOrderId" reading.
+
+def upgrade(connection):
+    existing = {column["name"] for column in inspect(connection).get_columns("recommendation_state")}
+    if "rebuiltFromOrderId" not in existing:
+        connection.execute(text(
+            'ALTER TABLE recommendation_state ADD COLUMN "rebuiltFromOrderId" '
+            f"{Integer().compile(dialect=connection.dialect)} NOT NULL DEFAULT 0"
+        ))
+    RecommendationGap.__table__.create(connection, checkfirst=True)
@@ -0,0 +1,102 @@
+# backend/migrations/__init__.py
+import importlib
+from datetime import datetime, timezone
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, insert, select, text
+
+# Versioned schema migrations, applied by `python -m migrations` before the app starts (a deploy
+# step or a one-shot container), never by the app itself: workers boot without touching the
+# database, and the schema changes once per deploy rather than once per worker.
+#
+# Each module listed in MIGRATIONS has an `upgrade(connection)` and runs in its own transaction;
+# schema_migrations records which versions a database has. Append new migrations to the list;
+# never edit, rename or reorder one that has shipped. A change to a model's table ships with the
+# migration that makes it.
+#
+# A brand-new database gets the current models in one create_all and every version recorded, so
+# migrations only ever run against databases that predate them. A database created by the old
+# create-at-boot code (tables present, nothing recorded) is brought up from the baseline; as
+# create-at-boot builds from any point of the series may have made some of the later tables and
+# indexes already, every migration skips what exists (checkfirst, IF NOT EXISTS).
+
+MIGRATIONS = [
+    "0001_baseline",
+    "0002_recommendations",
+    "0003_product_search",
+    "0004_order_claims",
+    "0005_listing_indexes",
+    "0006_stock_batch_upsert_key",
+    "0007_stock_levels",
+    "0008_demand_forecasts",
+    "0009_alerts",
+    "0010_order_summaries",
+    "0011_idempotency_keys",
+    "0012_ledger_archives",
+    "0013_stock_snapshots",
+    "0014_recommendation_gaps",
+]
+HEAD = MIGRATIONS[-1]
+
+# Postgres advisory lock key, so deploys that start several migrators run them one at a time
+_LOCK_KEY = 4242_0001
+
+schema_migrations = Table(
+    "schema_migrations", MetaData(),
+    Column("version", String, primary_key=True),
+    Column("appliedAt", DateTime, nullable=False),
+)
+
+
+def _record(connection, versions):
+    now = datetime.now(timezone.utc)
+    connection.execute(insert(schema_migrations), [{"version": v, "appliedAt": now} for v in versions])
+
+
+def applied_versions(connection) -> list:
+    if not inspect(connection).has_table(schema_migrations.name):
+        return []
+    return connection.scalars(select(schema_migrations.c.version).order_by(schema_migrations.c.version)).all()
+
+
+def at_head(db) -> bool:
+    """
+    Whether the database behind `db` (a Session or Connection) has every migration of this build.
+    One primary-key lookup; raises if the database is unreachable or was never migrated.
+    """
+    return db.execute(select(schema_migrations.c.version).where(schema_migrations.c.version == HEAD)).first() is not None
+
+
+def upgrade(engine) -> list:
+    """
+    Brings the database up to HEAD and returns the versions applied (or recorded) by this run.
+    """
+    from database import Base
+    import models  # noqa: F401  (registers every table)
+
+    with engine.connect() as connection:
+        postgres = connection.dialect.name == "postgresql"
+        if postgres:
+            connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _LOCK_KEY})
+            connection.commit()
+        try:
+            with connection.begin():
+                schema_migrations.create(connection, checkfirst=True)
+                done = applied_versions(connection)
+                if not done and not set(inspect(connection).get_table_names()) & set(Base.metadata.tables):
+                    Base.metadata.create_all(connection)
+                    _record(connection, MIGRATIONS)
+                    return list(MIGRATIONS)
+
+            applied = []
+            for version in MIGRATIONS:
+                if version in done:
+                    continue
+                module = importlib.import_module(f"{__name__}.{version}")
+                with connection.begin():
+                    module.upgrade(connection)
+                    _record(connection, [version])
+                applied.append(version)
+            return applied
+        finally:
+            if postgres:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _LOCK_KEY})
+                connection.commit()
@@ -0,0 +1,16 @@
+# backend/migrations/__main__.py
+# Deploy step: python -m migrations [upgrade|status]
+import json
+import sys
+from database import engine
+from migrations import HEAD, MIGRATIONS, applied_versions, upgrade
+
+command = sys.argv[1] if len(sys.argv) > 1 else "upgrade"
+if command == "upgrade":
+    print(json.dumps({"applied": upgrade(engine), "head": HEAD}))
+elif command == "status":
+    with engine.connect() as connection:
+        done = applied_versions(connection)
+    print(json.dumps({"head": HEAD, "applied": done, "pending": [v for v in MIGRATIONS if v not in done]}, indent=2))
+else:
+    raise SystemExit(f"Unknown command {command!r}: expected upgrade or status")
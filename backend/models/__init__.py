@@ -1,6 +1,26 @@
 # backend/models/__init__.py
-import pkgutil
-import importlib
+# Every model, imported explicitly so the whole schema is registered on Base.metadata (string
+# relationships and migrations need all of it) and reachable as models.<Class>. A new model
+# module has to be added here.
+from models.category import Category
+from models.product import Product
+from models.batch import StockBatch
+from models.transaction import StockTransaction
+from models.stock_level import ProductStockLevel
+from models.stock_snapshot import StockSnapshot, StockSnapshotBatch
+from models.ledger_archive import StockTransactionArchive, OrderStatusHistoryArchive, BatchLedgerMonth, LedgerArchive
+from models.cart import Cart, CartItem
+from models.orders import Order, OrderStatusHistory, OrderDelivery, OrderItem
+from models.order_summary import OrderSummary
+from models.alert import ReorderThreshold
+from models.forecast import DemandForecast
+from models.idempotency import IdempotencyKey
+from models.recommendation import ProductCooccurrence, ProductRecommendation, RecommendationGap, RecommendationState
 
-for _, module_name, _ in pkgutil.iter_modules(__path__):
-    importlib.import_module(f"{__name__}.{module_name}")
\ No newline at end of file
+# The users table (target of carts.user_id and orders.user_id) lives in user_management.py, which
+# is kept out of git (see .gitignore) but present in every real checkout
+try:
+    from models.user_management import *  # noqa: F401,F403
+except ModuleNotFoundError as exc:
+    if exc.name != "models.user_management":
+        raise
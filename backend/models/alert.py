@@ -0,0 +1,16 @@
+# backend/models/alert.py
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from database import Base
+from datetime import datetime, timezone
+
+class ReorderThreshold(Base):
+    """
+    Per-product reorder settings set by purchasing. Products without a row fall back to
+    thresholds derived from their demand forecast (see services/alerts.py).
+    """
+    __tablename__ = "reorder_thresholds"
+
+    productId = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    reorderPoint = Column(Integer, nullable=False)     # Alert once sellable units fall to this level
+    reorderQuantity = Column(Integer, nullable=False)  # Order size; suggestions top stock up to point + quantity
+    updatedAt = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), index=True)
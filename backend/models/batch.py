@@ -1,9 +1,18 @@
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from database import Base
 
 class StockBatch(Base):
     __tablename__ = "stock_batches"
+    __table_args__ = (
+        # Per-product batch listing by cursor, and FEFO lookups at checkout
+        Index("ix_stock_batches_product_id", "productId", "id"),
+        Index("ix_stock_batches_product_expiry", "productId", "expiryDate"),
+        # Expiry scans across products (alerts, expiresBefore listing)
+        Index("ix_stock_batches_expiry", "expiryDate"),
+        # Conflict target for bulk delivery upserts
+        UniqueConstraint("productId", "batchNumber", name="uq_stock_batches_product_batch"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     productId = Column(Integer, ForeignKey("products.id"))
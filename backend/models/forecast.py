@@ -0,0 +1,23 @@
+# backend/models/forecast.py
+from sqlalchemy import Column, Integer, Float, Date, DateTime, ForeignKey, JSON
+from database import Base
+
+class DemandForecast(Base):
+    """
+    Latest demand features and baseline forecast per product, written by the batch pipeline in
+    services/forecasting.py. Only products with demand in the history window get a row.
+    """
+    __tablename__ = "demand_forecasts"
+
+    productId = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    generatedAt = Column(DateTime, nullable=False, index=True)  # Run that wrote the row; older rows are pruned
+    historyStart = Column(Date, nullable=False)
+    historyEnd = Column(Date, nullable=False)                   # Last day of history (inclusive)
+    totalUnits = Column(Float, nullable=False)                  # Units sold over the window
+    activeDays = Column(Integer, nullable=False)                # Days with any demand
+    mean7 = Column(Float, nullable=False)                       # Rolling mean over the last 7 / 28 days
+    mean28 = Column(Float, nullable=False)
+    std28 = Column(Float, nullable=False)
+    level = Column(Float, nullable=False)                       # Exponentially smoothed daily demand
+    weekdayIndex = Column(JSON, nullable=False)                 # 7 multipliers, Monday first
+    forecast = Column(JSON, nullable=False)                     # Daily units for historyEnd+1 ... historyEnd+horizon
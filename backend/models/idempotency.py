@@ -0,0 +1,19 @@
+# backend/models/idempotency.py
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from database import Base
+
+class IdempotencyKey(Base):
+    """
+    The stored response of a write made with an Idempotency-Key header. Written in the same
+    transaction as the write itself (services/idempotency.py), so a replay can never see a
+    write without its response or the other way round.
+    """
+    __tablename__ = "idempotency_keys"
+
+    scope = Column(String, primary_key=True)        # Endpoint (and user) the key belongs to
+    key = Column(String, primary_key=True)
+    fingerprint = Column(String, nullable=False)    # Hash of the request body
+    statusCode = Column(Integer, nullable=False)
+    body = Column(Text, nullable=False)             # JSON response body
+    createdAt = Column(DateTime, nullable=False)
+    expiresAt = Column(DateTime, nullable=False, index=True)
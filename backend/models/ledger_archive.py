@@ -0,0 +1,67 @@
+# backend/models/ledger_archive.py
+from sqlalchemy import Column, Integer, String, DateTime, Date, Index
+from database import Base
+
+# Closed months of the two append-only ledgers, moved out of the hot tables by
+# services/ledger_archive.py. Rows keep their original ids and timestamps. On Postgres both
+# archives are range-partitioned by month (a partition per archived month, created on demand),
+# so a query bounded in time only touches the months it covers; elsewhere they are plain tables.
+
+class StockTransactionArchive(Base):
+    __tablename__ = "stock_transactions_archive"
+    __table_args__ = (
+        Index("ix_stock_transactions_archive_timestamp_id", "timestamp", "id"),
+        Index("ix_stock_transactions_archive_batch_timestamp_id", "batchId", "timestamp", "id"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
+    # The partition key has to be part of the primary key
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    timestamp = Column(DateTime, primary_key=True)
+    batchId = Column(Integer)
+    transactionType = Column(String)
+    quantity = Column(Integer)
+    recordedBy = Column(String)
+
+
+class OrderStatusHistoryArchive(Base):
+    __tablename__ = "order_status_history_archive"
+    __table_args__ = (
+        Index("ix_order_status_history_archive_order_id", "order_id"),
+        {"postgresql_partition_by": "RANGE (changed_at)"},
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    changed_at = Column(DateTime, primary_key=True)
+    order_id = Column(Integer, nullable=False)
+    status = Column(String, nullable=False)
+
+
+class BatchLedgerMonth(Base):
+    """
+    Net stock movement of one batch in one archived month (sales negative), written as the
+    month is archived. On-hand quantities are rebuilt from these plus the hot ledger, without
+    reading the archive.
+    """
+    __tablename__ = "batch_ledger_months"
+
+    batchId = Column(Integer, primary_key=True)
+    month = Column(Date, primary_key=True)
+    rows = Column(Integer, nullable=False)
+    netQuantity = Column(Integer, nullable=False)
+
+
+class LedgerArchive(Base):
+    """
+    One archived month of one ledger: how many rows moved, and where and under which checksum
+    the month was exported.
+    """
+    __tablename__ = "ledger_archives"
+
+    tableName = Column(String, primary_key=True)     # The hot table the month came from
+    month = Column(Date, primary_key=True)
+    rows = Column(Integer, nullable=False)
+    archivedAt = Column(DateTime, nullable=False)
+    exportPath = Column(String)
+    exportSha256 = Column(String)
+    exportedAt = Column(DateTime)
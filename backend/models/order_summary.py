@@ -0,0 +1,29 @@
+# backend/models/order_summary.py
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, Index
+from database import Base
+
+class OrderSummary(Base):
+    """
+    Denormalized read model of an order: header, lines (with the product name at purchase time),
+    status history and delivery details in one row. Written at checkout and whenever the
+    order's status or delivery changes (services/order_summaries.py); order history and order
+    detail are served from here without touching the four source tables.
+    """
+    __tablename__ = "order_summaries"
+    __table_args__ = (
+        # A user's order history, newest first, paged by (createdAt, orderId)
+        Index("ix_order_summaries_user_created", "userId", "createdAt", "orderId"),
+    )
+
+    orderId = Column(Integer, ForeignKey("orders.id"), primary_key=True)
+    userId = Column(Integer, nullable=False)
+    createdAt = Column(DateTime, nullable=False)
+    status = Column(String, nullable=False)
+    statusChangedAt = Column(DateTime, nullable=True)
+    deliveryMethod = Column(String, nullable=True)
+    totalAmount = Column(Float, nullable=False, default=0.0)
+    lineCount = Column(Integer, nullable=False, default=0)
+    itemCount = Column(Integer, nullable=False, default=0)     # Units across all lines
+    lines = Column(JSON, nullable=False)                        # [{productId, productName, quantity, priceAtPurchase}]
+    history = Column(JSON, nullable=False)                      # [{status, changedAt}] oldest first
+    delivery = Column(JSON, nullable=True)                      # {customerName, deliveryAddress, driverName}
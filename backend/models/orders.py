@@ -1,11 +1,17 @@
 # backend/models/orders.py
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime, timezone
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # A user's orders, newest first
+        Index("ix_orders_user_created", "user_id", "created_at"),
+        # Fulfilment queue: oldest orders of a status first
+        Index("ix_orders_status_created", "current_status", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)    
@@ -16,6 +22,10 @@ class Order(Base):
     
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
+    # Fulfilment queue claim (services/fulfilment.py); cleared by the next status change
+    claimed_by = Column(String, nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+
     # Relationships
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
     status_history = relationship("OrderStatusHistory", back_populates="order", cascade="all, delete-orphan")
@@ -26,7 +36,7 @@ class OrderStatusHistory(Base):
     __tablename__ = "order_status_history"
 
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
     
     status = Column(String, nullable=False) # Pending, Packed, Out for Delivery, Delivered, Abort
     changed_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
@@ -49,9 +59,13 @@ class OrderDelivery(Base):
 
 class OrderItem(Base):
     __tablename__ = "order_items"
+    __table_args__ = (
+        # Per-product sales history (demand forecasting)
+        Index("ix_order_items_product_order", "product_id", "order_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
     product_id = Column(Integer, nullable=False) 
     
     quantity = Column(Integer, nullable=False)
@@ -1,9 +1,13 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Numeric
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Numeric, Index, DDL, event, func
 from sqlalchemy.orm import relationship
 from database import Base
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        # Per-category product listing by cursor
+        Index("ix_products_category_id", "categoryId", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     categoryId = Column(Integer, ForeignKey("categories.id"))
@@ -16,4 +20,37 @@ class Product(Base):
     defaultPrice = Column(Numeric(10, 2), nullable=True, default=0.00)
 
     category = relationship("Category", back_populates="products")
-    batches = relationship("StockBatch", back_populates="product")
\ No newline at end of file
+    batches = relationship("StockBatch", back_populates="product")
+
+
+# --- Search indexes (Postgres only; SQLite uses the in-process index in services/search.py) ---
+# These fire when the table is created; databases that already had it get them from
+# migrations/0003_product_search.py, so a change here needs a migration too.
+
+# Weighted full-text document, stored by Postgres itself so ranking reads it instead of re-parsing
+# the text of every match. Deliberately not mapped: the ORM never reads or writes it.
+event.listen(Product.__table__, "after_create", DDL("""
+    ALTER TABLE products ADD COLUMN search_document tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce("productName", '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(sku, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce("supplierName", '')), 'C') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'D')
+    ) STORED
+""").execute_if(dialect="postgresql"))
+event.listen(Product.__table__, "after_create", DDL(
+    "CREATE INDEX ix_products_search_document ON products USING gin (search_document)"
+).execute_if(dialect="postgresql"))
+
+# Typo-tolerant and substring matching (word_similarity / ILIKE '%..%')
+Index(
+    "ix_products_name_sku_trgm", Product.productName, Product.sku,
+    postgresql_using="gin", postgresql_ops={"productName": "gin_trgm_ops", "sku": "gin_trgm_ops"},
+).ddl_if(dialect="postgresql")
+
+# Prefix autocomplete: a byte-ordered index serves both `LIKE 'abc%'` and the ORDER BY
+Index("ix_products_name_prefix", func.lower(Product.productName).collate("C")).ddl_if(dialect="postgresql")
+
+event.listen(
+    Product.__table__, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
\ No newline at end of file
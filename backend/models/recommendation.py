@@ -0,0 +1,59 @@
+# backend/models/recommendation.py
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from database import Base
+
+class ProductCooccurrence(Base):
+    """
+    Sparse product x product co-occurrence matrix: in how many orders two products were bought
+    together. Stored in both directions so a product's row is one primary-key range; the diagonal
+    (productId == otherId) counts the orders containing the product. Rebuilt from order_items
+    and incremented as orders are checked out (services/recommendations.py).
+    """
+    __tablename__ = "product_cooccurrence"
+
+    productId = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    otherId = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    orders = Column(Integer, nullable=False)
+
+
+class ProductRecommendation(Base):
+    """
+    Top-K "frequently bought together" products per product, precomputed from the co-occurrence
+    matrix. GET /api/products/{id}/recommendations reads one product's rows in rank order.
+    """
+    __tablename__ = "product_recommendations"
+
+    productId = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    rank = Column(Integer, primary_key=True)                   # 1 = bought together most often
+    otherId = Column(Integer, ForeignKey("products.id"), nullable=False)
+    orders = Column(Integer, nullable=False)                   # Orders containing both products
+    confidence = Column(Float, nullable=False)                 # Share of productId's orders that also hold otherId
+    lift = Column(Float, nullable=False)                       # confidence / share of all orders holding otherId
+    updatedAt = Column(DateTime, nullable=False)
+
+
+class RecommendationState(Base):
+    """
+    Single row (id 1): how many orders the matrix counts and which order ids the last rebuild
+    read. Every rebuild and fold-in locks it first, so they never interleave.
+    """
+    __tablename__ = "recommendation_state"
+
+    id = Column(Integer, primary_key=True)
+    orders = Column(Integer, nullable=False, default=0)
+    rebuiltAt = Column(DateTime, nullable=True)
+    rebuiltFromOrderId = Column(Integer, nullable=False, default=0)     # Lowest order id the rebuild read
+    rebuiltThroughOrderId = Column(Integer, nullable=False, default=0)  # Highest; in between, all but recommendation_gaps
+    updatedAt = Column(DateTime, nullable=False)
+
+
+class RecommendationGap(Base):
+    """
+    Order ids between recommendation_state.rebuiltFromOrderId and rebuiltThroughOrderId that the
+    last rebuild did not read: cancelled, outside the history window, rolled back, or not yet
+    committed when it took its snapshot. Ids are handed out at flush, not at commit, so a checkout
+    can commit below the highest id a rebuild saw; its fold-in finds it here and counts it.
+    """
+    __tablename__ = "recommendation_gaps"
+
+    orderId = Column(Integer, primary_key=True)
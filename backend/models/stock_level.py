@@ -0,0 +1,17 @@
+# backend/models/stock_level.py
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from database import Base
+
+class ProductStockLevel(Base):
+    """
+    Materialized "how much of this product is sellable right now" summary.
+    One row per product, maintained by services/stock_levels.py whenever a batch changes,
+    and rebuilt from the StockTransaction ledger by the reconcile job.
+    """
+    __tablename__ = "product_stock_levels"
+
+    productId = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    totalOnHand = Column(Integer, nullable=False, default=0)    # Units across unexpired, non-empty batches
+    earliestExpiry = Column(DateTime, nullable=True, index=True) # Next batch to expire; indexed to find stale rows
+    liveBatches = Column(Integer, nullable=False, default=0)
+    updatedAt = Column(DateTime, index=True)                    # Indexed so in-process consumers can poll for changes
@@ -0,0 +1,25 @@
+# backend/models/stock_snapshot.py
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from database import Base
+
+class StockSnapshot(Base):
+    """
+    On-hand quantities of every batch as of `takenAt`, folded from the StockTransaction ledger
+    by services/stock_snapshots.py. Point-in-time stock levels start from the newest snapshot
+    at or before the requested instant and replay only the ledger rows after it.
+    """
+    __tablename__ = "stock_snapshots"
+
+    id = Column(Integer, primary_key=True)
+    takenAt = Column(DateTime, nullable=False, unique=True)    # Covers ledger rows stamped at or before it
+    createdAt = Column(DateTime, nullable=False)
+    batches = Column(Integer, nullable=False, default=0)       # Batches with a non-zero quantity
+
+
+class StockSnapshotBatch(Base):
+    __tablename__ = "stock_snapshot_batches"
+
+    # Batches at zero are left out, so a snapshot only grows with the stock actually on hand
+    snapshotId = Column(Integer, ForeignKey("stock_snapshots.id"), primary_key=True)
+    batchId = Column(Integer, primary_key=True)
+    quantity = Column(Integer, nullable=False)
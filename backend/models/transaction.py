@@ -1,9 +1,15 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from database import Base
 
 class StockTransaction(Base):
     __tablename__ = "stock_transactions"
+    __table_args__ = (
+        # Keyset pagination of the ledger (newest first), overall and per filter
+        Index("ix_stock_transactions_timestamp_id", "timestamp", "id"),
+        Index("ix_stock_transactions_batch_timestamp_id", "batchId", "timestamp", "id"),
+        Index("ix_stock_transactions_type_timestamp_id", "transactionType", "timestamp", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     batchId = Column(Integer, ForeignKey("stock_batches.id"))
@@ -0,0 +1,2 @@
+# backend/services/__init__.py
+# Shared business logic used by the API routers (stock allocation, caches, projections).
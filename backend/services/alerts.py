@@ -0,0 +1,442 @@
+# backend/services/alerts.py
+import bisect
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models.batch import StockBatch
+from models.forecast import DemandForecast
+from models.alert import ReorderThreshold
+from models.stock_level import ProductStockLevel
+from services.stock_levels import on_stock_committed
+
+logger = logging.getLogger(__name__)
+
+# Low-stock / near-expiry alert engine.
+#
+# Keeps every non-empty batch in memory in two orders: globally by expiry (the priority index
+# behind expiry alerts and markdown candidates) and per product (for sellable units and FEFO
+# order). Products at or below their reorder point sit in a list sorted by how much of that
+# point is left, so every alert list is a slice of an already sorted list.
+#
+# Updates are incremental: commits that refreshed stock levels in this process are applied on
+# the next read, and a background thread picks up other workers' changes from the indexed
+# updatedAt columns of product_stock_levels / reorder_thresholds. A batch crossing its expiry
+# date changes its product's sellable units without any write, so each catch-up also rescores
+# the products of batches that expired since the last one. A full rebuild runs every
+# ALERT_REBUILD_SECONDS to pick up the nightly forecasts.
+
+ALERT_POLL_SECONDS = float(os.getenv("ALERT_POLL_SECONDS", "5"))
+ALERT_REBUILD_SECONDS = float(os.getenv("ALERT_REBUILD_SECONDS", "900"))
+POLL_OVERLAP = timedelta(seconds=30)  # Re-read this far behind the watermark, for slow commits
+FULL_RELOAD_PRODUCTS = 20000          # More changed products than this and a rebuild is cheaper
+BULK_EDIT = 1000                      # Re-sort the expiry index instead of editing it key by key
+LOAD_ROWS = 10000
+MARKDOWN_CACHE_SECONDS = 60
+
+# Thresholds derived from the demand forecast when purchasing has not set one
+LEAD_TIME_DAYS = 3
+REVIEW_DAYS = 7
+SAFETY_Z = 1.65                       # ~95% cycle service level
+
+MARKDOWN_DAYS = 7
+MARKDOWN_TIERS = ((1, 50), (3, 30), (7, 15))  # (days left <=, percent off)
+
+_FOREVER = datetime.max
+
+
+def _utcnow() -> datetime:
+    # Batch timestamps come back naive (UTC) from both Postgres and SQLite
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def markdown_percent(days_left: float):
+    for max_days, percent in MARKDOWN_TIERS:
+        if days_left <= max_days:
+            return percent
+    return None
+
+
+class AlertEngine:
+    def __init__(self):
+        self._lock = threading.RLock()   # Guards the structures below; held briefly
+        self._sync = threading.RLock()   # Serializes loads, so an older snapshot never overwrites a newer one
+        self._batches = {}       # batch_id -> (productId, expiryDate or None, quantity)
+        self._by_product = {}    # productId -> [(expiryDate or max, batch_id, quantity)] FEFO order
+        self._expiry = []        # sorted [(expiryDate, batch_id)] for batches with an expiry date
+        self._thresholds = {}    # productId -> (reorderPoint, reorderQuantity) set by purchasing
+        self._rates = {}         # productId -> (daily demand level, std28) from the forecast
+        self._on_hand = {}       # productId -> sellable units at the last rescore
+        self._reorder = []       # sorted [(share of reorder point left, productId)]
+        self._reorder_keys = {}  # productId -> its key in _reorder
+        self._pending = (set(), set())
+        self._clock = None       # Expiry boundary the sellable units were computed at
+        self._watermark = None
+        self._polled = {}        # (table, productId) -> updatedAt already applied inside the poll overlap
+        self._version = 0        # Bumped on every change, keys the markdown memo
+        self._markdown_memo = (None, [])
+        self._built_at = None
+        self._wake = threading.Event()
+        self._thread = None
+
+    @property
+    def ready(self) -> bool:
+        return self._built_at is not None
+
+    # --- Loading -------------------------------------------------------------
+
+    def _load(self, db: Session, product_ids=None):
+        """
+        (batches, thresholds, rates) from the database, for every product or only `product_ids`.
+        """
+        def scoped(stmt, column):
+            return stmt if product_ids is None else stmt.where(column.in_(product_ids))
+
+        batches = db.execute(scoped(
+            select(StockBatch.id, StockBatch.productId, StockBatch.expiryDate, StockBatch.currentQuantity)
+            .where(StockBatch.currentQuantity > 0), StockBatch.productId
+        ).execution_options(yield_per=LOAD_ROWS)).all()
+        thresholds = db.execute(scoped(
+            select(ReorderThreshold.productId, ReorderThreshold.reorderPoint, ReorderThreshold.reorderQuantity),
+            ReorderThreshold.productId,
+        )).all()
+        rates = db.execute(scoped(
+            select(DemandForecast.productId, DemandForecast.level, DemandForecast.std28), DemandForecast.productId
+        ).execution_options(yield_per=LOAD_ROWS)).all()
+        return (
+            batches,
+            {pid: (point, qty) for pid, point, qty in thresholds},
+            {pid: (level, std) for pid, level, std in rates},
+        )
+
+    def rebuild(self, db: Session):
+        """
+        Reloads everything from the database and swaps it in.
+        """
+        with self._sync:
+            self._rebuild(db)
+
+    def _rebuild(self, db: Session):
+        watermark = _utcnow()
+        batches, thresholds, rates = self._load(db)
+        db.rollback()  # End the read transaction; the thread's session is long-lived
+
+        by_product = {}
+        for batch_id, pid, expiry, qty in batches:
+            by_product.setdefault(pid, []).append((expiry or _FOREVER, batch_id, qty))
+        for rows in by_product.values():
+            rows.sort()
+
+        with self._lock:
+            self._batches = {batch_id: (pid, expiry, qty) for batch_id, pid, expiry, qty in batches}
+            self._by_product = by_product
+            self._expiry = sorted((expiry, batch_id) for batch_id, _, expiry, _ in batches if expiry is not None)
+            self._thresholds = thresholds
+            self._rates = rates
+            self._on_hand = {}
+            self._reorder = []
+            self._reorder_keys = {}
+            self._clock = watermark
+            for pid in set(by_product) | set(thresholds) | set(rates):
+                self._rescore(pid)
+            self._watermark = watermark
+            self._version += 1
+            self._built_at = time.monotonic()
+
+    def _reload(self, db: Session, product_ids):
+        product_ids = list(product_ids)
+        for i in range(0, len(product_ids), LOAD_ROWS):
+            chunk = product_ids[i:i + LOAD_ROWS]
+            batches, thresholds, rates = self._load(db, chunk)
+            with self._lock:
+                removed, added = set(), []
+                for pid in chunk:
+                    for expiry, batch_id, _ in self._by_product.pop(pid, ()):
+                        del self._batches[batch_id]
+                        if expiry != _FOREVER:
+                            removed.add((expiry, batch_id))
+                    self._thresholds.pop(pid, None)
+                    self._rates.pop(pid, None)
+                for batch_id, pid, expiry, qty in batches:
+                    self._batches[batch_id] = (pid, expiry, qty)
+                    self._by_product.setdefault(pid, []).append((expiry or _FOREVER, batch_id, qty))
+                    if expiry is not None:
+                        added.append((expiry, batch_id))
+
+                if len(removed) + len(added) > BULK_EDIT:
+                    # Timsort merges the already sorted survivors with the new run in about linear time
+                    added.sort()
+                    self._expiry = sorted([key for key in self._expiry if key not in removed] + added)
+                else:
+                    for key in removed:
+                        self._remove(self._expiry, key)
+                    for key in added:
+                        bisect.insort(self._expiry, key)
+                self._thresholds.update(thresholds)
+                self._rates.update(rates)
+                for pid in chunk:
+                    if pid in self._by_product:
+                        self._by_product[pid].sort()
+                    self._rescore(pid)
+                self._version += 1
+
+    # --- Incremental maintenance ----------------------------------------------
+
+    def notify(self, product_ids=(), batch_ids=()):
+        """
+        Marks products / batches as changed (called after commit, so no database work here).
+        """
+        with self._lock:
+            self._pending[0].update(product_ids)
+            self._pending[1].update(batch_ids)
+        self._wake.set()
+
+    def catch_up(self, db: Session, poll: bool = False):
+        """
+        Applies pending local changes and expiries since the last call; with `poll`, also every
+        product whose stock level or threshold was written (by any worker) since the watermark.
+        """
+        with self._sync:
+            self._catch_up(db, poll)
+
+    def _catch_up(self, db: Session, poll: bool):
+        with self._lock:
+            product_ids, batch_ids = self._pending
+            self._pending = (set(), set())
+        changed = set(product_ids)
+
+        unknown = []
+        for batch_id in batch_ids:
+            known = self._batches.get(batch_id)
+            if known:
+                changed.add(known[0])
+            else:
+                unknown.append(batch_id)
+        if unknown:
+            changed.update(db.scalars(select(StockBatch.productId).where(StockBatch.id.in_(unknown))))
+
+        if poll:
+            # Rows inside the overlap are seen by several polls; only reload the ones not applied yet
+            watermark = _utcnow()
+            since = self._watermark - POLL_OVERLAP
+            polled = {}
+            for model in (ProductStockLevel, ReorderThreshold):
+                for pid, updated in db.execute(select(model.productId, model.updatedAt).where(model.updatedAt >= since)):
+                    key = (model.__tablename__, pid)
+                    polled[key] = updated
+                    if self._polled.get(key) != updated:
+                        changed.add(pid)
+            self._polled = polled
+            self._watermark = watermark
+
+        if len(changed) > FULL_RELOAD_PRODUCTS:
+            self._rebuild(db)
+            return
+        if changed:
+            self._reload(db, changed)
+            db.rollback()
+        self._tick()
+
+    def _tick(self):
+        # Products whose batches expired since the last tick lose those units from sellable stock
+        now = _utcnow()
+        with self._lock:
+            lo = bisect.bisect_right(self._expiry, (self._clock, math.inf))
+            hi = bisect.bisect_right(self._expiry, (now, math.inf))
+            expired = {self._batches[batch_id][0] for _, batch_id in self._expiry[lo:hi]}
+            self._clock = now
+            for pid in expired:
+                self._rescore(pid)
+            if expired:
+                self._version += 1
+
+    @staticmethod
+    def _remove(ordered, key):
+        i = bisect.bisect_left(ordered, key)
+        if i < len(ordered) and ordered[i] == key:
+            del ordered[i]
+
+    def threshold(self, pid):
+        """
+        (reorderPoint, reorderQuantity, source) for a product, or None when it has neither a
+        threshold nor any forecast demand.
+        """
+        explicit = self._thresholds.get(pid)
+        if explicit:
+            return explicit[0], explicit[1], "threshold"
+        level, std = self._rates.get(pid, (0.0, 0.0))
+        if level <= 0:
+            return None
+        point = math.ceil(level * LEAD_TIME_DAYS + SAFETY_Z * std * math.sqrt(LEAD_TIME_DAYS))
+        return point, max(1, math.ceil(level * REVIEW_DAYS)), "forecast"
+
+    def _rescore(self, pid):
+        # Caller holds the lock
+        on_hand = sum(qty for expiry, _, qty in self._by_product.get(pid, ()) if expiry > self._clock)
+        self._on_hand[pid] = on_hand
+
+        old_key = self._reorder_keys.pop(pid, None)
+        if old_key is not None:
+            self._remove(self._reorder, old_key)
+        threshold = self.threshold(pid)
+        if threshold is not None and on_hand <= threshold[0]:
+            key = (on_hand / threshold[0] if threshold[0] else 0.0, pid)
+            self._reorder_keys[pid] = key
+            bisect.insort(self._reorder, key)
+
+    # --- Background thread ----------------------------------------------------
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="alert-engine", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        db = SessionLocal()
+        try:
+            while True:
+                self._wake.wait(ALERT_POLL_SECONDS)
+                self._wake.clear()
+                try:
+                    if time.monotonic() - self._built_at >= ALERT_REBUILD_SECONDS:
+                        self.rebuild(db)
+                    else:
+                        self.catch_up(db, poll=True)
+                except Exception:
+                    db.rollback()
+                    logger.exception("Alert engine refresh failed")
+        finally:
+            db.close()
+
+    # --- Reads ----------------------------------------------------------------
+
+    def _reorder_alert(self, pid):
+        point, quantity, source = self.threshold(pid)
+        on_hand = self._on_hand[pid]
+        level = self._rates.get(pid, (0.0, 0.0))[0]
+        return {
+            "productId": pid,
+            "onHand": on_hand,
+            "reorderPoint": point,
+            "reorderQuantity": quantity,
+            "suggestedQuantity": point + quantity - on_hand,
+            "dailyDemand": round(level, 3),
+            "daysOfCover": round(on_hand / level, 1) if level > 0 else None,
+            "thresholdSource": source,
+        }
+
+    def reorder_alerts(self, offset: int = 0, limit: int = 100):
+        """
+        Products at or below their reorder point, emptiest (relative to the point) first.
+        Returns (total, alerts).
+        """
+        with self._lock:
+            page = self._reorder[offset:offset + limit]
+            return len(self._reorder), [self._reorder_alert(pid) for _, pid in page]
+
+    def _expiry_window(self, within_days: float):
+        # Slice bounds of _expiry: [already expired ..., expiring within `within_days`]
+        now = _utcnow()
+        return now, bisect.bisect_right(self._expiry, (now + timedelta(days=within_days), math.inf))
+
+    def expiring(self, within_days: float = 7, offset: int = 0, limit: int = 100):
+        """
+        Non-empty batches that have expired or will within `within_days`, soonest first.
+        Returns (total, alerts).
+        """
+        with self._lock:
+            now, end = self._expiry_window(within_days)
+            alerts = []
+            for expiry, batch_id in self._expiry[offset:min(end, offset + limit)]:
+                pid, _, qty = self._batches[batch_id]
+                alerts.append({
+                    "batchId": batch_id,
+                    "productId": pid,
+                    "expiryDate": expiry,
+                    "quantity": qty,
+                    "daysLeft": round((expiry - now).total_seconds() / 86400, 2),
+                    "expired": expiry <= now,
+                })
+            return end, alerts
+
+    def markdowns(self, within_days: float = MARKDOWN_DAYS, offset: int = 0, limit: int = 100):
+        """
+        Unexpired batches inside the window that forecast demand will not clear before they expire,
+        soonest first. Units in the product's earlier-expiring batches are sold first (FEFO).
+        Returns (total, candidates).
+
+        Finding candidates walks the whole window, so the list is memoized until the engine
+        changes or MARKDOWN_CACHE_SECONDS pass (daysLeft may be that much behind).
+        """
+        with self._lock:
+            memo_key = (within_days, self._version, int(time.monotonic() // MARKDOWN_CACHE_SECONDS))
+            if self._markdown_memo[0] != memo_key:
+                self._markdown_memo = (memo_key, self._markdown_candidates(within_days))
+            candidates = self._markdown_memo[1]
+            return len(candidates), candidates[offset:offset + limit]
+
+    def _markdown_candidates(self, within_days: float):
+        with self._lock:
+            now, end = self._expiry_window(within_days)
+            start = bisect.bisect_right(self._expiry, (now, math.inf))
+            candidates = []
+            for expiry, batch_id in self._expiry[start:end]:
+                pid, _, qty = self._batches[batch_id]
+                days_left = (expiry - now).total_seconds() / 86400
+                ahead = 0
+                for other_expiry, other_id, other_qty in self._by_product[pid]:
+                    if other_id == batch_id:
+                        break
+                    if other_expiry > now:
+                        ahead += other_qty
+                level = self._rates.get(pid, (0.0, 0.0))[0]
+                sold = min(qty, max(0.0, level * days_left - ahead))
+                unsold = math.ceil(qty - sold)
+                if unsold <= 0:
+                    continue
+                candidates.append({
+                    "batchId": batch_id,
+                    "productId": pid,
+                    "expiryDate": expiry,
+                    "quantity": qty,
+                    "projectedUnsold": unsold,
+                    "daysLeft": round(days_left, 2),
+                    "suggestedDiscountPercent": markdown_percent(days_left),
+                })
+            return candidates
+
+    def stats(self):
+        with self._lock:
+            now, end = self._expiry_window(0)
+            return {
+                "batches": len(self._batches),
+                "products": len(self._on_hand),
+                "reorder": len(self._reorder),
+                "expired": end,
+                "builtSecondsAgo": round(time.monotonic() - self._built_at, 1) if self._built_at else None,
+            }
+
+
+alert_engine = AlertEngine()
+on_stock_committed(alert_engine.notify)
+_build_lock = threading.Lock()
+
+
+def get_alert_engine(db: Session) -> AlertEngine:
+    """
+    The process-wide engine, built on first use (which also starts its polling thread) and
+    caught up with this process's own commits.
+    """
+    if not alert_engine.ready:
+        with _build_lock:
+            if not alert_engine.ready:
+                alert_engine.rebuild(db)
+                alert_engine.start()
+    alert_engine.catch_up(db)
+    return alert_engine
@@ -0,0 +1,322 @@
+# backend/services/bulk_import.py
+import csv
+import json
+from collections import defaultdict
+from datetime import datetime, timezone
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import values, column, select, insert, literal, and_, cast, Integer, String, DateTime, Numeric
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from database import dialect_insert
+from services.cache import catalog_cache
+from services.stock_levels import refresh_stock_levels
+from models.category import Category
+from models.product import Product
+from models.batch import StockBatch
+from models.transaction import StockTransaction
+import schemas
+
+# Streaming catalog / delivery import.
+# The request body is parsed incrementally and written in chunks of CHUNK_SIZE rows, each chunk
+# being ONE multi-row INSERT ... ON CONFLICT upsert and one commit. Rows that fail validation
+# are reported back with their line number and never abort the rest of the load.
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+CSV_TYPES = {"text/csv", "application/csv"}
+NDJSON_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines"}
+NOT_UTF8 = "Not valid UTF-8"
+
+
+class ImportReport:
+    def __init__(self):
+        self.processed = 0
+        self.upserted = 0
+        self.errors = []
+        self.error_count = 0
+
+    def error(self, line: int, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self):
+        return {
+            "processed": self.processed,
+            "upserted": self.upserted,
+            "failed": self.error_count,
+            "errors": sorted(self.errors, key=lambda e: e["line"]),
+        }
+
+
+# --- Incremental parsing -----------------------------------------------------
+
+async def _iter_lines(stream):
+    """
+    Yields (text, valid) for each line of an async byte stream without buffering the whole
+    body. A line that is not valid UTF-8 comes with valid=False and U+FFFD in place of the bad
+    bytes (quotes and commas are ASCII, so it still splits where the raw bytes would).
+    """
+    buffer = b""
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield _decode(line)
+    if buffer:
+        yield _decode(buffer)
+
+
+def _decode(line: bytes):
+    try:
+        return line.decode("utf-8-sig").rstrip("\r"), True
+    except UnicodeDecodeError:
+        return line.decode("utf-8-sig", errors="replace").rstrip("\r"), False
+
+
+async def iter_records(stream, content_type: str):
+    """
+    Yields (line_number, record dict or None, error or None) for each CSV / NDJSON record.
+    CSV needs a header row; quoted fields may span lines.
+    """
+    if content_type in NDJSON_TYPES:
+        line_no = 0
+        async for line, valid in _iter_lines(stream):
+            line_no += 1
+            if not valid:
+                yield line_no, None, NOT_UTF8
+                continue
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("expected a JSON object")
+                yield line_no, record, None
+            except ValueError as e:
+                yield line_no, None, f"Invalid JSON: {e}"
+        return
+
+    header = None
+    pending, start, pending_valid = "", 0, True
+    line_no = 0
+    async for line, valid in _iter_lines(stream):
+        line_no += 1
+        if not pending:
+            start, pending_valid = line_no, True
+        pending += line
+        pending_valid = pending_valid and valid
+        # An odd number of quotes means a quoted field continues on the next line
+        if pending.count('"') % 2:
+            pending += "\n"
+            continue
+        fields, pending = next(csv.reader([pending])), ""
+        if not fields or fields == [""]:
+            continue
+        if not pending_valid:
+            if header is None:
+                # Nothing is written before the header, so the whole upload can still be refused
+                raise HTTPException(status_code=400, detail=f"CSV header row: {NOT_UTF8}")
+            yield start, None, NOT_UTF8
+        elif header is None:
+            header = [h.strip() for h in fields]
+        elif len(fields) != len(header):
+            yield start, None, f"Expected {len(header)} columns, got {len(fields)}"
+        else:
+            # Empty CSV cells mean "not provided", so model defaults apply
+            yield start, {k: v for k, v in zip(header, fields) if v != ""}, None
+    if pending:
+        yield start, None, "Unterminated quoted field"
+
+
+# --- Set-based upserts -------------------------------------------------------
+
+def _validate(chunk, schema, report: ImportReport):
+    rows = []
+    for line_no, record in chunk:
+        try:
+            rows.append((line_no, schema.model_validate(record).model_dump()))
+        except ValidationError as e:
+            problems = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            report.error(line_no, problems)
+    return rows
+
+
+def _dedupe(rows, key):
+    # A key may appear twice in one upload; the last occurrence wins (ON CONFLICT cannot hit a row twice)
+    latest = {}
+    for line_no, row in rows:
+        latest[key(row)] = (line_no, row)
+    return list(latest.values())
+
+
+def _rounds(rows, key):
+    # Splits rows so no statement sees a key twice: the n-th occurrence of a key goes in round n
+    rounds, seen = [], defaultdict(int)
+    for row in rows:
+        n = seen[key(row)]
+        seen[key(row)] += 1
+        if n == len(rounds):
+            rounds.append([])
+        rounds[n].append(row)
+    return rounds
+
+
+def _write_chunk(db: Session, rows, write, report: ImportReport):
+    """
+    Writes a validated chunk with one set-based statement. If the database still rejects it,
+    the chunk is retried row by row inside savepoints so only the offending rows are reported.
+    """
+    if not rows:
+        return
+    try:
+        write([row for _, row in rows])
+        db.commit()
+        report.upserted += len(rows)
+        return
+    except DBAPIError:
+        db.rollback()
+
+    for line_no, row in rows:
+        try:
+            with db.begin_nested():
+                write([row])
+            report.upserted += 1
+        except DBAPIError as e:
+            report.error(line_no, str(e.orig).strip().splitlines()[0])
+    db.commit()
+
+
+def import_products(db: Session, chunk, report: ImportReport):
+    """
+    Upserts a chunk of (line_number, record) product rows on `sku`.
+    """
+    rows = _dedupe(_validate(chunk, schemas.ProductCreate, report), key=lambda r: r["sku"])
+
+    known = set(db.scalars(select(Category.id).where(Category.id.in_({r["categoryId"] for _, r in rows}))))
+    valid = []
+    for line_no, row in rows:
+        if row["categoryId"] in known:
+            valid.append((line_no, row))
+        else:
+            report.error(line_no, f"Unknown categoryId {row['categoryId']}")
+
+    def write(batch):
+        stmt = dialect_insert(db, Product).values(batch)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Product.sku],
+            set_={c: stmt.excluded[c] for c in batch[0] if c != "sku"},
+        )
+        db.execute(stmt)
+
+    _write_chunk(db, valid, write, report)
+    catalog_cache.invalidate("products")
+
+
+def import_batches(db: Session, chunk, report: ImportReport, recorded_by: str):
+    """
+    Upserts a chunk of delivery rows on (productId, batchNumber) and logs a 'stock_in'
+    transaction for every row that delivered stock. A row may name its product by `sku`
+    instead of `productId`. Re-delivering an existing batch adds to its quantity, also when the
+    same upload lists a batch twice: each row is a delivery of its own, with its own stock_in.
+    """
+    skus = {r["sku"] for _, r in chunk if "sku" in r and "productId" not in r}
+    sku_ids = dict(db.execute(select(Product.sku, Product.id).where(Product.sku.in_(skus))).all()) if skus else {}
+    resolved = []
+    for line_no, record in chunk:
+        if "productId" not in record and "sku" in record:
+            if record["sku"] not in sku_ids:
+                report.error(line_no, f"Unknown sku {record['sku']}")
+                continue
+            record = dict(record, productId=sku_ids[record["sku"]])
+        record.pop("sku", None)
+        resolved.append((line_no, record))
+
+    rows = _validate(resolved, schemas.StockBatchCreate, report)
+    known = set(db.scalars(select(Product.id).where(Product.id.in_({r["productId"] for _, r in rows}))))
+    valid = []
+    for line_no, row in rows:
+        if row["productId"] in known:
+            valid.append((line_no, dict(row, currentQuantity=row["currentQuantity"] or 0)))
+        else:
+            report.error(line_no, f"Unknown productId {row['productId']}")
+
+    now = datetime.now(timezone.utc)
+    postgres = db.get_bind().dialect.name == "postgresql"
+
+    def write_sqlite(batch):
+        # Fallback (SQLite): the same upsert, then the audit rows as a second bulk insert
+        stmt = dialect_insert(db, StockBatch).values(batch)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[StockBatch.productId, StockBatch.batchNumber],
+            set_=_batch_conflict_set(stmt.excluded),
+        ).returning(StockBatch.id, StockBatch.productId, StockBatch.batchNumber)
+        ids = {(r.productId, r.batchNumber): r.id for r in db.execute(stmt)}
+        audit = [
+            {"batchId": ids[(r["productId"], r["batchNumber"])], "transactionType": "stock_in",
+             "quantity": r["currentQuantity"], "recordedBy": recorded_by, "timestamp": now}
+            for r in batch if r["currentQuantity"] > 0
+        ]
+        if audit:
+            db.execute(insert(StockTransaction), audit)
+
+    def write(batch):
+        # Usually one round; a batch repeated within the chunk is upserted again in the next
+        for deliveries in _rounds(batch, key=lambda r: (r["productId"], r["batchNumber"])):
+            if postgres:
+                db.execute(_batch_upsert_with_audit(deliveries, recorded_by, now))
+            else:
+                write_sqlite(deliveries)
+        refresh_stock_levels(db, product_ids={r["productId"] for r in batch})
+
+    _write_chunk(db, valid, write, report)
+
+
+BATCH_COLUMNS = ("productId", "batchNumber", "manufactureDate", "expiryDate", "retailPrice", "currentQuantity")
+
+
+def _batch_conflict_set(excluded):
+    return {
+        "manufactureDate": excluded.manufactureDate,
+        "expiryDate": excluded.expiryDate,
+        "retailPrice": excluded.retailPrice,
+        "currentQuantity": StockBatch.currentQuantity + excluded.currentQuantity,
+    }
+
+
+def _batch_upsert_with_audit(batch, recorded_by: str, now: datetime):
+    """
+    Builds ONE Postgres statement that upserts the batches and inserts their audit rows:
+
+        WITH incoming AS (VALUES ...),
+             upserted AS (INSERT INTO stock_batches SELECT * FROM incoming ON CONFLICT ... RETURNING ...)
+        INSERT INTO stock_transactions SELECT ... FROM upserted JOIN incoming ...
+    """
+    incoming = values(
+        column("productId", Integer),
+        column("batchNumber", String),
+        column("manufactureDate", DateTime),
+        column("expiryDate", DateTime),
+        column("retailPrice", Numeric(10, 2)),
+        column("currentQuantity", Integer),
+        name="incoming",
+    ).data([tuple(r[c] for c in BATCH_COLUMNS) for r in batch]).cte("incoming")
+
+    # Explicit casts: a NULL in the first VALUES row would otherwise be typed as text
+    upsert = pg_insert(StockBatch).from_select(list(BATCH_COLUMNS), select(*(cast(c, c.type) for c in incoming.c)))
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[StockBatch.productId, StockBatch.batchNumber],
+        set_=_batch_conflict_set(upsert.excluded),
+    ).returning(StockBatch.id, StockBatch.productId, StockBatch.batchNumber)
+    upserted = upsert.cte("upserted")
+
+    audit = insert(StockTransaction).from_select(
+        ["batchId", "transactionType", "quantity", "recordedBy", "timestamp"],
+        select(upserted.c.id, literal("stock_in"), incoming.c.currentQuantity, literal(recorded_by), literal(now))
+        .join(incoming, and_(incoming.c.productId == upserted.c.productId, incoming.c.batchNumber == upserted.c.batchNumber))
+        .where(incoming.c.currentQuantity > 0),
+    )
+    return audit.add_cte(incoming).add_cte(upserted)
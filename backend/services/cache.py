@@ -0,0 +1,199 @@
+# backend/services/cache.py
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from database import READ_YOUR_WRITES_SECONDS, REPLICA_DATABASE_URL, wrote_recently
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Bounded in-process cache with LRU eviction and a per-entry time-to-live.
+
+    Keys live in namespaces (e.g. "products") so a write can drop everything that might
+    contain stale data in one call. A generation counter per namespace stops a read that
+    started before an invalidation from storing its (now stale) result afterwards, and for
+    `settle` seconds after an invalidation nothing is stored at all: a read served by a lagging
+    replica in that window may still miss the write. `bus` (see RedisInvalidationBus) carries
+    invalidations to the copies of this cache in the other workers.
+    """
+    def __init__(self, max_entries: int = 1024, ttl: float = 60.0, settle: float = 0.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.settle = settle
+        self.bus = None
+        self._entries = OrderedDict()  # (namespace, key) -> (expires_at, value)
+        self._generations = {}
+        self._invalidated_at = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def generation(self, namespace: str) -> int:
+        with self._lock:
+            return self._generations.get(namespace, 0)
+
+    def settled_at(self, namespace: str) -> float:
+        # time.monotonic() from which values built for `namespace` may be stored again
+        with self._lock:
+            return self._invalidated_at.get(namespace, float("-inf")) + self.settle
+
+    def get(self, namespace: str, key):
+        with self._lock:
+            item = self._entries.get((namespace, key))
+            if item is None:
+                self.misses += 1
+                return None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._entries[(namespace, key)]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end((namespace, key))
+            self.hits += 1
+            return value
+
+    def put(self, namespace: str, key, value, generation: int = None):
+        with self._lock:
+            if generation is not None and generation != self._generations.get(namespace, 0):
+                return  # Invalidated while this value was being built
+            if time.monotonic() < self._invalidated_at.get(namespace, float("-inf")) + self.settle:
+                return
+            self._entries[(namespace, key)] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, namespace: str, key):
+        with self._lock:
+            item = self._entries.pop((namespace, key), None)
+            return item[1] if item else None
+
+    def invalidate(self, *namespaces: str):
+        self.drop(*namespaces)
+        if self.bus is not None:
+            self.bus.publish(namespaces)
+
+    def drop(self, *namespaces: str):
+        # invalidate() for this process only
+        now = time.monotonic()
+        with self._lock:
+            for namespace in namespaces:
+                self._generations[namespace] = self._generations.get(namespace, 0) + 1
+                self._invalidated_at[namespace] = now
+            stale = [k for k in self._entries if k[0] in namespaces]
+            for k in stale:
+                del self._entries[k]
+            self.invalidations += 1
+
+    def namespaces(self):
+        with self._lock:
+            return set(self._generations) | {k[0] for k in self._entries}
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxEntries": self.max_entries,
+                "ttlSeconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRatio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+class RedisInvalidationBus:
+    """
+    Publishes a cache's invalidations on a Redis channel and applies the ones published by
+    other workers and nodes, so a catalog write served by one worker does not leave the others
+    serving stale pages until their TTL runs out. A listener that loses its connection drops
+    the whole cache on reconnecting, since whatever was published meanwhile is gone.
+    """
+    def __init__(self, url: str, cache: TTLCache, channel: str):
+        import redis  # Optional dependency, only needed for CATALOG_CACHE_BUS=redis
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._errors = (redis.RedisError, OSError)
+        self.cache = cache
+        self.channel = channel
+        self.origin = uuid.uuid4().hex
+        threading.Thread(target=self._listen, name=f"cache-bus-{channel}", daemon=True).start()
+
+    def publish(self, namespaces):
+        try:
+            self._redis.publish(self.channel, " ".join((self.origin, *namespaces)))
+        except self._errors:
+            # The write itself succeeded; the other workers catch up when their TTL passes
+            logger.exception("Could not publish the invalidation of %s", namespaces)
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                self.cache.drop(*self.cache.namespaces())
+                for message in pubsub.listen():
+                    origin, *namespaces = message["data"].split()
+                    if origin != self.origin:
+                        self.cache.drop(*namespaces)
+            except self._errors:
+                logger.warning("Cache invalidation channel %s lost, reconnecting", self.channel, exc_info=True)
+                time.sleep(1)
+
+
+# Catalog reads (categories, products) change a few times a day but are fetched on every page view.
+# Behind a read replica, pages are not cached until the read-your-writes window after a write has passed.
+catalog_cache = TTLCache(
+    max_entries=int(os.getenv("CATALOG_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("CATALOG_CACHE_TTL", "60")),
+    settle=READ_YOUR_WRITES_SECONDS if REPLICA_DATABASE_URL else 0.0,
+)
+
+# With more than one worker process (or node), CATALOG_CACHE_BUS=redis shares invalidations over REDIS_URL
+if os.getenv("CATALOG_CACHE_BUS", "local") == "redis":
+    catalog_cache.bus = RedisInvalidationBus(os.getenv("REDIS_URL", "redis://localhost:6379/0"), catalog_cache, "catalog-cache")
+
+# Response headers worth replaying from a cached page (e.g. X-Next-Cursor)
+_SKIPPED_HEADERS = {"content-length", "content-type"}
+
+
+def cached_json_response(request: Request, cache: TTLCache, namespace: str, key, response_model, build) -> Response:
+    """
+    Read-through helper for list endpoints. `build(response)` runs the real query on a miss
+    (it may set headers on `response`); its result is serialized with `response_model` once and
+    the JSON bytes are cached with an ETag. A matching If-None-Match gets a bodyless 304.
+    A client that has just written (see database.wrote_recently) is always served a fresh build.
+    """
+    entry = None if wrote_recently(request) else cache.get(namespace, key)
+    if entry is None:
+        generation = cache.generation(namespace)
+        scratch = Response()
+        adapter = TypeAdapter(response_model)
+        body = adapter.dump_json(adapter.validate_python(build(scratch), from_attributes=True))
+        headers = {k: v for k, v in scratch.headers.items() if k not in _SKIPPED_HEADERS}
+        headers["ETag"] = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        # Clients may keep a copy but must revalidate it; revalidation is a cheap 304
+        headers["Cache-Control"] = "no-cache"
+        entry = (body, headers)
+        cache.put(namespace, key, entry, generation)
+
+    body, headers = entry
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and headers["ETag"] in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,392 @@
+# backend/services/cart_store.py
+import atexit
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models.cart import Cart, CartItem
+
+logger = logging.getLogger(__name__)
+
+# Cart state lives in a fast key-value store and is written behind to the carts / cart_items
+# tables in batches. Postgres stays the durable copy: a cart missing from the store is
+# read through from it, and checkout always flushes the user's cart synchronously first.
+#
+#   CART_STORE=memory (default)  in-process LRU, for tests and single-process deployments
+#   CART_STORE=redis             shared across workers/nodes, REDIS_URL=redis://host:6379/0
+
+
+# --- Postgres side -----------------------------------------------------------
+
+def load_cart(db: Session, user_id: int):
+    """
+    Reads one user's cart straight from Postgres. Returns (cart_id or None, {product_id: quantity}).
+    """
+    rows = db.execute(
+        select(Cart.id, CartItem.product_id, CartItem.quantity)
+        .outerjoin(CartItem, CartItem.cart_id == Cart.id)
+        .where(Cart.user_id == user_id)
+    ).all()
+    if not rows:
+        return None, {}
+    return rows[0].id, {r.product_id: r.quantity for r in rows if r.product_id is not None}
+
+
+def write_carts(db: Session, snapshots):
+    """
+    Persists many carts in a fixed number of statements and commits.
+    `snapshots` is {user_id: {product_id: quantity}}; returns {user_id: cart_id}.
+    """
+    user_ids = list(snapshots)
+    cart_ids = dict(db.execute(select(Cart.user_id, Cart.id).where(Cart.user_id.in_(user_ids))).all())
+
+    # Only carts that actually hold something get a new row
+    new_users = [uid for uid in user_ids if uid not in cart_ids and snapshots[uid]]
+    if new_users:
+        created = db.execute(insert(Cart).returning(Cart.user_id, Cart.id), [{"user_id": uid} for uid in new_users])
+        cart_ids.update(dict(created.all()))
+
+    touched = [cart_ids[uid] for uid in user_ids if uid in cart_ids]
+    if touched:
+        db.execute(delete(CartItem).where(CartItem.cart_id.in_(touched)))
+        db.execute(update(Cart).where(Cart.id.in_(touched)).values(updated_at=datetime.now(timezone.utc)))
+        rows = [
+            {"cart_id": cart_ids[uid], "product_id": pid, "quantity": qty}
+            for uid in user_ids if uid in cart_ids
+            for pid, qty in snapshots[uid].items()
+        ]
+        if rows:
+            db.execute(insert(CartItem), rows)
+
+    db.commit()
+    return cart_ids
+
+
+# --- Store backends ----------------------------------------------------------
+
+class InMemoryCartStore:
+    """
+    Process-local cart store with LRU eviction. Carts with unflushed changes are never evicted.
+    """
+    def __init__(self, max_carts: int = 10000):
+        self.max_carts = max_carts
+        self._carts = OrderedDict()  # user_id -> {"cart_id": int or None, "items": {product_id: quantity}}
+        self._dirty = set()
+        self._flushing = set()
+        self._lock = threading.Lock()
+        self._flushed = threading.Condition(self._lock)
+
+    def _entry(self, db: Session, user_id: int):
+        with self._lock:
+            entry = self._carts.get(user_id)
+            if entry is not None:
+                self._carts.move_to_end(user_id)
+                return entry
+
+        # Miss: read through from Postgres outside the lock so other users are not blocked
+        cart_id, items = load_cart(db, user_id)
+        with self._lock:
+            entry = self._carts.setdefault(user_id, {"cart_id": cart_id, "items": items})
+            self._carts.move_to_end(user_id)
+            self._evict()
+            return entry
+
+    def _evict(self):
+        for user_id in list(self._carts):
+            if len(self._carts) <= self.max_carts:
+                break
+            if user_id not in self._dirty and user_id not in self._flushing:
+                del self._carts[user_id]
+
+    def get(self, db: Session, user_id: int):
+        entry = self._entry(db, user_id)
+        with self._lock:
+            return entry["cart_id"], dict(entry["items"])
+
+    def add(self, db: Session, user_id: int, product_id: int, quantity: int):
+        entry = self._entry(db, user_id)
+        with self._lock:
+            entry["items"][product_id] = entry["items"].get(product_id, 0) + quantity
+            self._dirty.add(user_id)
+
+    def set(self, db: Session, user_id: int, product_id: int, quantity: int):
+        """
+        Sets a line's quantity; zero or less removes the line.
+        """
+        entry = self._entry(db, user_id)
+        with self._lock:
+            if quantity <= 0:
+                entry["items"].pop(product_id, None)
+            else:
+                entry["items"][product_id] = quantity
+            self._dirty.add(user_id)
+
+    def consume(self, user_id: int, ordered):
+        """
+        Takes what checkout ordered ({product_id: quantity}) off the cart. Edits made after the
+        checkout's flush are not in the order: the cart keeps the difference and is written
+        behind again, as its Postgres row went with the checkout. A cart with nothing left is
+        dropped, unless the write-behind is still writing its old content.
+        """
+        with self._lock:
+            entry = self._carts.get(user_id)
+            if entry is None:
+                return
+            remaining = {pid: qty - ordered.get(pid, 0) for pid, qty in entry["items"].items()}
+            remaining = {pid: qty for pid, qty in remaining.items() if qty > 0}
+            if remaining or user_id in self._flushing:
+                entry["cart_id"], entry["items"] = None, remaining
+                self._dirty.add(user_id)
+            else:
+                del self._carts[user_id]
+                self._dirty.discard(user_id)
+
+    def flush(self, db: Session, user_ids=None):
+        # Take the dirty marks BEFORE snapshotting: an edit racing with the write re-marks the cart
+        with self._lock:
+            if user_ids is not None:
+                # The write-behind thread may be writing these carts right now; the caller (checkout)
+                # reads them from Postgres next, so that write has to land first
+                self._flushed.wait_for(lambda: self._flushing.isdisjoint(user_ids))
+            targets = self._dirty if user_ids is None else self._dirty.intersection(user_ids)
+            targets = list(targets)
+            self._dirty.difference_update(targets)
+            self._flushing.update(targets)
+            snapshots = {uid: dict(self._carts[uid]["items"]) for uid in targets}
+        if not snapshots:
+            return 0
+        try:
+            cart_ids = write_carts(db, snapshots)
+        except Exception:
+            db.rollback()
+            with self._lock:
+                self._dirty.update(snapshots)
+                self._flushing.difference_update(snapshots)
+                self._flushed.notify_all()
+            raise
+        with self._lock:
+            self._flushing.difference_update(snapshots)
+            self._flushed.notify_all()
+            for uid, cart_id in cart_ids.items():
+                if uid in self._carts:
+                    self._carts[uid]["cart_id"] = cart_id
+        return len(snapshots)
+
+
+# Flushes claim their carts atomically: taking a user off the dirty set also sets an in-flight
+# marker `cart:flushing:<user_id>` (a lease, so a worker dying mid-write cannot block the cart
+# for good). This is the Redis counterpart of InMemoryCartStore._flushing, across workers.
+_CLAIM_DIRTY = """
+local claimed = {}
+for _, uid in ipairs(redis.call('SPOP', KEYS[1], ARGV[3])) do
+    if redis.call('SET', 'cart:flushing:' .. uid, ARGV[1], 'NX', 'PX', ARGV[2]) then
+        table.insert(claimed, uid)
+    else
+        redis.call('SADD', KEYS[1], uid)  -- A checkout is writing it; next cycle
+    end
+end
+return claimed
+"""
+# All or nothing: -1 while another flush holds any of the users
+_CLAIM_USERS = """
+for i = 3, #ARGV do
+    if redis.call('EXISTS', 'cart:flushing:' .. ARGV[i]) == 1 then
+        return -1
+    end
+end
+local claimed = {}
+for i = 3, #ARGV do
+    if redis.call('SREM', KEYS[1], ARGV[i]) == 1 then
+        redis.call('SET', 'cart:flushing:' .. ARGV[i], ARGV[1], 'PX', ARGV[2])
+        table.insert(claimed, ARGV[i])
+    end
+end
+return claimed
+"""
+# Checkout's counterpart of InMemoryCartStore.consume, atomic against concurrent cart edits
+_CONSUME = """
+for i = 2, #ARGV, 2 do
+    if redis.call('HEXISTS', KEYS[1], ARGV[i]) == 1 and redis.call('HINCRBY', KEYS[1], ARGV[i], -ARGV[i + 1]) <= 0 then
+        redis.call('HDEL', KEYS[1], ARGV[i])
+    end
+end
+if redis.call('HLEN', KEYS[1]) <= 1 and redis.call('EXISTS', 'cart:flushing:' .. ARGV[1]) == 0 then
+    redis.call('DEL', KEYS[1])
+    redis.call('SREM', KEYS[2], ARGV[1])
+else
+    redis.call('HSET', KEYS[1], 'cart_id', '')
+    redis.call('PERSIST', KEYS[1])
+    redis.call('SADD', KEYS[2], ARGV[1])
+end
+"""
+_RELEASE = """
+for i = 2, #ARGV do
+    if redis.call('GET', 'cart:flushing:' .. ARGV[i]) == ARGV[1] then
+        redis.call('DEL', 'cart:flushing:' .. ARGV[i])
+    end
+end
+"""
+
+
+class RedisCartStore:
+    """
+    Redis-backed cart store shared by every worker. Each cart is a hash `cart:<user_id>` of
+    product_id -> quantity, plus a `cart_id` field that also marks the cart as loaded.
+    Clean carts expire after `ttl` seconds and are read through from Postgres again.
+    """
+    DIRTY_KEY = "cart:dirty"
+    FLUSH_LEASE_MS = 30000     # Longest a flush may hold its carts
+    FLUSH_POLL = 0.01
+
+    def __init__(self, url: str, ttl: int = 86400):
+        import redis  # Optional dependency, only needed for CART_STORE=redis
+
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self.ttl = ttl
+        self._claim_dirty = self._redis.register_script(_CLAIM_DIRTY)
+        self._claim_users = self._redis.register_script(_CLAIM_USERS)
+        self._release = self._redis.register_script(_RELEASE)
+        self._consume = self._redis.register_script(_CONSUME)
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"cart:{user_id}"
+
+    def _ensure_loaded(self, db: Session, user_id: int):
+        key = self._key(user_id)
+        if self._redis.exists(key):
+            return key
+        cart_id, items = load_cart(db, user_id)
+        mapping = {"cart_id": cart_id or ""}
+        mapping.update({str(pid): qty for pid, qty in items.items()})
+        pipe = self._redis.pipeline()
+        # HSETNX on the marker avoids clobbering a concurrent writer that loaded first
+        pipe.hsetnx(key, "cart_id", mapping.pop("cart_id"))
+        for field, qty in mapping.items():
+            pipe.hsetnx(key, field, qty)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+        return key
+
+    @staticmethod
+    def _decode(raw):
+        cart_id = raw.pop("cart_id", "")
+        return (int(cart_id) if cart_id else None), {int(pid): int(qty) for pid, qty in raw.items()}
+
+    def get(self, db: Session, user_id: int):
+        return self._decode(self._redis.hgetall(self._ensure_loaded(db, user_id)))
+
+    def add(self, db: Session, user_id: int, product_id: int, quantity: int):
+        key = self._ensure_loaded(db, user_id)
+        pipe = self._redis.pipeline()
+        pipe.hincrby(key, str(product_id), quantity)
+        pipe.persist(key)
+        pipe.sadd(self.DIRTY_KEY, user_id)
+        pipe.execute()
+
+    def set(self, db: Session, user_id: int, product_id: int, quantity: int):
+        key = self._ensure_loaded(db, user_id)
+        pipe = self._redis.pipeline()
+        if quantity <= 0:
+            pipe.hdel(key, str(product_id))
+        else:
+            pipe.hset(key, str(product_id), quantity)
+        pipe.persist(key)
+        pipe.sadd(self.DIRTY_KEY, user_id)
+        pipe.execute()
+
+    def consume(self, user_id: int, ordered):
+        args = [user_id]
+        for pid, qty in ordered.items():
+            args += [pid, qty]
+        self._consume(keys=[self._key(user_id), self.DIRTY_KEY], args=args)
+
+    def flush(self, db: Session, user_ids=None):
+        token = uuid.uuid4().hex
+        if user_ids is None:
+            claimed = self._claim_dirty(keys=[self.DIRTY_KEY], args=[token, self.FLUSH_LEASE_MS, 1000])
+        else:
+            # Another worker's write-behind may be writing these carts right now; the caller
+            # (checkout) reads them from Postgres next, so that write has to land first
+            while (claimed := self._claim_users(keys=[self.DIRTY_KEY], args=[token, self.FLUSH_LEASE_MS, *user_ids])) == -1:
+                time.sleep(self.FLUSH_POLL)
+        targets = [int(uid) for uid in claimed]
+        if not targets:
+            return 0
+
+        try:
+            pipe = self._redis.pipeline()
+            for uid in targets:
+                pipe.hgetall(self._key(uid))
+            snapshots = {uid: self._decode(raw)[1] for uid, raw in zip(targets, pipe.execute())}
+            try:
+                cart_ids = write_carts(db, snapshots)
+            except Exception:
+                db.rollback()
+                self._redis.sadd(self.DIRTY_KEY, *targets)
+                raise
+
+            pipe = self._redis.pipeline()
+            for uid in targets:
+                key = self._key(uid)
+                if uid in cart_ids:
+                    pipe.hset(key, "cart_id", cart_ids[uid])
+                pipe.expire(key, self.ttl)
+            pipe.execute()
+        finally:
+            self._release(args=[token, *targets])
+        return len(targets)
+
+
+# --- Store singleton and write-behind loop -----------------------------------
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def _write_behind(store, interval: float):
+    while True:
+        time.sleep(interval)
+        flush_all(store)
+
+
+def flush_all(store=None):
+    store = store or _store
+    if store is None:
+        return
+    db = SessionLocal()
+    try:
+        store.flush(db)
+    except Exception:
+        logger.exception("Cart write-behind flush failed; will retry next cycle")
+    finally:
+        db.close()
+
+
+def get_cart_store():
+    """
+    Returns the process-wide cart store, creating it (and its write-behind thread) on first use.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if os.getenv("CART_STORE", "memory") == "redis":
+                    store = RedisCartStore(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+                else:
+                    if int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+                        # Each worker would see only the carts it served itself
+                        logger.warning("CART_STORE=memory with WEB_CONCURRENCY > 1: set CART_STORE=redis")
+                    store = InMemoryCartStore(int(os.getenv("CART_STORE_MAX_CARTS", "10000")))
+                interval = float(os.getenv("CART_FLUSH_INTERVAL", "2"))
+                threading.Thread(target=_write_behind, args=(store, interval), daemon=True, name="cart-write-behind").start()
+                # Don't lose buffered edits on a clean shutdown
+                atexit.register(flush_all, store)
+                _store = store
+    return _store
@@ -0,0 +1,233 @@
+# backend/services/forecasting.py
+import threading
+import time
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, delete, func, union_all, or_, not_
+from sqlalchemy.orm import Session
+from database import dialect_insert
+from models.orders import Order, OrderItem
+from models.product import Product
+from models.batch import StockBatch
+from services.ledger_archive import LEDGERS, reaches_archive
+from models.forecast import DemandForecast
+
+# Batch demand-forecasting pipeline.
+#
+# Demand = online order lines (OrderItem, minus cancelled orders) + in-store 'sale' ledger rows.
+# Checkout also writes a 'sale' ledger row per batch it drew from; those are the same units as the
+# order lines, so ledger rows recorded by checkout are left out.
+#
+# Products are processed in shards sized to a memory budget. Each shard's daily demand is
+# aggregated in SQL, streamed through a server-side cursor in chunks and scattered into a dense
+# (products x days) float32 matrix; every feature below is whole-matrix NumPy arithmetic.
+
+HISTORY_DAYS = 365
+HORIZON_DAYS = 14
+MATRIX_BUDGET_MB = 32     # Demand matrix plus its working copies, per shard
+FETCH_ROWS = 20000        # Rows per server-side cursor round trip
+SMOOTHING = 0.2           # Exponential smoothing factor for the demand level
+SEASONAL_SHRINKAGE = 28   # Active days at which the weekday profile gets half weight
+EXCLUDED_ORDER_STATUSES = ("Abort", "Cancelled")
+CHECKOUT_SALE_PREFIX = "Checkout (Order #"
+
+_refresh_lock = threading.Lock()
+
+
+class RefreshInProgress(Exception):
+    pass
+
+
+def _shard_size(history_days: int, budget_mb: int) -> int:
+    # ~4 float32/float64 working copies of the matrix are alive at the peak
+    return max(100, int(budget_mb * 2**20 // (history_days * 4 * 4)))
+
+
+def _daily_demand(lo: int, hi: int, start: datetime, end: datetime):
+    """
+    (productId, day, units) for products lo..hi, one row per product and day with demand.
+    """
+    order_day = func.date(Order.created_at)
+    online = (
+        select(OrderItem.product_id.label("productId"), order_day.label("day"), func.sum(OrderItem.quantity).label("units"))
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(
+            OrderItem.product_id.between(lo, hi),
+            Order.created_at >= start, Order.created_at < end,
+            Order.current_status.notin_(EXCLUDED_ORDER_STATUSES),
+        )
+        .group_by(OrderItem.product_id, order_day)
+    )
+
+    def in_store(ledger):
+        sale_day = func.date(ledger.timestamp)
+        return (
+            select(StockBatch.productId, sale_day, func.sum(ledger.quantity))
+            .join(StockBatch, StockBatch.id == ledger.batchId)
+            .where(
+                StockBatch.productId.between(lo, hi),
+                ledger.transactionType == "sale",
+                or_(ledger.recordedBy.is_(None), not_(ledger.recordedBy.startswith(CHECKOUT_SALE_PREFIX))),
+                ledger.timestamp >= start, ledger.timestamp < end,
+            )
+            .group_by(StockBatch.productId, sale_day)
+        )
+
+    # A year of history reaches into archived months; a day never spans both tables
+    hot, archive, _ = LEDGERS["stock_transactions"]
+    sources = (hot, archive) if reaches_archive(start) else (hot,)
+    return union_all(online, *(in_store(ledger) for ledger in sources))
+
+
+def load_demand_matrix(db: Session, product_ids: np.ndarray, start_day: date, n_days: int):
+    """
+    Streams the shard's daily demand into a (len(product_ids), n_days) float32 matrix.
+    Returns (matrix, rows read).
+    """
+    matrix = np.zeros((len(product_ids), n_days), dtype=np.float32)
+    start = datetime.combine(start_day, dt_time())
+    stmt = _daily_demand(int(product_ids[0]), int(product_ids[-1]), start, start + timedelta(days=n_days))
+    result = db.execute(stmt.execution_options(stream_results=True, yield_per=FETCH_ROWS))
+
+    rows_read = 0
+    for chunk in result.partitions():
+        frame = pd.DataFrame.from_records(chunk, columns=["productId", "day", "units"])
+        rows_read += len(frame)
+        pids = frame["productId"].to_numpy(dtype=np.int64)
+        rows = np.searchsorted(product_ids, pids).clip(max=len(product_ids) - 1)
+        days = (pd.to_datetime(frame["day"]).to_numpy().astype("datetime64[D]") - np.datetime64(start_day, "D")).astype(np.int64)
+        # Order lines of since-deleted products fall between live ids; drop them
+        keep = (product_ids[rows] == pids) & (days >= 0) & (days < n_days)
+        np.add.at(matrix, (rows[keep], days[keep]), frame["units"].to_numpy(dtype=np.float32)[keep])
+    return matrix, rows_read
+
+
+def _weekdays(start_day: date, n_days: int) -> np.ndarray:
+    # Monday = 0 (1970-01-01 was a Thursday)
+    return (np.arange(n_days) + (start_day - date(1970, 1, 1)).days + 3) % 7
+
+
+def demand_features(matrix: np.ndarray, start_day: date, horizon: int = HORIZON_DAYS):
+    """
+    Rolling, seasonal and smoothed-level features plus a baseline forecast for every row of
+    `matrix` at once. The forecast is level x weekday index for each of the next `horizon` days.
+    """
+    n_products, n_days = matrix.shape
+    history = matrix.astype(np.float64)
+    last28 = history[:, -28:]
+
+    # Exponential smoothing (adjust=False) as one dot product: weights a(1-a)^k, oldest day gets (1-a)^(n-1)
+    weights = SMOOTHING * (1 - SMOOTHING) ** np.arange(n_days - 1, -1, -1)
+    weights[0] = (1 - SMOOTHING) ** (n_days - 1)
+    level = history @ weights
+
+    # Weekday profile relative to the overall mean, shrunk towards flat for sparse histories
+    weekdays = _weekdays(start_day, n_days)
+    one_hot = np.eye(7)[weekdays]                                  # (n_days, 7)
+    weekday_mean = (history @ one_hot) / one_hot.sum(axis=0)
+    overall = history.mean(axis=1, keepdims=True)
+    raw_index = np.divide(weekday_mean, overall, out=np.ones_like(weekday_mean), where=overall > 0)
+    active_days = (history > 0).sum(axis=1)
+    confidence = (active_days / (active_days + SEASONAL_SHRINKAGE))[:, None]
+    weekday_index = 1 + (raw_index - 1) * confidence
+
+    future_weekdays = (weekdays[-1] + np.arange(1, horizon + 1)) % 7
+    forecast = level[:, None] * weekday_index[:, future_weekdays]
+
+    return {
+        "totalUnits": history.sum(axis=1),
+        "activeDays": active_days,
+        "mean7": history[:, -7:].mean(axis=1),
+        "mean28": last28.mean(axis=1),
+        "std28": last28.std(axis=1),
+        "level": level,
+        "weekdayIndex": weekday_index,
+        "forecast": forecast,
+    }
+
+
+def _write_forecasts(db: Session, product_ids, features, history_start: date, history_end: date, generated_at: datetime):
+    live = np.flatnonzero(features["totalUnits"] > 0)
+    if not len(live):
+        return 0
+    scalars = {k: np.round(features[k][live], 4).tolist() for k in ("totalUnits", "mean7", "mean28", "std28", "level")}
+    weekday_index = np.round(features["weekdayIndex"][live], 4).tolist()
+    forecast = np.round(features["forecast"][live], 3).tolist()
+    active_days = features["activeDays"][live].tolist()
+    rows = [
+        {
+            "productId": pid, "generatedAt": generated_at, "historyStart": history_start, "historyEnd": history_end,
+            "activeDays": active_days[i], "weekdayIndex": weekday_index[i], "forecast": forecast[i],
+            **{k: v[i] for k, v in scalars.items()},
+        }
+        for i, pid in enumerate(product_ids[live].tolist())
+    ]
+    # One compiled upsert, executed as a batched executemany
+    stmt = dialect_insert(db, DemandForecast)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DemandForecast.productId],
+        set_={c: stmt.excluded[c] for c in rows[0] if c != "productId"},
+    )
+    db.execute(stmt, rows)
+    return len(rows)
+
+
+def refresh_forecasts(db: Session, history_days: int = HISTORY_DAYS, horizon: int = HORIZON_DAYS,
+                      budget_mb: int = MATRIX_BUDGET_MB):
+    """
+    Recomputes every product's forecast from the last `history_days` full days and commits
+    shard by shard. Rows of products with no demand left in the window are removed at the end.
+    Raises RefreshInProgress if another refresh is running in this process.
+    """
+    if not _refresh_lock.acquire(blocking=False):
+        raise RefreshInProgress()
+    try:
+        started = time.perf_counter()
+        generated_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        history_end = generated_at.date() - timedelta(days=1)   # Today is still incomplete
+        history_start = history_end - timedelta(days=history_days - 1)
+        shard_size = _shard_size(history_days, budget_mb)
+
+        shards = rows_read = written = 0
+        last_id = 0
+        while True:
+            product_ids = np.fromiter(db.scalars(
+                select(Product.id).where(Product.id > last_id).order_by(Product.id).limit(shard_size)
+            ), dtype=np.int64)
+            if not len(product_ids):
+                break
+            matrix, read = load_demand_matrix(db, product_ids, history_start, history_days)
+            features = demand_features(matrix, history_start, horizon)
+            written += _write_forecasts(db, product_ids, features, history_start, history_end, generated_at)
+            db.commit()
+            shards += 1
+            rows_read += read
+            last_id = int(product_ids[-1])
+
+        db.execute(delete(DemandForecast).where(DemandForecast.generatedAt < generated_at))
+        db.commit()
+        return {
+            "productsForecast": written,
+            "shards": shards,
+            "shardSize": shard_size,
+            "demandRowsRead": rows_read,
+            "historyStart": history_start.isoformat(),
+            "historyEnd": history_end.isoformat(),
+            "elapsedSeconds": round(time.perf_counter() - started, 2),
+        }
+    finally:
+        _refresh_lock.release()
+
+
+if __name__ == "__main__":
+    # Nightly cron entry point: python -m services.forecasting
+    import json
+    import models  # noqa: F401  (registers every table)
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        print(json.dumps(refresh_forecasts(session), indent=2))
+    finally:
+        session.close()
@@ -0,0 +1,165 @@
+# backend/services/fulfilment.py
+import os
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, update, insert, exists, or_
+from sqlalchemy.orm import Session
+from models.orders import Order, OrderStatusHistory, OrderDelivery
+from services.order_summaries import refresh_order_summaries
+
+# Order status state machine and the fulfilment work queue.
+#
+# Status changes are set-based: one conditional UPDATE ... RETURNING moves every order whose
+# current status allows the transition, and the returned ids get their history rows in one
+# executemany. Packers and drivers claim work with SELECT ... FOR UPDATE SKIP LOCKED, so
+# concurrent workers each get a disjoint set of orders without waiting on one another. A claim
+# is a lease: if the worker never moves the order on, it is offered again after CLAIM_SECONDS.
+
+PENDING = "Pending"
+PAID = "Paid"
+PACKED = "Packed"
+OUT_FOR_DELIVERY = "Out for Delivery"
+DELIVERED = "Delivered"
+ABORT = "Abort"
+
+# status -> statuses an order may move to from there
+TRANSITIONS = {
+    PENDING: (PAID, ABORT),
+    PAID: (PACKED, ABORT),
+    PACKED: (OUT_FOR_DELIVERY, DELIVERED, ABORT),  # Packed -> Delivered: collected in store
+    OUT_FOR_DELIVERY: (DELIVERED, ABORT),
+    DELIVERED: (),
+    ABORT: (),
+}
+STATUSES = tuple(TRANSITIONS)
+
+# Queue stage -> the status its orders wait in
+STAGES = {"pack": PAID, "deliver": PACKED}
+
+CLAIM_SECONDS = float(os.getenv("FULFILMENT_CLAIM_SECONDS", "900"))
+
+
+def allowed_from(to_status: str):
+    return [status for status, targets in TRANSITIONS.items() if to_status in targets]
+
+
+def _has_delivery(order_table, with_driver: bool):
+    deliveries = OrderDelivery.__table__
+    condition = exists().where(deliveries.c.order_id == order_table.c.id)
+    if with_driver:
+        condition = condition.where(deliveries.c.driver_name.is_not(None))
+    return condition
+
+
+def transition_orders(db: Session, order_ids, to_status: str, worker: str = None, driver_name: str = None):
+    """
+    Moves every order in `order_ids` that may go to `to_status` in one UPDATE ... RETURNING,
+    writes their history rows and refreshes their summaries. Orders that cannot move are left
+    as they are. With `worker`, orders claimed by another worker (unexpired) are not moved.
+    "Out for Delivery" needs a delivery row and a driver: `driver_name`, or the one assigned
+    when the order was claimed.
+
+    Returns (moved_ids, rejected) with rejected = {order_id: reason}. Does not commit.
+    """
+    order_ids = sorted(set(order_ids))
+    if not order_ids:
+        return [], {}
+    now = datetime.now(timezone.utc)
+    table = Order.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id.in_(order_ids), table.c.current_status.in_(allowed_from(to_status)))
+        .values(current_status=to_status, claimed_by=None, claimed_at=None)
+        .returning(table.c.id)
+    )
+    if worker is not None:
+        stmt = stmt.where(or_(
+            table.c.claimed_by.is_(None),
+            table.c.claimed_by == worker,
+            table.c.claimed_at < now - timedelta(seconds=CLAIM_SECONDS),
+        ))
+    if to_status == OUT_FOR_DELIVERY:
+        stmt = stmt.where(_has_delivery(table, with_driver=driver_name is None))
+    moved = sorted(db.execute(stmt).scalars())
+
+    if moved:
+        if driver_name is not None and to_status == OUT_FOR_DELIVERY:
+            db.execute(
+                update(OrderDelivery)
+                .where(OrderDelivery.order_id.in_(moved))
+                .values(driver_name=driver_name)
+            )
+        db.execute(insert(OrderStatusHistory), [
+            {"order_id": order_id, "status": to_status, "changed_at": now} for order_id in moved
+        ])
+        refresh_order_summaries(db, moved)
+
+    rejected = {}
+    if len(moved) < len(order_ids):
+        # Only when something was refused: one query to say why
+        moved_set = set(moved)
+        left = [order_id for order_id in order_ids if order_id not in moved_set]
+        rows = {
+            row.id: row for row in db.execute(
+                select(Order.id, Order.current_status, Order.claimed_by)
+                .where(Order.id.in_(left))
+            )
+        }
+        for order_id in left:
+            row = rows.get(order_id)
+            if row is None:
+                rejected[order_id] = "Order not found"
+            elif to_status not in TRANSITIONS.get(row.current_status, ()):
+                rejected[order_id] = f"Cannot move from '{row.current_status}' to '{to_status}'"
+            elif worker is not None and row.claimed_by not in (None, worker):
+                rejected[order_id] = f"Claimed by {row.claimed_by}"
+            else:
+                rejected[order_id] = "Needs a delivery address and a driver"
+    return moved, rejected
+
+
+def claim_orders(db: Session, worker: str, stage: str, limit: int):
+    """
+    Claims up to `limit` of the oldest orders waiting at `stage` ("pack": Paid orders,
+    "deliver": Packed orders with a delivery address) for `worker`. Rows another transaction
+    is claiming right now are skipped, not waited on. A driver claiming deliveries is
+    assigned as their driver.
+
+    Returns the claimed order ids, oldest first. Does not commit.
+    """
+    now = datetime.now(timezone.utc)
+    table = Order.__table__
+    claimable = (
+        table.c.current_status == STAGES[stage],
+        or_(table.c.claimed_by.is_(None), table.c.claimed_at < now - timedelta(seconds=CLAIM_SECONDS)),
+    )
+    stmt = (
+        select(table.c.id)
+        .where(*claimable)
+        .order_by(table.c.created_at, table.c.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True, of=table)
+    )
+    if stage == "deliver":
+        stmt = stmt.where(_has_delivery(table, with_driver=False))
+    candidates = list(db.scalars(stmt))
+    if not candidates:
+        return []
+
+    # The rows are locked, so on Postgres this claims all of them. It re-checks anyway for
+    # databases without row locks (SQLite), where another worker may have claimed them first.
+    claimed = set(db.execute(
+        update(table).where(table.c.id.in_(candidates), *claimable)
+        .values(claimed_by=worker, claimed_at=now)
+        .returning(table.c.id)
+    ).scalars())
+    order_ids = [order_id for order_id in candidates if order_id in claimed]
+    if not order_ids:
+        return []
+    if stage == "deliver":
+        db.execute(
+            update(OrderDelivery)
+            .where(OrderDelivery.order_id.in_(order_ids))
+            .values(driver_name=worker)
+        )
+        refresh_order_summaries(db, order_ids)
+    return order_ids
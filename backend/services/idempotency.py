@@ -0,0 +1,208 @@
+# backend/services/idempotency.py
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException, Response
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from database import dialect_insert
+from models.idempotency import IdempotencyKey
+from services.cache import TTLCache
+
+# Idempotency-Key support for retried POSTs (checkout, ledger entries).
+#
+# A keyed request runs its write once. The response is written to idempotency_keys inside the
+# write's own transaction (record_result, called just before the endpoint commits), so "written"
+# and "response stored" commit or roll back together. A replay is answered from a small
+# in-process TTL cache, or from that table when another worker (or an earlier process) ran it.
+#
+# Concurrent duplicates coalesce: within a worker, the second request waits for the first to
+# finish and then replays its response; across workers, the duplicate's INSERT of the key blocks
+# on the first one's uncommitted row, finds it committed, and its own transaction rolls back.
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "30"))
+MAX_KEY_LENGTH = 255
+PURGE_CHUNK = 5000
+
+# (fingerprint, statusCode, body bytes) per (scope, key); the table is the source of truth
+results = TTLCache(
+    max_entries=int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000")),
+    ttl=IDEMPOTENCY_TTL_SECONDS,
+)
+
+_inflight = {}  # (scope, key) -> threading.Event set when the running request finishes
+_inflight_lock = threading.Lock()
+
+_PENDING = "idempotency_pending"
+_RECORDED = "idempotency_recorded"
+
+
+class DuplicateRequest(Exception):
+    """
+    Raised inside the write's transaction when another request committed the same key first.
+    """
+
+
+def fingerprint(payload) -> str:
+    """
+    Stable hash of a request body, to tell a genuine retry from a key reused for something else.
+    """
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+
+def _respond(stored, replayed: bool) -> Response:
+    _, status_code, body = stored
+    headers = {REPLAYED_HEADER: "true"} if replayed else None
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
+
+
+def _replay(stored, request_fingerprint: str) -> Response:
+    if stored[0] != request_fingerprint:
+        raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_HEADER} was already used for a different request")
+    return _respond(stored, replayed=True)
+
+
+def _load(db: Session, scope: str, key: str):
+    row = db.execute(
+        select(IdempotencyKey.fingerprint, IdempotencyKey.statusCode, IdempotencyKey.body)
+        .where(IdempotencyKey.scope == scope, IdempotencyKey.key == key, IdempotencyKey.expiresAt > datetime.now(timezone.utc))
+    ).first()
+    return (row.fingerprint, row.statusCode, row.body.encode()) if row else None
+
+
+def _can_block() -> bool:
+    # Async endpoints run the handler on the event loop thread (AsyncSession.run_sync); waiting
+    # there would stall the request being waited for, so they rely on the database alone.
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return True
+    return False
+
+
+def run_idempotent(db: Session, scope: str, key, request_fingerprint: str, status_code: int, execute):
+    """
+    Runs `execute()` at most once per (scope, key). Without a key it simply runs. A repeated
+    key gets the first request's response back (with an Idempotent-Replayed header) without
+    running anything; a repeated key with a different request body gets a 422.
+
+    `execute` must call record_result() just before it commits. `status_code` is the code its
+    result is served with. The first response is the stored body too, so a replay is byte-for-byte
+    the same.
+    """
+    if key is None:
+        return execute()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters")
+
+    while True:
+        stored = results.get(scope, key)
+        if stored is not None:
+            return _replay(stored, request_fingerprint)
+        with _inflight_lock:
+            event = _inflight.get((scope, key))
+            owner = event is None
+            if owner:
+                event = _inflight[(scope, key)] = threading.Event()
+        if owner or not _can_block():
+            break
+        # The same key is running in this worker right now: wait for it, then replay its result
+        if not event.wait(IDEMPOTENCY_WAIT_SECONDS):
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+
+    try:
+        stored = _load(db, scope, key)
+        if stored is None:
+            db.info[_PENDING] = (scope, key, request_fingerprint, status_code)
+            try:
+                execute()
+                stored = db.info[_RECORDED]
+            except (DuplicateRequest, IntegrityError, HTTPException):
+                # Another worker may have committed the same key meanwhile; a checkout retried
+                # that way fails on its (already emptied) cart before it gets to record_result
+                db.rollback()
+                stored = _load(db, scope, key)
+                if stored is None:
+                    raise
+            else:
+                results.put(scope, key, stored)
+                return _respond(stored, replayed=False)
+            finally:
+                db.info.pop(_PENDING, None)
+                db.info.pop(_RECORDED, None)
+        results.put(scope, key, stored)
+        return _replay(stored, request_fingerprint)
+    finally:
+        if owner:
+            with _inflight_lock:
+                _inflight.pop((scope, key), None)
+            event.set()
+
+
+def record_result(db: Session, body):
+    """
+    Stores the response of the keyed request running on `db` (a no-op without a key), inside the
+    current transaction. `body` is the JSON-able response, or a callable building it. Raises
+    DuplicateRequest when a live record for the key was committed by another request meanwhile.
+    """
+    pending = db.info.get(_PENDING)
+    if pending is None:
+        return
+    scope, key, request_fingerprint, status_code = pending
+    if callable(body):
+        body = body()
+    encoded = json.dumps(body, separators=(",", ":"), default=str)
+    now = datetime.now(timezone.utc)
+    values = {
+        "fingerprint": request_fingerprint, "statusCode": status_code, "body": encoded,
+        "createdAt": now, "expiresAt": now + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+    }
+    stmt = dialect_insert(db, IdempotencyKey).values(scope=scope, key=key, **values)
+    # An expired record for the key is simply taken over; a live one means we lost the race
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IdempotencyKey.scope, IdempotencyKey.key],
+        set_=values,
+        where=IdempotencyKey.expiresAt <= now,
+    ).returning(IdempotencyKey.key)
+    if db.execute(stmt).first() is None:
+        raise DuplicateRequest(key)
+    db.info[_RECORDED] = (request_fingerprint, status_code, encoded.encode())
+
+
+def purge_expired(db: Session, chunk: int = PURGE_CHUNK) -> int:
+    """
+    Deletes expired records in chunks, committing each. Returns the number deleted.
+    """
+    deleted = 0
+    while True:
+        expired = (
+            select(IdempotencyKey.scope, IdempotencyKey.key)
+            .where(IdempotencyKey.expiresAt <= datetime.now(timezone.utc))
+            .limit(chunk)
+        )
+        count = db.execute(
+            delete(IdempotencyKey).where(tuple_(IdempotencyKey.scope, IdempotencyKey.key).in_(expired))
+        ).rowcount
+        db.commit()
+        deleted += count
+        if count < chunk:
+            return deleted
+
+
+if __name__ == "__main__":
+    # Cron entry point: python -m services.idempotency
+    import models  # noqa: F401  (registers every table)
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        print(json.dumps({"expiredKeysDeleted": purge_expired(session)}))
+    finally:
+        session.close()
@@ -0,0 +1,308 @@
+# backend/services/ledger_archive.py
+import gzip
+import hashlib
+import json
+import os
+from collections import namedtuple
+from datetime import date, datetime, time, timezone
+from sqlalchemy import select, insert, delete, func, case, text, union_all
+from sqlalchemy.orm import Session
+from database import dialect_insert
+from models.transaction import StockTransaction
+from models.orders import OrderStatusHistory
+from models.ledger_archive import StockTransactionArchive, OrderStatusHistoryArchive, BatchLedgerMonth, LedgerArchive
+
+# Monthly rollover of the append-only ledgers (stock_transactions, order_status_history).
+#
+# The hot tables keep the last LEDGER_HOT_MONTHS whole months plus the current one; older months
+# are moved, a month at a time, into <table>_archive (range-partitioned by month on Postgres, a
+# plain table elsewhere). The hot tables therefore stay a few months deep however long the ledger
+# grows, and recent-window reads never touch the archive. Readers whose window starts before the
+# hot horizon (or is unbounded) read both through with_archive().
+#
+# Archiving the stock ledger also writes each batch's net movement for the month to
+# batch_ledger_months, so on-hand quantities are rebuilt from those totals plus the hot ledger.
+# An archived month can be exported to a gzipped NDJSON file (checksum in ledger_archives) and
+# checked against its totals with verify_month().
+#
+# LEDGER_HOT_MONTHS may be raised only before anything is archived: readers skip the archive for
+# windows starting after the horizon it defines.
+
+LEDGER_HOT_MONTHS = int(os.getenv("LEDGER_HOT_MONTHS", "3"))
+LEDGER_EXPORT_DIR = os.getenv("LEDGER_EXPORT_DIR", "ledger-archive")
+ARCHIVE_CHUNK = 10000
+EXPORT_BATCH = 5000
+
+Ledger = namedtuple("Ledger", "hot archive time_column")
+
+LEDGERS = {
+    "stock_transactions": Ledger(StockTransaction, StockTransactionArchive, "timestamp"),
+    "order_status_history": Ledger(OrderStatusHistory, OrderStatusHistoryArchive, "changed_at"),
+}
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _bounds(month: date):
+    return datetime.combine(month, time()), datetime.combine(add_months(month, 1), time())
+
+
+def naive_utc(value: datetime) -> datetime:
+    # The ledger columns hold naive UTC
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def hot_horizon(now: datetime = None) -> datetime:
+    """
+    Start of the oldest month that is never archived: rows at or after it are always hot.
+    """
+    now = now or datetime.now(timezone.utc)
+    return datetime.combine(add_months(month_start(now), -LEDGER_HOT_MONTHS), time())
+
+
+def reaches_archive(since: datetime = None) -> bool:
+    """
+    Whether a read of rows at or after `since` (None: all of them) may need the archive.
+    """
+    return since is None or naive_utc(since) < hot_horizon()
+
+
+def with_archive(ledger: str, build, since: datetime = None):
+    """
+    `build(model)` over the hot table, plus the same select over the archive when the window
+    starting at `since` reaches past the hot horizon, as one subquery. `build` gets the hot or
+    the archive model (same column names) and returns a filtered select; give it its own
+    ORDER BY/LIMIT so each side stays an index range scan that stops early.
+    """
+    hot, archive, _ = LEDGERS[ledger]
+    if not reaches_archive(since):
+        return build(hot).subquery(ledger)
+    # Each side wrapped as a subquery: SQLite does not allow ORDER BY/LIMIT on UNION members
+    return union_all(*(select(build(model).subquery()) for model in (hot, archive))).subquery(ledger)
+
+
+def is_archived(db: Session, ledger: str, row_id: int) -> bool:
+    archive = LEDGERS[ledger].archive
+    return db.scalar(select(archive.id).where(archive.id == row_id).limit(1)) is not None
+
+
+# --- Archiving --------------------------------------------------------------
+
+def _ensure_partition(db: Session, ledger: str, month: date):
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    parent = LEDGERS[ledger].archive.__tablename__
+    start, end = _bounds(month)
+    db.execute(text(
+        f'CREATE TABLE IF NOT EXISTS "{parent}_{month:%Y_%m}" PARTITION OF "{parent}" '
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+    db.commit()
+
+
+def _add_batch_months(db: Session, month: date, where):
+    signed = case((StockTransaction.transactionType == "sale", -StockTransaction.quantity), else_=StockTransaction.quantity)
+    totals = db.execute(
+        select(StockTransaction.batchId, func.count(), func.coalesce(func.sum(signed), 0))
+        .where(*where, StockTransaction.batchId.is_not(None))
+        .group_by(StockTransaction.batchId)
+    ).all()
+    if not totals:
+        return
+    stmt = dialect_insert(db, BatchLedgerMonth)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BatchLedgerMonth.batchId, BatchLedgerMonth.month],
+        set_={
+            "rows": BatchLedgerMonth.rows + stmt.excluded.rows,
+            "netQuantity": BatchLedgerMonth.netQuantity + stmt.excluded.netQuantity,
+        },
+    )
+    db.execute(stmt, [{"batchId": b, "month": month, "rows": n, "netQuantity": net} for b, n, net in totals])
+
+
+def archive_month(db: Session, ledger: str, month: date, chunk: int = ARCHIVE_CHUNK) -> int:
+    """
+    Moves one month of `ledger` into its archive and returns the number of rows moved. Each
+    committed step copies, totals (stock ledger) and deletes the same `chunk` rows, so an
+    interrupted run loses or duplicates nothing; running it again finishes the month.
+    Months inside the hot window are refused.
+    """
+    hot, archive, time_column = LEDGERS[ledger]
+    month = month_start(month)
+    start, end = _bounds(month)
+    if end > hot_horizon():
+        raise ValueError(f"{month:%Y-%m} is inside the last {LEDGER_HOT_MONTHS} months and stays in {ledger}")
+    _ensure_partition(db, ledger, month)
+
+    stamp = getattr(hot, time_column)
+    columns = [column.name for column in archive.__table__.columns]
+    moved = 0
+    while True:
+        # Lock the chunk, so an edit of one of its rows either lands before the copy or waits
+        ids = db.scalars(
+            select(hot.id).where(stamp >= start, stamp < end).order_by(hot.id).limit(chunk).with_for_update()
+        ).all()
+        if not ids:
+            break
+        where = (stamp >= start, stamp < end, hot.id <= ids[-1])
+        db.execute(insert(archive).from_select(columns, select(*(getattr(hot, c) for c in columns)).where(*where)))
+        if hot is StockTransaction:
+            _add_batch_months(db, month, where)
+        db.execute(delete(hot).where(*where))
+        db.commit()
+        moved += len(ids)
+
+    if moved:
+        now = datetime.now(timezone.utc)
+        stmt = dialect_insert(db, LedgerArchive).values(tableName=ledger, month=month, rows=moved, archivedAt=now)
+        # More rows for an already archived month make its export stale
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[LedgerArchive.tableName, LedgerArchive.month],
+            set_={"rows": LedgerArchive.rows + stmt.excluded.rows, "archivedAt": stmt.excluded.archivedAt,
+                  "exportPath": None, "exportSha256": None, "exportedAt": None},
+        )
+        db.execute(stmt)
+        db.commit()
+    return moved
+
+
+def archive_due(db: Session) -> dict:
+    """
+    Archives every month older than the hot window, oldest first, for both ledgers.
+    Returns {ledger: {"YYYY-MM": rows moved}}.
+    """
+    horizon = hot_horizon()
+    report = {}
+    for ledger, (hot, _, time_column) in LEDGERS.items():
+        oldest = db.scalar(select(func.min(getattr(hot, time_column))))
+        report[ledger] = {}
+        if oldest is None:
+            continue
+        month = month_start(oldest)
+        while _bounds(month)[1] <= horizon:
+            report[ledger][f"{month:%Y-%m}"] = archive_month(db, ledger, month)
+            month = add_months(month, 1)
+    return report
+
+
+# --- Export and verification ------------------------------------------------
+
+def _archived_rows(db: Session, ledger: str, month: date):
+    _, archive, time_column = LEDGERS[ledger]
+    start, end = _bounds(month)
+    stamp = getattr(archive, time_column)
+    stmt = (
+        select(*archive.__table__.columns)
+        .where(stamp >= start, stamp < end)
+        .order_by(stamp, archive.id)
+        .execution_options(yield_per=EXPORT_BATCH)
+    )
+    for row in db.execute(stmt):
+        yield row._mapping
+
+
+def _line(row) -> bytes:
+    return (json.dumps(dict(row), default=lambda v: v.isoformat(), separators=(",", ":")) + "\n").encode()
+
+
+def export_month(db: Session, ledger: str, month: date, directory: str = LEDGER_EXPORT_DIR) -> dict:
+    """
+    Writes an archived month to <directory>/<ledger>-YYYY-MM.ndjson.gz, one JSON row per line in
+    (time, id) order, and records the path and the SHA-256 of the uncompressed lines in
+    ledger_archives. Once exported, the month's partition can be detached and kept offline.
+    """
+    month = month_start(month)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{ledger}-{month:%Y-%m}.ndjson.gz")
+    digest = hashlib.sha256()
+    rows = 0
+    with gzip.open(path + ".tmp", "wb") as f:
+        for row in _archived_rows(db, ledger, month):
+            line = _line(row)
+            digest.update(line)
+            f.write(line)
+            rows += 1
+    os.replace(path + ".tmp", path)
+
+    manifest = db.get(LedgerArchive, (ledger, month))
+    if manifest is None:
+        raise ValueError(f"{ledger} {month:%Y-%m} has not been archived")
+    manifest.exportPath = path
+    manifest.exportSha256 = digest.hexdigest()
+    manifest.exportedAt = datetime.now(timezone.utc)
+    db.commit()
+    return {"ledger": ledger, "month": f"{month:%Y-%m}", "rows": rows, "path": path, "sha256": manifest.exportSha256}
+
+
+def verify_month(db: Session, month: date) -> dict:
+    """
+    Recomputes an archived stock-ledger month's per-batch totals from the archive and compares
+    them with batch_ledger_months, and re-hashes its export file when there is one.
+    """
+    month = month_start(month)
+    totals = {}
+    for row in _archived_rows(db, "stock_transactions", month):
+        if row["batchId"] is None:
+            continue
+        rows, net = totals.get(row["batchId"], (0, 0))
+        quantity = row["quantity"] or 0
+        totals[row["batchId"]] = (rows + 1, net + (-quantity if row["transactionType"] == "sale" else quantity))
+    recorded = {
+        b: (n, net) for b, n, net in db.execute(
+            select(BatchLedgerMonth.batchId, BatchLedgerMonth.rows, BatchLedgerMonth.netQuantity).where(BatchLedgerMonth.month == month)
+        )
+    }
+    mismatches = sorted(b for b in totals.keys() | recorded.keys() if totals.get(b) != recorded.get(b))
+
+    export_matches = None
+    manifest = db.get(LedgerArchive, ("stock_transactions", month))
+    if manifest is not None and manifest.exportPath:
+        digest = hashlib.sha256()
+        with gzip.open(manifest.exportPath, "rb") as f:
+            for line in f:
+                digest.update(line)
+        export_matches = digest.hexdigest() == manifest.exportSha256
+    return {
+        "month": f"{month:%Y-%m}",
+        "rows": sum(n for n, _ in totals.values()),
+        "batches": len(totals),
+        "mismatchedBatches": mismatches[:100],
+        "exportMatches": export_matches,
+    }
+
+
+if __name__ == "__main__":
+    # Cron entry point:
+    #   python -m services.ledger_archive                  archive every month past the hot window
+    #   python -m services.ledger_archive export YYYY-MM   export an archived month of both ledgers
+    #   python -m services.ledger_archive verify YYYY-MM   check a stock-ledger month against its totals
+    import sys
+    import models  # noqa: F401  (registers every table)
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        command = sys.argv[1] if len(sys.argv) > 1 else "archive"
+        if command == "archive":
+            result = archive_due(session)
+        else:
+            month = datetime.strptime(sys.argv[2], "%Y-%m").date()
+            if command == "export":
+                result = [export_month(session, ledger, month) for ledger in LEDGERS
+                          if session.get(LedgerArchive, (ledger, month)) is not None]
+            elif command == "verify":
+                result = verify_month(session, month)
+            else:
+                raise SystemExit(f"unknown command {command!r}: archive, export or verify")
+        print(json.dumps(result, indent=2))
+    finally:
+        session.close()
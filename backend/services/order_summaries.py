@@ -0,0 +1,168 @@
+# backend/services/order_summaries.py
+from collections import defaultdict
+from datetime import timezone
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from database import dialect_insert
+from models.orders import Order, OrderItem, OrderDelivery
+from models.order_summary import OrderSummary
+from models.product import Product
+from services.ledger_archive import with_archive
+
+# Keeps the order_summaries projection in step with the order tables.
+#
+# Like refresh_stock_levels, these run inside the caller's transaction and never commit, so a
+# summary is published together with the order change it describes. Checkout writes the new
+# summary from the values it already holds; later changes (status, delivery) rebuild the
+# summaries of the touched orders from the source tables in a fixed number of set-based queries.
+
+BACKFILL_CHUNK = 1000
+
+
+def _iso(value):
+    # Naive UTC, as the DateTime columns read back, so checkout and rebuilt summaries agree
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+
+def _upsert(db: Session, rows):
+    if not rows:
+        return
+    stmt = dialect_insert(db, OrderSummary)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[OrderSummary.orderId],
+        set_={c: stmt.excluded[c] for c in rows[0] if c != "orderId"},
+    )
+    db.execute(stmt, rows)
+
+
+def _line(product_id, name, quantity, price):
+    return {"productId": product_id, "productName": name, "quantity": quantity, "priceAtPurchase": price}
+
+
+def record_checkout(db: Session, order: Order, lines, changed_at, delivery=None):
+    """
+    Writes the summary of an order placed at checkout. `lines` are the order_items rows just
+    inserted ({"product_id", "quantity", "price_at_purchase"}); only product names are looked up.
+    `delivery` is {"customerName", "deliveryAddress"} for home deliveries.
+    """
+    names = dict(db.execute(
+        select(Product.id, Product.productName).where(Product.id.in_({line["product_id"] for line in lines}))
+    ).all())
+    _upsert(db, [{
+        "orderId": order.id,
+        "userId": order.user_id,
+        "createdAt": order.created_at,
+        "status": order.current_status,
+        "statusChangedAt": changed_at,
+        "deliveryMethod": order.delivery_method,
+        "totalAmount": order.total_amount,
+        "lineCount": len(lines),
+        "itemCount": sum(line["quantity"] for line in lines),
+        "lines": [_line(l["product_id"], names.get(l["product_id"]), l["quantity"], l["price_at_purchase"]) for l in lines],
+        "history": [{"status": order.current_status, "changedAt": _iso(changed_at)}],
+        "delivery": dict(delivery, driverName=None) if delivery else None,
+    }])
+
+
+def refresh_order_summaries(db: Session, order_ids):
+    """
+    Rebuilds the summaries of `order_ids` from orders, order_items, order_status_history and
+    order_deliveries: four queries and one upsert however many orders are passed.
+    Does not commit.
+    """
+    order_ids = list(order_ids)
+    if not order_ids:
+        return
+    orders = db.execute(
+        select(Order.id, Order.user_id, Order.created_at, Order.current_status, Order.delivery_method, Order.total_amount)
+        .where(Order.id.in_(order_ids))
+    ).all()
+
+    lines = defaultdict(list)
+    for order_id, product_id, name, quantity, price in db.execute(
+        select(OrderItem.order_id, OrderItem.product_id, Product.productName, OrderItem.quantity, OrderItem.price_at_purchase)
+        .outerjoin(Product, Product.id == OrderItem.product_id)
+        .where(OrderItem.order_id.in_(order_ids))
+        .order_by(OrderItem.order_id, OrderItem.id)
+    ):
+        lines[order_id].append(_line(product_id, name, quantity, price))
+
+    history = defaultdict(list)
+    last_changed = {}
+    # Older changes of long-lived orders may have been archived
+    changes = with_archive("order_status_history", lambda ledger: (
+        select(ledger.id, ledger.order_id, ledger.status, ledger.changed_at).where(ledger.order_id.in_(order_ids))
+    ))
+    for order_id, status, changed_at in db.execute(
+        select(changes.c.order_id, changes.c.status, changes.c.changed_at)
+        .order_by(changes.c.order_id, changes.c.changed_at, changes.c.id)
+    ):
+        history[order_id].append({"status": status, "changedAt": _iso(changed_at)})
+        last_changed[order_id] = changed_at
+
+    deliveries = {
+        order_id: {"customerName": customer, "deliveryAddress": address, "driverName": driver}
+        for order_id, customer, address, driver in db.execute(
+            select(OrderDelivery.order_id, OrderDelivery.customer_name, OrderDelivery.delivery_address, OrderDelivery.driver_name)
+            .where(OrderDelivery.order_id.in_(order_ids))
+        )
+    }
+
+    rows = []
+    for order in orders:
+        order_lines = lines.get(order.id, [])
+        rows.append({
+            "orderId": order.id,
+            "userId": order.user_id,
+            "createdAt": order.created_at,
+            "status": order.current_status,
+            "statusChangedAt": last_changed.get(order.id),
+            "deliveryMethod": order.delivery_method,
+            "totalAmount": order.total_amount,
+            "lineCount": len(order_lines),
+            "itemCount": sum(line["quantity"] for line in order_lines),
+            "lines": order_lines,
+            "history": history.get(order.id, []),
+            "delivery": deliveries.get(order.id),
+        })
+    _upsert(db, rows)
+
+
+def backfill_order_summaries(db: Session, chunk: int = BACKFILL_CHUNK) -> int:
+    """
+    Writes summaries for every order that has none (orders placed before the projection existed),
+    in id order, committing per chunk. Returns the number written.
+    """
+    written = 0
+    last_id = 0
+    while True:
+        order_ids = list(db.scalars(
+            select(Order.id)
+            .outerjoin(OrderSummary, OrderSummary.orderId == Order.id)
+            .where(Order.id > last_id, OrderSummary.orderId.is_(None))
+            .order_by(Order.id)
+            .limit(chunk)
+        ))
+        if not order_ids:
+            return written
+        refresh_order_summaries(db, order_ids)
+        db.commit()
+        written += len(order_ids)
+        last_id = order_ids[-1]
+
+
+if __name__ == "__main__":
+    # One-off / cron entry point: python -m services.order_summaries
+    import json
+    import models  # noqa: F401  (registers every table)
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        print(json.dumps({"summariesWritten": backfill_order_summaries(session)}))
+    finally:
+        session.close()
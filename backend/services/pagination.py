@@ -0,0 +1,48 @@
+# backend/services/pagination.py
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException
+
+# Keyset ("cursor") pagination helpers.
+# A cursor is the sort key of the last row on the previous page, so the next page is a plain
+# index range scan (WHERE key < :last ORDER BY key LIMIT n) instead of OFFSET, which has to
+# walk and discard every skipped row.
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values) -> str:
+    """
+    Packs the sort key of the last returned row into an opaque, URL-safe token.
+    """
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, *types):
+    """
+    Unpacks a token produced by `encode_cursor`, coercing each value with the matching type
+    (`datetime` values are parsed from ISO format). Raises a 400 for anything malformed.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if len(values) != len(types):
+            raise ValueError("cursor arity mismatch")
+        return [datetime.fromisoformat(v) if t is datetime else t(v) for v, t in zip(values, types)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def paginate(query, limit: int, key, response):
+    """
+    Fetches one page (`limit` rows) from an already filtered + keyset-ordered query. If more rows
+    exist, the cursor for the next page is sent back in the X-Next-Cursor response header.
+    `key(row)` returns the tuple of sort-key values for a row.
+    """
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(rows[-1]))
+    return rows
@@ -0,0 +1,114 @@
+# backend/services/profiling.py
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+# Sampled request profiling, off unless PROFILE_SAMPLE_RATE > 0.
+#
+# A sampled request is watched by a StackSampler: a daemon thread that reads every thread's
+# Python stack (sys._current_frames) each PROFILE_INTERVAL_MS and counts them in the "folded"
+# format flame graph tools read (speedscope, flamegraph.pl). It needs no tracing hooks, so it
+# also sees sync endpoints running in the threadpool, and costs nothing for unsampled requests.
+# Stacks of other requests running at the same time show up too; profile under light load or
+# read the endpoint's own frames. At most one request is profiled at a time per worker.
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "grocery-profiles"))
+
+_busy = threading.Lock()
+
+
+class StackSampler:
+    def __init__(self, interval: float = PROFILE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def write(self, label: str) -> str:
+        """
+        Writes the folded stacks to PROFILE_DIR/<label>-<timestamp>.folded and returns the path.
+        """
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        safe = "".join(c if c.isalnum() else "_" for c in label).strip("_") or "request"
+        path = os.path.join(PROFILE_DIR, f"{safe}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.folded")
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+class _SampledRequest:
+    def __init__(self):
+        self.sampler = StackSampler()
+        self.label = "request"
+
+    def __enter__(self):
+        self.sampler.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            self.sampler.__exit__(*exc)
+            if self.sampler.samples:
+                self.sampler.write(self.label)
+        finally:
+            _busy.release()
+        return False
+
+
+def _default_hook(scope):
+    if PROFILE_SAMPLE_RATE <= 0 or random.random() >= PROFILE_SAMPLE_RATE:
+        return None
+    if not _busy.acquire(blocking=False):
+        return None
+    return _SampledRequest()
+
+
+_hook = _default_hook
+
+
+def set_profile_hook(hook):
+    """
+    Replaces the sampling decision: `hook(scope)` returns a context manager wrapping the
+    request (its `label` attribute is set to "METHOD /route" before it exits) or None to
+    leave the request alone. Pass None to restore the default.
+    """
+    global _hook
+    _hook = hook or _default_hook
+
+
+def profile_request(scope):
+    """
+    The context manager to run an HTTP request in when it is sampled for profiling, else None.
+    """
+    return _hook(scope)
@@ -0,0 +1,197 @@
+# backend/services/query_stats.py
+import contextvars
+import logging
+import os
+import time
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from services.metrics import REGISTRY
+from services.profiling import profile_request
+
+logger = logging.getLogger(__name__)
+
+# Per-request SQL statistics and request metrics.
+#
+# Every statement sent to the database (sync or async engine) is timed by engine events and
+# counted against the request it runs for. The per-request counter sits in a ContextVar, so the
+# copies of the context that threadpool endpoints and background tasks run in still update the
+# same object. RequestMetricsMiddleware turns the totals into response headers (X-SQL-Statements,
+# Server-Timing) and into the histograms served at GET /metrics, which is how a slow checkout is
+# split into time in Postgres, time waiting for a pooled connection and everything else.
+
+SQL_STATEMENT_WARN = int(os.getenv("SQL_STATEMENT_WARN", "25"))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+STATEMENT_HEADER = "X-SQL-Statements"
+_STATEMENT_HEADER = STATEMENT_HEADER.lower().encode()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time from request to the end of the response body.", ("method", "route", "status"))
+REQUEST_STATEMENTS = REGISTRY.histogram(
+    "http_request_sql_statements", "SQL statements run per request.", ("method", "route"),
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100))
+REQUEST_SQL_SECONDS = REGISTRY.counter(
+    "http_request_sql_seconds_total", "Time spent executing SQL, by route.", ("method", "route"))
+REQUEST_POOL_WAIT_SECONDS = REGISTRY.counter(
+    "http_request_pool_wait_seconds_total", "Time spent waiting for a pooled connection, by route.", ("method", "route"))
+STATEMENT_SECONDS = REGISTRY.histogram(
+    "db_statement_duration_seconds", "Execution time of every SQL statement.")
+SLOW_STATEMENTS = REGISTRY.counter(
+    "db_slow_statements_total", "Statements slower than SLOW_QUERY_MS.")
+POOL_WAIT_SECONDS = REGISTRY.histogram(
+    "db_pool_wait_seconds", "Time to get a connection from the pool.")
+
+
+class StatementCounter:
+    __slots__ = ("count", "seconds", "pool_wait")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.pool_wait = 0.0
+
+
+_current = contextvars.ContextVar("sql_statement_counter", default=None)
+
+
+def _redact(parameters, executemany: bool):
+    # Values never reach the log (they hold names, addresses, prices); their shape is enough
+    if executemany:
+        return f"<{len(parameters)} parameter sets>"
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    context._statement_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_statement(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._statement_started
+    STATEMENT_SECONDS.observe(elapsed)
+    counter = _current.get()
+    if counter is not None:
+        counter.count += 1
+        counter.seconds += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        SLOW_STATEMENTS.inc()
+        logger.warning(
+            "Slow SQL (%.1f ms): %s parameters=%s", elapsed * 1000,
+            " ".join(statement.split())[:2000], _redact(parameters, executemany),
+        )
+
+
+@event.listens_for(Engine, "handle_error")
+def _failed_statement(exception_context):
+    # after_cursor_execute never runs for a failed statement; count it if it reached the database
+    if getattr(exception_context.execution_context, "_statement_started", None) is None:
+        return
+    counter = _current.get()
+    if counter is not None:
+        counter.count += 1
+
+
+def _record_pool_wait(elapsed: float):
+    POOL_WAIT_SECONDS.observe(elapsed)
+    counter = _current.get()
+    if counter is not None:
+        counter.pool_wait += elapsed
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool that records how long each checkout waited (pool events only fire once a
+    connection has been handed out, so the wait itself is invisible to them).
+    """
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _record_pool_wait(time.perf_counter() - started)
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _record_pool_wait(time.perf_counter() - started)
+
+
+@contextmanager
+def count_statements():
+    """
+    Counts the statements run inside the block (and in threads it hands its context to).
+    """
+    counter = StatementCounter()
+    token = _current.set(counter)
+    try:
+        yield counter
+    finally:
+        _current.reset(token)
+
+
+class RequestMetricsMiddleware:
+    """
+    Times every HTTP request and the SQL it runs. Adds X-SQL-Statements and a Server-Timing
+    header (db, pool wait, total up to the response headers) to each response, logs requests
+    above SQL_STATEMENT_WARN statements (what an N+1 loop over a page of rows looks like) and
+    feeds the per-route histograms. Sampled requests run under the profiler (services/profiling.py).
+    A plain ASGI middleware, so it adds no extra task or body buffering per request.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        counter = StatementCounter()
+        token = _current.set(counter)
+        started = time.perf_counter()
+        status = 500
+        route = "<unmatched>"
+
+        async def send_with_headers(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timing = "db;dur=%.1f, pool;dur=%.1f, total;dur=%.1f" % (
+                    counter.seconds * 1000, counter.pool_wait * 1000, (time.perf_counter() - started) * 1000)
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (_STATEMENT_HEADER, str(counter.count).encode()),
+                    (b"server-timing", timing.encode()),
+                ]
+            await send(message)
+
+        profiler = profile_request(scope)
+        try:
+            if profiler is None:
+                await self.app(scope, receive, send_with_headers)
+            else:
+                with profiler:
+                    try:
+                        await self.app(scope, receive, send_with_headers)
+                    finally:
+                        profiler.label = f"{scope['method']} {getattr(scope.get('route'), 'path', route)}"
+        finally:
+            # Set by the router once it matched; unmatched paths share one label
+            route = getattr(scope.get("route"), "path", route)
+            _current.reset(token)
+            labels = (scope["method"], route)
+            REQUEST_SECONDS.observe(time.perf_counter() - started, labels + (status,))
+            REQUEST_STATEMENTS.observe(counter.count, labels)
+            REQUEST_SQL_SECONDS.inc(counter.seconds, labels)
+            REQUEST_POOL_WAIT_SECONDS.inc(counter.pool_wait, labels)
+            if counter.count > SQL_STATEMENT_WARN:
+                logger.warning("%s %s ran %d SQL statements", scope["method"], route, counter.count)
@@ -0,0 +1,290 @@
+# backend/services/recommendations.py
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, update, delete, insert
+from sqlalchemy.orm import Session
+from database import SessionLocal, dialect_insert
+from models.orders import Order, OrderItem
+from models.recommendation import ProductCooccurrence, ProductRecommendation, RecommendationGap, RecommendationState
+
+logger = logging.getLogger(__name__)
+
+# "Frequently bought together": basket analysis over order_items.
+#
+# The full rebuild (nightly, `python -m services.recommendations`) builds the (orders x products)
+# incidence matrix X as a SciPy sparse matrix; X^T X is the product x product co-occurrence
+# matrix, whose diagonal is each product's order count. The matrix is stored in
+# product_cooccurrence, and each product's top-K partners with their association-rule scores go to
+# product_recommendations, which the API reads.
+#
+# Checkouts are folded in incrementally: pair counts only ever grow, and a product's partners are
+# ranked by pair count, so its new top-K is always drawn from its old top-K plus the partners of
+# the new orders. A fold-in therefore reads a few rows per product, never the whole matrix. The
+# rebuild also applies what fold-ins cannot: the history window and cancelled orders.
+
+TOP_K = int(os.getenv("RECOMMENDATIONS_TOP_K", "10"))
+MIN_PAIR_ORDERS = int(os.getenv("RECOMMENDATIONS_MIN_PAIR_ORDERS", "2"))  # A pair bought together once is noise
+HISTORY_DAYS = int(os.getenv("RECOMMENDATIONS_HISTORY_DAYS", "365"))
+FLUSH_INTERVAL = float(os.getenv("RECOMMENDATIONS_FLUSH_INTERVAL", "5"))
+MAX_PENDING = 100000       # Orders queued for a fold-in before the oldest are left to the next rebuild
+PRODUCT_BLOCK = 2000       # Rows of X^T X computed (and held in memory) at a time by the rebuild
+FETCH_ROWS = 20000
+INSERT_ROWS = 5000
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _lock_state(db: Session, now: datetime):
+    """
+    Creates or touches the state row, which locks it until the transaction ends (on SQLite, the
+    write takes the database lock). Returns the (lowest, highest) order id read by the last rebuild.
+    """
+    stmt = dialect_insert(db, RecommendationState).values(
+        id=1, orders=0, rebuiltFromOrderId=0, rebuiltThroughOrderId=0, updatedAt=now)
+    stmt = stmt.on_conflict_do_update(index_elements=[RecommendationState.id], set_={"updatedAt": now})
+    return db.execute(stmt.returning(
+        RecommendationState.rebuiltFromOrderId, RecommendationState.rebuiltThroughOrderId)).one()
+
+
+def _recommendation(product_id: int, rank: int, other_id: int, pair_orders: int, orders: int, other_orders: int,
+                    total: int, now: datetime) -> dict:
+    confidence = pair_orders / orders
+    return {
+        "productId": product_id, "rank": rank, "otherId": other_id, "orders": pair_orders,
+        "confidence": round(confidence, 4), "lift": round(confidence * total / other_orders, 4), "updatedAt": now,
+    }
+
+
+# --- Incremental ------------------------------------------------------------
+
+def fold_in(db: Session, baskets) -> dict:
+    """
+    Adds checked-out orders to the co-occurrence matrix and re-ranks the products in them, then
+    commits. `baskets` is [(order_id, product_ids)]; orders the last rebuild already counted are
+    skipped. Products outside these orders keep their lists (their pair counts did not change).
+    """
+    now = _now()
+    low, high = _lock_state(db, now)
+    # An order inside the rebuild's id range was counted unless it is one of the range's gaps
+    # (typically a checkout that committed after the rebuild's snapshot)
+    inside = [order_id for order_id, _ in baskets if low <= order_id <= high]
+    uncounted = set()
+    if inside:
+        uncounted = set(db.scalars(select(RecommendationGap.orderId).where(RecommendationGap.orderId.in_(inside))))
+    baskets = [
+        set(product_ids) for order_id, product_ids in baskets
+        if not low <= order_id <= high or order_id in uncounted
+    ]
+    if not baskets:
+        db.commit()
+        return {"orders": 0, "products": 0}
+
+    increments = Counter((a, b) for basket in baskets for a in basket for b in basket)
+    stmt = dialect_insert(db, ProductCooccurrence)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ProductCooccurrence.productId, ProductCooccurrence.otherId],
+        set_={"orders": ProductCooccurrence.orders + stmt.excluded.orders},
+    )
+    db.execute(stmt, [{"productId": a, "otherId": b, "orders": n} for (a, b), n in sorted(increments.items())])
+    total = db.execute(
+        update(RecommendationState).where(RecommendationState.id == 1)
+        .values(orders=RecommendationState.orders + len(baskets)).returning(RecommendationState.orders)
+    ).scalar_one()
+
+    # Candidates per product: its current top-K plus its partners in the new orders
+    candidates = defaultdict(set)
+    for a, b in increments:
+        if a != b:
+            candidates[a].add(b)
+    touched = sorted({a for a, _ in increments})
+    for product_id, other_id in db.execute(
+        select(ProductRecommendation.productId, ProductRecommendation.otherId).where(ProductRecommendation.productId.in_(touched))
+    ):
+        candidates[product_id].add(other_id)
+
+    # Their pair counts (read as a superset and filtered here) and every involved product's own
+    # order count (the diagonal)
+    involved = sorted(set(touched).union(*candidates.values()))
+    pair = (ProductCooccurrence.productId, ProductCooccurrence.otherId, ProductCooccurrence.orders)
+    counts = {
+        (a, b): n
+        for a, b, n in db.execute(select(*pair).where(ProductCooccurrence.productId.in_(touched), ProductCooccurrence.otherId.in_(involved)))
+        if b in candidates[a]
+    }
+    counts.update(((p, p), n) for p, _, n in db.execute(
+        select(*pair).where(ProductCooccurrence.productId.in_(involved), ProductCooccurrence.otherId == ProductCooccurrence.productId)
+    ))
+
+    rows = []
+    for a in touched:
+        ranked = sorted((-counts.get((a, b), 0), b) for b in candidates[a] if counts.get((a, b), 0) >= MIN_PAIR_ORDERS)[:TOP_K]
+        rows += [_recommendation(a, rank, b, -n, counts[a, a], counts[b, b], total, now) for rank, (n, b) in enumerate(ranked, 1)]
+    db.execute(delete(ProductRecommendation).where(ProductRecommendation.productId.in_(touched)))
+    if rows:
+        db.execute(insert(ProductRecommendation), rows)
+    db.commit()
+    return {"orders": len(baskets), "products": len(touched)}
+
+
+# Checkouts queue their order here instead of touching the matrix themselves: the pair rows of
+# popular products are shared by most orders, and updating them inside every checkout would make
+# concurrent checkouts wait on each other's row locks. A background thread folds the queue in
+# every FLUSH_INTERVAL seconds, in one transaction per batch. The queue is per process; orders
+# lost with a crashed worker are counted by the next rebuild.
+_pending = []              # (order_id, product_ids)
+_pending_lock = threading.Lock()
+_flusher = None
+
+
+def record_order(order_id: int, product_ids):
+    """
+    Queues a committed order for the next fold-in.
+    """
+    global _flusher
+    with _pending_lock:
+        _pending.append((order_id, list(product_ids)))
+        del _pending[:-MAX_PENDING]
+        if _flusher is None:
+            _flusher = threading.Thread(target=_fold_in_behind, name="recommendations-fold-in", daemon=True)
+            _flusher.start()
+            atexit.register(flush_pending)
+
+
+def _fold_in_behind():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        flush_pending()
+
+
+def flush_pending():
+    """
+    Folds in every queued order now. On failure they go back to the queue for the next cycle.
+    """
+    with _pending_lock:
+        baskets = _pending[:]
+        _pending.clear()
+    if not baskets:
+        return None
+    db = SessionLocal()
+    try:
+        return fold_in(db, baskets)
+    except Exception:
+        db.rollback()
+        with _pending_lock:
+            _pending[:0] = baskets
+            del _pending[:-MAX_PENDING]
+        logger.exception("Recommendation fold-in of %d orders failed; will retry next cycle", len(baskets))
+        return None
+    finally:
+        db.close()
+
+
+# --- Full rebuild -----------------------------------------------------------
+
+def rebuild_recommendations(db: Session, history_days: int = HISTORY_DAYS, top_k: int = TOP_K) -> dict:
+    """
+    Recomputes the co-occurrence matrix and every product's top-K from the orders of the last
+    `history_days` days (cancelled ones left out), replacing both tables in one transaction:
+    readers see the old lists until it commits.
+    """
+    # Only the nightly job pays for importing these, not every worker
+    import numpy as np
+    from scipy import sparse
+    from services.forecasting import EXCLUDED_ORDER_STATUSES
+
+    started = time.perf_counter()
+    now = _now()
+    _lock_state(db, now)
+
+    # One (order, product) pair per order line
+    result = db.execute(
+        select(OrderItem.order_id, OrderItem.product_id)
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(Order.created_at >= now - timedelta(days=history_days), Order.current_status.notin_(EXCLUDED_ORDER_STATUSES))
+        .execution_options(stream_results=True, yield_per=FETCH_ROWS)
+    )
+    parts = [np.array(part, dtype=np.int64).reshape(-1, 2) for part in result.partitions()]
+    lines = np.concatenate(parts) if parts else np.empty((0, 2), dtype=np.int64)
+    order_ids, order_index = np.unique(lines[:, 0], return_inverse=True)
+    product_ids, product_index = np.unique(lines[:, 1], return_inverse=True)
+    total = len(order_ids)
+
+    # Incidence matrix X (orders x products); duplicates (a product on two lines of one order) count once
+    baskets = sparse.csr_matrix(
+        (np.ones(len(lines), dtype=np.int32), (order_index, product_index)), shape=(total, len(product_ids)))
+    baskets.data[:] = 1
+    by_product = baskets.T.tocsr()
+    own_orders = np.asarray(by_product.sum(axis=1)).ravel()    # The diagonal of X^T X
+
+    db.execute(delete(ProductRecommendation))
+    db.execute(delete(ProductCooccurrence))
+    pairs = recommendations = 0
+    for lo in range(0, len(product_ids), PRODUCT_BLOCK):
+        block = (by_product[lo:lo + PRODUCT_BLOCK] @ baskets).tocsr()   # Rows lo.. of X^T X
+        block.sort_indices()
+        coo = block.tocoo()
+        a_ids, b_ids, counts = product_ids[coo.row + lo].tolist(), product_ids[coo.col].tolist(), coo.data.tolist()
+        for i in range(0, len(counts), INSERT_ROWS):
+            db.execute(insert(ProductCooccurrence), [
+                {"productId": a, "otherId": b, "orders": n}
+                for a, b, n in zip(a_ids[i:i + INSERT_ROWS], b_ids[i:i + INSERT_ROWS], counts[i:i + INSERT_ROWS])
+            ])
+        pairs += block.nnz
+
+        rows = []
+        for r in range(block.shape[0]):
+            row = lo + r
+            cols = block.indices[block.indptr[r]:block.indptr[r + 1]]
+            n = block.data[block.indptr[r]:block.indptr[r + 1]]
+            keep = (cols != row) & (n >= MIN_PAIR_ORDERS)
+            cols, n = cols[keep], n[keep]
+            # Most orders together first; ties by product id, as in fold_in
+            best = np.lexsort((product_ids[cols], -n))[:top_k]
+            rows += [
+                _recommendation(int(product_ids[row]), rank, int(product_ids[cols[j]]), int(n[j]),
+                                int(own_orders[row]), int(own_orders[cols[j]]), total, now)
+                for rank, j in enumerate(best, 1)
+            ]
+        for i in range(0, len(rows), INSERT_ROWS):
+            db.execute(insert(ProductRecommendation), rows[i:i + INSERT_ROWS])
+        recommendations += len(rows)
+
+    # Record exactly which orders were read, for fold_in: ids are handed out at flush but become
+    # visible at commit, so a checkout still open during the read can land below the highest id seen
+    db.execute(delete(RecommendationGap))
+    if total:
+        gaps = np.setdiff1d(np.arange(order_ids[0], order_ids[-1] + 1), order_ids, assume_unique=True).tolist()
+        for i in range(0, len(gaps), INSERT_ROWS):
+            db.execute(insert(RecommendationGap), [{"orderId": order_id} for order_id in gaps[i:i + INSERT_ROWS]])
+    db.execute(update(RecommendationState).where(RecommendationState.id == 1).values(
+        orders=total, rebuiltAt=now, updatedAt=now,
+        rebuiltFromOrderId=int(order_ids[0]) if total else 0,
+        rebuiltThroughOrderId=int(order_ids[-1]) if total else 0,
+    ))
+    db.commit()
+    return {
+        "orders": total,
+        "products": len(product_ids),
+        "pairs": pairs - len(product_ids),
+        "recommendations": recommendations,
+        "elapsedSeconds": round(time.perf_counter() - started, 2),
+    }
+
+
+if __name__ == "__main__":
+    # Nightly cron entry point: python -m services.recommendations
+    import json
+    import models  # noqa: F401  (registers every table)
+
+    session = SessionLocal()
+    try:
+        print(json.dumps(rebuild_recommendations(session), indent=2))
+    finally:
+        session.close()
@@ -0,0 +1,242 @@
+# backend/services/search.py
+import bisect
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from sqlalchemy import select, func, literal, literal_column, or_, case
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import Session, selectinload
+from models.category import Category
+from models.product import Product
+from services.cache import catalog_cache
+
+# Product search over productName, sku, supplierName and description.
+#
+# Postgres: full-text match on products.search_document (prefix terms, so "org app" finds "Organic Apples"),
+# plus pg_trgm word similarity on productName for typos and ILIKE substring on sku, all indexed.
+# SQLite / tests: the same semantics from an in-process n-gram inverted index, rebuilt whenever
+# the catalog cache's "products" namespace is invalidated (or its TTL passes).
+#
+# Ranking mirrors ts_rank's default field weights: name/sku (A) 1.0, supplier (C) 0.2, description (D) 0.1.
+
+WORD_SIMILARITY_THRESHOLD = 0.6  # pg_trgm's default for the <% operator
+FIELD_WEIGHTS = (("productName", 1.0), ("sku", 1.0), ("supplierName", 0.2), ("description", 0.1))
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: str):
+    return _WORD.findall((text or "").lower())
+
+
+def trigrams(text: str):
+    """
+    pg_trgm-style trigrams: each word is lowercased and padded with two spaces in front, one behind.
+    """
+    grams = set()
+    for word in tokenize(text):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# --- Postgres ----------------------------------------------------------------
+
+# Generated column created by models/product.py on Postgres only
+SEARCH_DOCUMENT = literal_column('products.search_document', TSVECTOR)
+
+
+def _pg_matches(q: str):
+    terms = tokenize(q)
+    tsquery = func.to_tsquery(literal_column("'english'::regconfig"), " & ".join(f"{t}:*" for t in terms))
+    exact_sku = case((func.lower(Product.sku) == q.lower(), 1.0), else_=0.0)
+    score = (func.ts_rank_cd(SEARCH_DOCUMENT, tsquery) + func.word_similarity(q, Product.productName) + exact_sku).label("score")
+    return (
+        select(Product.id, Product.categoryId, score)
+        .where(or_(
+            SEARCH_DOCUMENT.op("@@")(tsquery),
+            literal(q).op("<%")(Product.productName),
+            Product.sku.ilike(f"%{_escape_like(q)}%", escape="\\"),
+        ))
+        .cte("matches")
+    )
+
+
+def _pg_search(db: Session, q: str, category_id, limit: int, offset: int):
+    matches = _pg_matches(q)
+    facet_rows = db.execute(
+        select(matches.c.categoryId, Category.name, func.count().label("count"))
+        .outerjoin(Category, Category.id == matches.c.categoryId)
+        .group_by(matches.c.categoryId, Category.name)
+    ).all()
+    page = select(matches.c.id).order_by(matches.c.score.desc(), matches.c.id).limit(limit).offset(offset)
+    if category_id is not None:
+        page = page.where(matches.c.categoryId == category_id)
+    return [r.id for r in db.execute(page)], facet_rows
+
+
+def _pg_suggest(db: Session, q: str, limit: int):
+    prefix = func.lower(Product.productName).collate("C")
+    return db.execute(
+        select(Product.id, Product.productName, Product.sku)
+        .where(prefix.like(_escape_like(q.lower()) + "%", escape="\\"))
+        .order_by(prefix)
+        .limit(limit)
+    ).all()
+
+
+# --- In-process n-gram index (SQLite, tests) ---------------------------------
+
+class ProductSearchIndex:
+    """
+    Inverted indexes over the product catalog:
+      tokens   sorted distinct words, each -> {product_id: best field weight}   (prefix full-text)
+      grams    productName trigram -> product ids                               (typo tolerance)
+      names    sorted (lowercased productName, id)                              (autocomplete)
+    """
+    def __init__(self, rows):
+        postings = defaultdict(dict)
+        self.grams = defaultdict(set)
+        self.docs = {}
+        names = []
+        for row in rows:
+            self.docs[row.id] = (row.categoryId, row.productName, row.sku or "")
+            for field, weight in FIELD_WEIGHTS:
+                for token in tokenize(getattr(row, field)):
+                    if postings[token].get(row.id, 0) < weight:
+                        postings[token][row.id] = weight
+            for gram in trigrams(row.productName):
+                self.grams[gram].add(row.id)
+            names.append(((row.productName or "").lower(), row.id))
+        self.tokens = sorted(postings)
+        self.postings = postings
+        self.names = sorted(names)
+
+    def _prefix_postings(self, term: str):
+        # Union of every word starting with `term`, keeping each product's best weight
+        found = {}
+        i = bisect.bisect_left(self.tokens, term)
+        while i < len(self.tokens) and self.tokens[i].startswith(term):
+            for pid, weight in self.postings[self.tokens[i]].items():
+                if found.get(pid, 0) < weight:
+                    found[pid] = weight
+            i += 1
+        return found
+
+    def search(self, q: str):
+        """
+        Returns [(product_id, category_id, score)] for every match, best first.
+        """
+        scores = defaultdict(float)
+
+        terms = tokenize(q)
+        if terms:
+            hits = [self._prefix_postings(t) for t in terms]
+            for pid in set(hits[0]).intersection(*hits[1:]):
+                scores[pid] += sum(h[pid] for h in hits) / len(terms)
+
+        query_grams = trigrams(q)
+        if query_grams:
+            shared = Counter()
+            for gram in query_grams:
+                shared.update(self.grams.get(gram, ()))
+            for pid, count in shared.items():
+                similarity = count / len(query_grams)
+                if similarity >= WORD_SIMILARITY_THRESHOLD or pid in scores:
+                    scores[pid] += similarity
+
+        needle = q.lower()
+        for pid, (_, _, sku) in self.docs.items():
+            sku = sku.lower()
+            if needle in sku:
+                # Any SKU substring is a match; an exact SKU ranks first
+                scores[pid] += 1.0 if sku == needle else 0.0
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(pid, self.docs[pid][0], score) for pid, score in ranked]
+
+    def suggest(self, q: str, limit: int):
+        prefix = q.lower()
+        start = bisect.bisect_left(self.names, (prefix,))
+        out = []
+        for name, pid in self.names[start:start + limit]:
+            if not name.startswith(prefix):
+                break
+            out.append((pid, self.docs[pid][1], self.docs[pid][2]))
+        return out
+
+
+_index = None
+_index_state = None  # (catalog generation, expires at)
+_index_lock = threading.Lock()
+
+
+def get_search_index(db: Session) -> ProductSearchIndex:
+    global _index, _index_state
+    generation = catalog_cache.generation("products")
+    state = _index_state
+    if _index is not None and state[0] == generation and time.monotonic() < state[1]:
+        return _index
+    with _index_lock:
+        if _index is None or _index_state == state:
+            rows = db.execute(select(
+                Product.id, Product.categoryId, Product.productName, Product.sku, Product.supplierName, Product.description
+            ).execution_options(yield_per=5000))
+            _index = ProductSearchIndex(rows)
+            # Built inside the cache's settle window (possibly from a lagging replica): rebuilt once it closes
+            now = time.monotonic()
+            settled_at = catalog_cache.settled_at("products")
+            _index_state = (generation, settled_at if now < settled_at else now + catalog_cache.ttl)
+        return _index
+
+
+def _memory_search(db: Session, q: str, category_id, limit: int, offset: int):
+    matches = get_search_index(db).search(q)
+    counts = Counter(category_id for _, category_id, _ in matches)
+    names = dict(db.execute(select(Category.id, Category.name).where(Category.id.in_([c for c in counts if c is not None]))).all())
+    facet_rows = [(cid, names.get(cid), count) for cid, count in counts.items()]
+    if category_id is not None:
+        matches = [m for m in matches if m[1] == category_id]
+    return [pid for pid, _, _ in matches[offset:offset + limit]], facet_rows
+
+
+# --- Entry points ------------------------------------------------------------
+
+def search_products(db: Session, q: str, category_id=None, limit: int = 20, offset: int = 0) -> dict:
+    """
+    Ranked product search with category facets. Facets count every match for `q`; `category_id`
+    narrows only the returned page (and `total`), so the facet list stays stable while drilling in.
+    """
+    q = q.strip()
+    if not q:
+        return {"total": 0, "results": [], "facets": []}
+    postgres = db.get_bind().dialect.name == "postgresql"
+    ids, facet_rows = (_pg_search if postgres else _memory_search)(db, q, category_id, limit, offset)
+
+    facets = sorted(
+        ({"categoryId": cid, "name": name, "count": count} for cid, name, count in facet_rows),
+        key=lambda f: (-f["count"], f["categoryId"] or 0),
+    )
+    if category_id is None:
+        total = sum(f["count"] for f in facets)
+    else:
+        total = next((f["count"] for f in facets if f["categoryId"] == category_id), 0)
+
+    products = {p.id: p for p in db.query(Product).options(selectinload(Product.category)).filter(Product.id.in_(ids))} if ids else {}
+    return {"total": total, "results": [products[pid] for pid in ids if pid in products], "facets": facets}
+
+
+def suggest_products(db: Session, q: str, limit: int = 10):
+    """
+    Autocomplete: products whose name starts with `q`, alphabetically. Returns [(id, productName, sku)].
+    """
+    q = q.strip()
+    if not q:
+        return []
+    if db.get_bind().dialect.name == "postgresql":
+        return [tuple(r) for r in _pg_suggest(db, q, limit)]
+    return get_search_index(db).suggest(q, limit)
@@ -0,0 +1,129 @@
+# backend/services/stock.py
+from collections import defaultdict
+from datetime import datetime, timezone
+from sqlalchemy import select, update, insert, bindparam
+from sqlalchemy.orm import Session
+from models.product import Product
+from models.batch import StockBatch
+from models.transaction import StockTransaction
+
+
+class InsufficientStock(Exception):
+    """
+    Raised when the sellable (unexpired) stock of a product cannot cover a requested quantity.
+    """
+    def __init__(self, product_id, requested, available):
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+        super().__init__(f"Insufficient stock for product {product_id}. Requested {requested}, only {available} available.")
+
+
+def load_sellable_batches(db: Session, product_ids, lock: bool = True):
+    """
+    Loads the unexpired, non-empty batches of every product in `product_ids` (with the product's
+    default price) in ONE query, ordered First-Expiry-First-Out.
+
+    Returns (batches, default_prices):
+      batches        -> {product_id: [(batch_id, retailPrice, currentQuantity), ...]} in FEFO order
+      default_prices -> {product_id: defaultPrice}
+    Products with no sellable stock are absent from both.
+    """
+    now = datetime.now(timezone.utc)
+    stmt = (
+        select(
+            StockBatch.productId,
+            Product.defaultPrice,
+            StockBatch.id,
+            StockBatch.retailPrice,
+            StockBatch.currentQuantity,
+        )
+        .join(Product, Product.id == StockBatch.productId)
+        .where(
+            StockBatch.productId.in_(product_ids),
+            StockBatch.currentQuantity > 0,
+            StockBatch.expiryDate > now,
+        )
+        .order_by(StockBatch.productId, StockBatch.expiryDate, StockBatch.id)
+    )
+    if lock:
+        # Lock only the batch rows we are about to decrement, not the catalog rows
+        stmt = stmt.with_for_update(of=StockBatch)
+
+    batches = defaultdict(list)
+    default_prices = {}
+    for product_id, default_price, batch_id, retail_price, quantity in db.execute(stmt):
+        default_prices[product_id] = default_price
+        batches[product_id].append((batch_id, retail_price, quantity))
+    return batches, default_prices
+
+
+def allocate_fefo(product_id: int, requested: int, batches):
+    """
+    Splits `requested` units of a product across its `batches` (already in FEFO order).
+    Returns a list of (batch_id, retailPrice, quantity) slices.
+    """
+    slices = []
+    remaining = requested
+    for batch_id, retail_price, available in batches:
+        if remaining <= 0:
+            break
+        take = min(available, remaining)
+        slices.append((batch_id, retail_price, take))
+        remaining -= take
+
+    if remaining > 0:
+        raise InsufficientStock(product_id, requested, requested - remaining)
+    return slices
+
+
+def deduct_batches(db: Session, deductions):
+    """
+    Applies {batch_id: quantity} decrements in a single executemany UPDATE.
+    The batch rows must already be locked by `load_sellable_batches`.
+    """
+    if not deductions:
+        return
+    stmt = (
+        update(StockBatch.__table__)
+        .where(StockBatch.__table__.c.id == bindparam("b_id"))
+        .values(currentQuantity=StockBatch.__table__.c.currentQuantity - bindparam("b_qty"))
+    )
+    db.execute(stmt, [{"b_id": batch_id, "b_qty": qty} for batch_id, qty in deductions.items()])
+
+
+def log_transactions(db: Session, rows):
+    """
+    Bulk-inserts StockTransaction audit rows (list of dicts) in one statement.
+    """
+    if rows:
+        db.execute(insert(StockTransaction), rows)
+
+
+# How each transactionType moves StockBatch.currentQuantity (multiplier on the quantity)
+QUANTITY_EFFECT = {
+    'stock_in': 1,
+    'return': 1,
+    'adjustment': 1,  # Adjustment quantity handles both positive and negative direct additions
+    'sale': -1,
+}
+
+
+def apply_batch_delta(db: Session, batch_id: int, delta: int, guard: bool = False):
+    """
+    Atomically adds `delta` to a batch in one conditional UPDATE ... RETURNING, so parallel
+    tills never read-modify-write the same row. With `guard=True` the update only happens
+    while the result stays >= 0, which is what prevents overselling.
+
+    Returns the new currentQuantity, or None if the batch is missing / the guard rejected it.
+    """
+    table = StockBatch.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == batch_id)
+        .values(currentQuantity=table.c.currentQuantity + delta)
+        .returning(table.c.currentQuantity)
+    )
+    if guard:
+        stmt = stmt.where(table.c.currentQuantity + delta >= 0)
+    return db.execute(stmt).scalar_one_or_none()
@@ -0,0 +1,188 @@
+# backend/services/stock_levels.py
+from datetime import datetime, timezone
+from sqlalchemy import select, delete, insert, func, case, and_, literal, event, union_all
+from sqlalchemy.orm import Session
+from database import dialect_insert
+from models.product import Product
+from models.batch import StockBatch
+from models.transaction import StockTransaction
+from models.stock_level import ProductStockLevel
+from models.ledger_archive import BatchLedgerMonth
+
+# Keeps the product_stock_levels projection in step with stock_batches.
+#
+# Every code path that mutates a batch calls refresh_stock_levels() inside its own transaction,
+# so the summary commits (or rolls back) together with the stock change. Only the touched
+# products are recomputed, from their own batches, via the (productId, expiryDate) index.
+#
+# In-process consumers (e.g. the alert engine) subscribe with on_stock_committed() and are told
+# which products / batches changed once the transaction has committed; rolled back work is dropped.
+
+LEVEL_COLUMNS = ["productId", "totalOnHand", "earliestExpiry", "liveBatches", "updatedAt"]
+_TOUCHED = "stock_touched"
+_subscribers = []
+
+
+def on_stock_committed(callback):
+    """
+    Registers `callback(product_ids, batch_ids)`, called after every commit that refreshed stock levels.
+    """
+    _subscribers.append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_touched(session):
+    touched = session.info.pop(_TOUCHED, None)
+    if touched:
+        for callback in _subscribers:
+            callback(*touched)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_touched(session):
+    session.info.pop(_TOUCHED, None)
+
+
+def _live_batch_filter(now: datetime):
+    return and_(StockBatch.currentQuantity > 0, StockBatch.expiryDate > now)
+
+
+def refresh_stock_levels(db: Session, product_ids=None, batch_ids=None):
+    """
+    Recomputes the summary rows of the given products (and/or the products owning the given
+    batches) in one upsert. Does not commit: the caller's transaction owns the change.
+    """
+    if product_ids:
+        product_ids = list(product_ids)
+        targets = select(Product.id).where(Product.id.in_(product_ids))
+    elif batch_ids:
+        batch_ids = list(batch_ids)
+        targets = select(StockBatch.productId).where(StockBatch.id.in_(batch_ids))
+    else:
+        return
+    touched = db.info.setdefault(_TOUCHED, (set(), set()))
+    touched[0].update(product_ids or ())
+    touched[1].update(batch_ids or ())
+
+    # Lock the existing summary rows first. A concurrent writer on a sibling batch then waits for
+    # us to commit, and its aggregate (a new statement, so a new snapshot) sees our change too.
+    db.execute(
+        select(ProductStockLevel.productId)
+        .where(ProductStockLevel.productId.in_(targets))
+        .order_by(ProductStockLevel.productId)
+        .with_for_update()
+    )
+
+    now = datetime.now(timezone.utc)
+    summary = (
+        select(
+            Product.id,
+            func.coalesce(func.sum(StockBatch.currentQuantity), 0),
+            func.min(StockBatch.expiryDate),
+            func.count(StockBatch.id),
+            literal(now),
+        )
+        .select_from(Product)
+        .outerjoin(StockBatch, and_(StockBatch.productId == Product.id, _live_batch_filter(now)))
+        .where(Product.id.in_(targets))
+        .group_by(Product.id)
+    )
+    stmt = dialect_insert(db, ProductStockLevel).from_select(LEVEL_COLUMNS, summary)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ProductStockLevel.productId],
+        set_={c: stmt.excluded[c] for c in LEVEL_COLUMNS[1:]},
+    )
+    db.execute(stmt)
+
+
+def live_levels(db: Session, product_ids):
+    """
+    Computes current levels straight from stock_batches, without writing.
+    Used to patch summary rows whose earliest batch has expired since they were written.
+    """
+    now = datetime.now(timezone.utc)
+    rows = db.execute(
+        select(
+            StockBatch.productId,
+            func.sum(StockBatch.currentQuantity),
+            func.min(StockBatch.expiryDate),
+            func.count(StockBatch.id),
+        )
+        .where(StockBatch.productId.in_(list(product_ids)), _live_batch_filter(now))
+        .group_by(StockBatch.productId)
+    ).all()
+    levels = {pid: (0, None, 0) for pid in product_ids}
+    levels.update({pid: (total, earliest, count) for pid, total, earliest, count in rows})
+    return levels
+
+
+def reconcile_stock_levels(db: Session, max_reported: int = 100):
+    """
+    Rebuilds the whole projection from the StockTransaction ledger (not from currentQuantity)
+    and commits. Batches whose ledger total disagrees with currentQuantity are reported as drift.
+    Archived months count through their per-batch totals (services/ledger_archive.py).
+    """
+    now = datetime.now(timezone.utc)
+    signed = case((StockTransaction.transactionType == "sale", -StockTransaction.quantity), else_=StockTransaction.quantity)
+    entries = union_all(
+        select(StockTransaction.batchId.label("batchId"), signed.label("quantity")),
+        select(BatchLedgerMonth.batchId, BatchLedgerMonth.netQuantity),
+    ).subquery("entries")
+    ledger = (
+        select(entries.c.batchId, func.sum(entries.c.quantity).label("onHand"))
+        .group_by(entries.c.batchId)
+        .subquery("ledger")
+    )
+
+    on_hand = func.coalesce(ledger.c.onHand, 0)
+    drift = db.execute(
+        select(StockBatch.id, StockBatch.currentQuantity, on_hand)
+        .outerjoin(ledger, ledger.c.batchId == StockBatch.id)
+        .where(on_hand != StockBatch.currentQuantity)
+        .order_by(StockBatch.id)
+    ).all()
+
+    live = (
+        select(StockBatch.productId, StockBatch.expiryDate, ledger.c.onHand)
+        .join(ledger, ledger.c.batchId == StockBatch.id)
+        .where(ledger.c.onHand > 0, StockBatch.expiryDate > now)
+        .subquery("live")
+    )
+    summary = (
+        select(
+            Product.id,
+            func.coalesce(func.sum(live.c.onHand), 0),
+            func.min(live.c.expiryDate),
+            func.count(live.c.productId),
+            literal(now),
+        )
+        .select_from(Product)
+        .outerjoin(live, live.c.productId == Product.id)
+        .group_by(Product.id)
+    )
+
+    db.execute(delete(ProductStockLevel))
+    rebuilt = db.execute(insert(ProductStockLevel).from_select(LEVEL_COLUMNS, summary)).rowcount
+    db.commit()
+
+    return {
+        "products": rebuilt,
+        "driftedBatches": len(drift),
+        "drift": [
+            {"batchId": batch_id, "currentQuantity": current, "ledgerQuantity": ledger_qty}
+            for batch_id, current, ledger_qty in drift[:max_reported]
+        ],
+    }
+
+
+if __name__ == "__main__":
+    # Cron entry point: python -m services.stock_levels
+    import json
+    import models  # noqa: F401  (registers every table)
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        print(json.dumps(reconcile_stock_levels(session), indent=2, default=str))
+    finally:
+        session.close()
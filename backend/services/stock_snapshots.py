@@ -0,0 +1,192 @@
+# backend/services/stock_snapshots.py
+import os
+from datetime import datetime, time, timedelta, timezone
+from sqlalchemy import select, insert, delete, func, case, literal, union_all
+from sqlalchemy.orm import Session
+from database import dialect_insert
+from models.batch import StockBatch
+from models.ledger_archive import StockTransactionArchive, BatchLedgerMonth
+from models.stock_snapshot import StockSnapshot, StockSnapshotBatch
+from services.ledger_archive import month_start, naive_utc, with_archive
+
+# Point-in-time stock levels from the StockTransaction ledger.
+#
+# A snapshot folds the ledger up to an instant into one row per batch. Stock as of any instant is
+# the newest snapshot at or before it plus the ledger rows stamped after the snapshot, so the cost
+# of an as-of read grows with the events since the last snapshot, not with the ledger's history.
+# Each snapshot is built from the previous one plus the rows since, in a single INSERT ... SELECT,
+# so nothing is read into this process however long the ledger is.
+#
+# Ledger rows are not immutable: update_transaction edits them in place. record_ledger_edit()
+# carries such an edit into every snapshot taken after the row, so snapshots always agree with a
+# full replay of the ledger as it now stands. Edits and take_snapshot() both lock the newest
+# snapshot, so one always sees the other's result.
+#
+# Snapshots are taken STOCK_SNAPSHOT_SETTLE_SECONDS in the past: a ledger row is stamped before
+# its transaction commits, and a snapshot must not be taken over rows that are still in flight.
+
+STOCK_SNAPSHOT_SETTLE_SECONDS = int(os.getenv("STOCK_SNAPSHOT_SETTLE_SECONDS", "300"))
+STOCK_SNAPSHOT_RETAIN_DAYS = int(os.getenv("STOCK_SNAPSHOT_RETAIN_DAYS", "35"))
+
+
+def ledger_effect(transaction_type: str, quantity: int) -> int:
+    """
+    Signed movement of one ledger row, as the reconcile job and the archive totals count it.
+    """
+    return -quantity if transaction_type == "sale" else quantity
+
+
+def _signed(ledger):
+    return case((ledger.transactionType == "sale", -ledger.quantity), else_=ledger.quantity)
+
+
+def _newest():
+    return select(StockSnapshot).order_by(StockSnapshot.takenAt.desc()).limit(1)
+
+
+def _movements(until: datetime, base: StockSnapshot = None, batches=None):
+    """
+    (batchId, quantity) rows whose per-batch sums are the on-hand quantities as of `until`: the
+    rows of snapshot `base` plus the ledger rows after it or, with no snapshot, the archived
+    months' totals plus every ledger row not folded into them. `batches` (a select of batch
+    ids) narrows all of it to those batches.
+    """
+    open_month = datetime.combine(month_start(until), time())
+
+    def ledger_rows(ledger):
+        query = (
+            select(ledger.batchId.label("batchId"), _signed(ledger).label("quantity"))
+            .where(ledger.timestamp <= until, ledger.batchId.is_not(None))
+        )
+        if base is not None:
+            query = query.where(ledger.timestamp > base.takenAt)
+        elif ledger is StockTransactionArchive:
+            # Archived months before the one `until` falls in count through their totals
+            query = query.where(ledger.timestamp >= open_month)
+        if batches is not None:
+            query = query.where(ledger.batchId.in_(batches))
+        return query
+
+    replayed = with_archive("stock_transactions", ledger_rows, base.takenAt if base is not None else None)
+    if base is not None:
+        start = select(StockSnapshotBatch.batchId, StockSnapshotBatch.quantity).where(StockSnapshotBatch.snapshotId == base.id)
+        if batches is not None:
+            start = start.where(StockSnapshotBatch.batchId.in_(batches))
+    else:
+        start = select(BatchLedgerMonth.batchId, BatchLedgerMonth.netQuantity.label("quantity")).where(BatchLedgerMonth.month < open_month.date())
+        if batches is not None:
+            start = start.where(BatchLedgerMonth.batchId.in_(batches))
+    return union_all(start, select(replayed.c.batchId, replayed.c.quantity)).subquery("movements")
+
+
+def take_snapshot(db: Session, taken_at: datetime = None) -> dict:
+    """
+    Snapshots every batch's on-hand quantity as of `taken_at` (default: the settle interval ago)
+    from the newest snapshot plus the ledger since, and commits. `taken_at` has to be later than
+    the newest snapshot.
+    """
+    now = datetime.now(timezone.utc)
+    taken_at = naive_utc(taken_at or now - timedelta(seconds=STOCK_SNAPSHOT_SETTLE_SECONDS))
+    newest = db.scalars(_newest().with_for_update()).first()
+    if newest is not None and newest.takenAt >= taken_at:
+        raise ValueError(f"A snapshot as of {newest.takenAt.isoformat()} already exists; snapshots can only move forward")
+
+    snapshot = StockSnapshot(takenAt=taken_at, createdAt=now, batches=0)
+    db.add(snapshot)
+    db.flush()
+    movements = _movements(taken_at, newest)
+    total = func.sum(movements.c.quantity)
+    snapshot.batches = db.execute(insert(StockSnapshotBatch).from_select(
+        ["snapshotId", "batchId", "quantity"],
+        select(literal(snapshot.id), movements.c.batchId, total).group_by(movements.c.batchId).having(total != 0),
+    )).rowcount
+    db.commit()
+    return {
+        "snapshotId": snapshot.id,
+        "takenAt": taken_at,
+        "batches": snapshot.batches,
+        "replayedFrom": newest.takenAt if newest is not None else None,
+    }
+
+
+def record_ledger_edit(db: Session, batch_id: int, stamped: datetime, delta: int):
+    """
+    Adds `delta` (the change of a ledger row's signed effect) to `batch_id` in every snapshot
+    taken at or after the row's timestamp `stamped`. Does not commit: the edit's transaction
+    owns the change.
+    """
+    if not delta:
+        return
+    # Waits for a snapshot being taken; the statement below then sees it
+    if db.scalars(_newest().with_for_update()).first() is None:
+        return
+    stmt = dialect_insert(db, StockSnapshotBatch).from_select(
+        ["snapshotId", "batchId", "quantity"],
+        select(StockSnapshot.id, literal(batch_id), literal(delta)).where(StockSnapshot.takenAt >= naive_utc(stamped)),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[StockSnapshotBatch.snapshotId, StockSnapshotBatch.batchId],
+        set_={"quantity": StockSnapshotBatch.quantity + stmt.excluded.quantity},
+    )
+    db.execute(stmt)
+
+
+def levels_as_of(db: Session, as_of: datetime, product_ids):
+    """
+    Sellable stock of each product in `product_ids` as of `as_of`: batches with a positive
+    quantity that had not expired by then. Returns ({product_id: (total, earliest_expiry,
+    batch_count)}, snapshot the replay started from or None).
+    """
+    as_of = naive_utc(as_of)
+    base = db.scalars(_newest().where(StockSnapshot.takenAt <= as_of)).first()
+    movements = _movements(as_of, base, select(StockBatch.id).where(StockBatch.productId.in_(list(product_ids))))
+    on_hand = (
+        select(movements.c.batchId, func.sum(movements.c.quantity).label("onHand"))
+        .group_by(movements.c.batchId)
+        .subquery("on_hand")
+    )
+    rows = db.execute(
+        select(StockBatch.productId, func.sum(on_hand.c.onHand), func.min(StockBatch.expiryDate), func.count(StockBatch.id))
+        .join(on_hand, on_hand.c.batchId == StockBatch.id)
+        .where(on_hand.c.onHand > 0, StockBatch.expiryDate > as_of)
+        .group_by(StockBatch.productId)
+    ).all()
+    levels = {pid: (0, None, 0) for pid in product_ids}
+    levels.update({pid: (total, earliest, count) for pid, total, earliest, count in rows})
+    return levels, base
+
+
+def prune_snapshots(db: Session, now: datetime = None) -> int:
+    """
+    Deletes snapshots older than STOCK_SNAPSHOT_RETAIN_DAYS except the first of each month, so
+    an old instant still replays at most about a month of ledger. Commits; returns how many went.
+    """
+    cutoff = naive_utc(now or datetime.now(timezone.utc)) - timedelta(days=STOCK_SNAPSHOT_RETAIN_DAYS)
+    old = db.execute(
+        select(StockSnapshot.id, StockSnapshot.takenAt).where(StockSnapshot.takenAt < cutoff).order_by(StockSnapshot.takenAt)
+    ).all()
+    months, doomed = set(), []
+    for snapshot_id, taken_at in old:
+        if month_start(taken_at) in months:
+            doomed.append(snapshot_id)
+        months.add(month_start(taken_at))
+    if doomed:
+        db.execute(delete(StockSnapshotBatch).where(StockSnapshotBatch.snapshotId.in_(doomed)))
+        db.execute(delete(StockSnapshot).where(StockSnapshot.id.in_(doomed)))
+        db.commit()
+    return len(doomed)
+
+
+if __name__ == "__main__":
+    # Cron entry point (e.g. hourly): python -m services.stock_snapshots
+    import json
+    import models  # noqa: F401  (registers every table)
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        report = take_snapshot(session)
+        report["pruned"] = prune_snapshots(session)
+        print(json.dumps(report, indent=2, default=str))
+    finally:
+        session.close()
@@ -0,0 +1,91 @@
+# backend/tests/conftest.py
+import importlib.util
+import itertools
+import os
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi.testclient import TestClient
+
+# Before anything imports database.py: strict loading, and a throwaway SQLite file unless
+# DATABASE_URL points at a scratch database
+os.environ.setdefault("DB_RAISE_ON_LAZY_LOAD", "true")
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "tests.db"))
+os.environ.setdefault("RECOMMENDATIONS_MIN_PAIR_ORDERS", "1")  # A few checkouts are enough for recommendations
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# schemas.py is created in each checkout from Schemas/schemas.txt (first line is a placeholder
+# note); a bare clone (CI) has only the template, so import the template itself
+if importlib.util.find_spec("schemas") is None:
+    with open(os.path.join(BACKEND, "Schemas", "schemas.txt"), encoding="utf-8") as template:
+        source = "".join(template.readlines()[1:])
+    schemas = importlib.util.module_from_spec(importlib.util.spec_from_loader("schemas", loader=None))
+    exec(compile(source, os.path.join(BACKEND, "Schemas", "schemas.txt"), "exec"), schemas.__dict__)
+    sys.modules["schemas"] = schemas
+
+# Likewise models/user_management.py (kept out of git, see models/__init__.py): without it the
+# user_id foreign keys of carts and orders have no users table to point at
+import models  # noqa: E402,F401
+from database import Base  # noqa: E402
+
+if "users" not in Base.metadata.tables:
+    from sqlalchemy import Column, Integer, Table
+
+    Table("users", Base.metadata, Column("user_id", Integer, primary_key=True))
+
+
+@pytest.fixture(scope="session")
+def client():
+    # One migrated database for the whole run; tests keep apart by creating their own rows
+    from database import engine
+    from main import app
+    from migrations import upgrade
+
+    upgrade(engine)
+    with TestClient(app) as client:
+        yield client
+
+
+_user_ids = itertools.count(1000)
+
+
+@pytest.fixture
+def user_id(client):
+    """
+    A user of its own (so a cart of its own): get_current_user answers with it for this test.
+    """
+    from main import app
+    from APIs.cart import get_current_user
+
+    user_id = next(_user_ids)
+    app.dependency_overrides[get_current_user] = lambda: user_id
+    yield user_id
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+@pytest.fixture
+def make_product(client):
+    """
+    Creates a product in a new category, with one batch per (quantity, retailPrice, days to
+    expiry) given, through the API. Returns (product_id, [batch_id, ...]).
+    """
+    def make(*batches, defaultPrice="0.00"):
+        tag = uuid.uuid4().hex[:8]
+        category_id = client.post("/api/categories/", json={"name": f"Test {tag}"}).json()["id"]
+        product_id = client.post("/api/products/", json={
+            "productName": f"Test item {tag}", "sku": f"T-{tag}", "unit": "pcs", "supplierName": "Test",
+            "categoryId": category_id, "defaultPrice": defaultPrice,
+        }).json()["id"]
+        batch_ids = []
+        for quantity, price, days in batches:
+            response = client.post("/api/batches/", json={
+                "productId": product_id, "batchNumber": f"{tag}-{len(batch_ids)}", "currentQuantity": quantity,
+                "retailPrice": price, "expiryDate": (datetime.now(timezone.utc) + timedelta(days=days)).isoformat(),
+            })
+            response.raise_for_status()
+            batch_ids.append(response.json()["id"])
+        return product_id, batch_ids
+    return make
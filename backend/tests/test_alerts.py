@@ -0,0 +1,29 @@
+# backend/tests/test_alerts.py
+"""
+Reorder thresholds as another worker's alert engine sees them: it learns of changes only by
+polling the updatedAt columns (services/alerts.py), never through this process's commits.
+"""
+from database import SessionLocal
+from services.alerts import AlertEngine
+
+
+def test_other_workers_poll_threshold_changes(client, make_product):
+    product_id, _ = make_product((5, "1.00", 10))
+    db = SessionLocal()
+    try:
+        worker = AlertEngine()
+        worker.rebuild(db)
+        assert worker.threshold(product_id) is None
+
+        client.put(f"/api/alerts/thresholds/{product_id}", json={"reorderPoint": 10, "reorderQuantity": 20}).raise_for_status()
+        worker.catch_up(db, poll=True)
+        assert worker.threshold(product_id) == (10, 20, "threshold")
+        assert product_id in [a["productId"] for a in worker.reorder_alerts(0, 5000)[1]]
+
+        # A delete leaves no row behind to poll; it must still reach the other worker
+        assert client.delete(f"/api/alerts/thresholds/{product_id}").status_code == 204
+        worker.catch_up(db, poll=True)
+        assert worker.threshold(product_id) is None
+        assert product_id not in [a["productId"] for a in worker.reorder_alerts(0, 5000)[1]]
+    finally:
+        db.close()
@@ -0,0 +1,83 @@
+# backend/tests/test_batches.py
+"""
+Stock batch creation: the single-batch endpoint and the bulk delivery import.
+"""
+import json
+from datetime import datetime, timedelta, timezone
+
+
+def _ledger(client, batch_id):
+    return [(t["transactionType"], t["quantity"]) for t in client.get("/api/transactions/", params={"batchId": batch_id}).json()]
+
+
+def test_create_batch_logs_the_delivery(client, make_product):
+    product_id, (batch_id,) = make_product((12, "1.50", 10))
+    assert _ledger(client, batch_id) == [("stock_in", 12)]
+
+
+def test_create_batch_twice_is_a_conflict(client, make_product):
+    product_id, (batch_id,) = make_product((5, "1.00", 10))
+    batch_number = client.get("/api/batches/", params={"productId": product_id}).json()[0]["batchNumber"]
+
+    response = client.post("/api/batches/", json={
+        "productId": product_id, "batchNumber": batch_number, "currentQuantity": 3, "retailPrice": "1.00",
+        "expiryDate": (datetime.now(timezone.utc) + timedelta(days=10)).isoformat(),
+    })
+    assert response.status_code == 409
+    assert batch_number in response.json()["detail"]
+    # Nothing of the rejected delivery was written
+    assert client.get("/api/batches/", params={"productId": product_id}).json()[0]["currentQuantity"] == 5
+    assert _ledger(client, batch_id) == [("stock_in", 5)]
+
+
+def _bulk(client, rows, **params):
+    body = "\n".join(json.dumps(row) for row in rows)
+    return client.post("/api/batches/bulk", content=body, params=params, headers={"Content-Type": "application/x-ndjson"})
+
+
+def test_bulk_delivery_adds_to_an_existing_batch(client, make_product):
+    product_id, (batch_id,) = make_product((5, "1.00", 10))
+    batch_number = client.get("/api/batches/", params={"productId": product_id}).json()[0]["batchNumber"]
+    expiry = (datetime.now(timezone.utc) + timedelta(days=10)).isoformat()
+
+    report = _bulk(client, [
+        {"productId": product_id, "batchNumber": batch_number, "currentQuantity": 4, "retailPrice": "1.20", "expiryDate": expiry},
+    ]).json()
+    assert (report["upserted"], report["failed"]) == (1, 0)
+    batch = client.get("/api/batches/", params={"productId": product_id}).json()[0]
+    assert (batch["currentQuantity"], batch["retailPrice"]) == (9, "1.20")
+    assert _ledger(client, batch_id) == [("stock_in", 4), ("stock_in", 5)]
+
+
+def test_bulk_delivery_listing_a_batch_twice_keeps_both_rows(client, make_product):
+    product_id, _ = make_product()
+    expiry = (datetime.now(timezone.utc) + timedelta(days=10)).isoformat()
+    row = {"productId": product_id, "batchNumber": "TWICE", "retailPrice": "2.00", "expiryDate": expiry}
+
+    report = _bulk(client, [dict(row, currentQuantity=10), dict(row, currentQuantity=7)]).json()
+    assert (report["processed"], report["upserted"], report["failed"]) == (2, 2, 0)
+    (batch,) = client.get("/api/batches/", params={"productId": product_id}).json()
+    assert batch["currentQuantity"] == 17
+    assert sorted(_ledger(client, batch["id"])) == [("stock_in", 7), ("stock_in", 10)]
+
+
+def test_bulk_delivery_reports_lines_that_are_not_utf8(client, make_product):
+    product_id, _ = make_product()
+    expiry = (datetime.now(timezone.utc) + timedelta(days=10)).isoformat()
+    body = (
+        "productId,batchNumber,currentQuantity,retailPrice,expiryDate,manufactureDate\n"
+        f'{product_id},UTF-1,3,1.00,{expiry},\n'
+        f'{product_id},"UTF-\xff\n2",4,1.00,{expiry},\n'  # A bad byte inside a field that spans two lines
+        f'{product_id},UTF-3,5,1.00,{expiry},\n'
+    ).encode("latin-1")
+    report = client.post("/api/batches/bulk", content=body, headers={"Content-Type": "text/csv"}).json()
+
+    assert (report["processed"], report["upserted"]) == (3, 2)
+    assert report["errors"] == [{"line": 3, "error": "Not valid UTF-8"}]
+    batches = client.get("/api/batches/", params={"productId": product_id}).json()
+    assert sorted((b["batchNumber"], b["currentQuantity"]) for b in batches) == [("UTF-1", 3), ("UTF-3", 5)]
+
+
+def test_bulk_delivery_refuses_a_header_that_is_not_utf8(client):
+    response = client.post("/api/batches/bulk", content=b"product\xffId,batchNumber\n1,X\n", headers={"Content-Type": "text/csv"})
+    assert response.status_code == 400
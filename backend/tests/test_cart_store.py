@@ -0,0 +1,72 @@
+# backend/tests/test_cart_store.py
+"""
+Cart store backends: write-behind flushes and what checkout takes off a cart. The Redis store
+runs against TEST_REDIS_URL when it is set (e.g. redis://localhost:6379/15, flushed first).
+"""
+import itertools
+import os
+import pytest
+from database import SessionLocal
+from services.cart_store import InMemoryCartStore, RedisCartStore, load_cart
+
+_user_ids = itertools.count(70000)
+
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request, client):
+    if request.param == "memory":
+        return InMemoryCartStore()
+    url = os.getenv("TEST_REDIS_URL")
+    if not url:
+        pytest.skip("TEST_REDIS_URL not set")
+    store = RedisCartStore(url)
+    store._redis.flushdb()
+    return store
+
+
+@pytest.fixture
+def db():
+    db = SessionLocal()
+    yield db
+    db.close()
+
+
+def test_flush_writes_the_cart_through(store, db):
+    user_id = next(_user_ids)
+    store.add(db, user_id, 1, 2)
+    store.add(db, user_id, 1, 1)
+    store.set(db, user_id, 2, 4)
+    assert load_cart(db, user_id)[1] == {}
+
+    assert store.flush(db, [user_id]) == 1
+    assert load_cart(db, user_id)[1] == {1: 3, 2: 4}
+    assert store.flush(db, [user_id]) == 0  # Nothing changed since
+
+
+def test_consume_drops_a_cart_checkout_took_whole(store, db):
+    user_id = next(_user_ids)
+    store.add(db, user_id, 1, 2)
+    store.flush(db, [user_id])
+
+    store.consume(user_id, {1: 2})
+    assert store.flush(db) == 0
+    assert store.get(db, user_id)[1] == load_cart(db, user_id)[1] == {1: 2}  # Read through again
+
+
+def test_consume_keeps_edits_made_after_the_flush(store, db):
+    user_id = next(_user_ids)
+    store.add(db, user_id, 1, 2)
+    store.add(db, user_id, 2, 1)
+    store.flush(db, [user_id])
+    # Edits landing while checkout runs on the flushed cart
+    store.add(db, user_id, 1, 3)
+    store.add(db, user_id, 3, 1)
+    store.set(db, user_id, 2, 0)
+
+    store.consume(user_id, {1: 2, 2: 1})
+    cart_id, items = store.get(db, user_id)
+    assert (cart_id, items) == (None, {1: 3, 3: 1})
+    # Still dirty: the write-behind recreates the cart the checkout deleted
+    assert store.flush(db) == 1
+    assert store.get(db, user_id)[0] is not None
+    assert load_cart(db, user_id)[1] == {1: 3, 3: 1}
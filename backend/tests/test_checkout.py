@@ -0,0 +1,104 @@
+# backend/tests/test_checkout.py
+"""
+Checkout: First-Expiry-First-Out allocation, per-batch pricing, stock deductions and the sale
+ledger, and the baskets it refuses.
+"""
+import pytest
+
+
+def _batches(client, product_id):
+    return {b["id"]: b["currentQuantity"] for b in client.get("/api/batches/", params={"productId": product_id}).json()}
+
+
+def _sales(client, batch_id):
+    return [
+        (t["quantity"], t["recordedBy"])
+        for t in client.get("/api/transactions/", params={"batchId": batch_id, "transactionType": "sale"}).json()
+    ]
+
+
+def _fill_cart(client, items):
+    for product_id, quantity in items.items():
+        client.post("/cart/add", json={"product_id": product_id, "quantity": quantity}).raise_for_status()
+
+
+def test_checkout_sells_first_expiry_first_out_at_each_batch_price(client, user_id, make_product):
+    product_id, (late, soon, expired, middle) = make_product(
+        (3, "2.00", 30), (2, "1.50", 5), (10, "0.50", -1), (4, "1.50", 10)
+    )
+    other_id, (other_batch,) = make_product((5, "3.25", 20))
+    _fill_cart(client, {product_id: 7, other_id: 1})
+
+    response = client.post("/orders/checkout")
+    assert response.status_code == 200
+    order_id = response.json()["order_id"]
+
+    order = client.get(f"/orders/{order_id}").json()
+    # The two 1.50 batches, sold one after the other, make one line
+    assert sorted((line["productId"], line["quantity"], line["priceAtPurchase"]) for line in order["lines"]) == sorted([
+        (product_id, 6, 1.50), (product_id, 1, 2.00), (other_id, 1, 3.25),
+    ])
+    assert order["totalAmount"] == pytest.approx(6 * 1.50 + 2.00 + 3.25)
+    assert (order["status"], order["deliveryMethod"], order["delivery"]) == ("Paid", "Store Pickup", None)
+
+    # The expired batch is never sold from, however cheap
+    assert _batches(client, product_id) == {late: 2, soon: 0, expired: 10, middle: 0}
+    assert _batches(client, other_id) == {other_batch: 4}
+    recorded_by = f"Checkout (Order #{order_id})"
+    assert [_sales(client, b) for b in (soon, middle, late, expired)] == [
+        [(2, recorded_by)], [(4, recorded_by)], [(1, recorded_by)], [],
+    ]
+    assert client.get("/cart/").json()["items"] == []
+
+
+def test_checkout_with_a_delivery_address_is_a_home_delivery(client, user_id, make_product):
+    product_id, _ = make_product((5, "1.00", 10))
+    _fill_cart(client, {product_id: 1})
+
+    order_id = client.post("/orders/checkout", json={"customerName": "Ann", "deliveryAddress": "1 Main St"}).json()["order_id"]
+    order = client.get(f"/orders/{order_id}").json()
+    assert order["deliveryMethod"] == "Home Delivery"
+    assert order["delivery"] == {"customerName": "Ann", "deliveryAddress": "1 Main St", "driverName": None}
+
+
+def _assert_refused(client, product_id, stock):
+    # Nothing was sold and the cart is left as it was
+    assert _batches(client, product_id) == stock
+    assert all(_sales(client, batch_id) == [] for batch_id in stock)
+    assert client.get("/cart/").json()["items"] != []
+    assert client.get("/orders/").json() == []
+
+
+def test_checkout_refuses_more_than_the_sellable_stock(client, user_id, make_product):
+    product_id, (batch_id, expired) = make_product((3, "1.00", 10), (5, "1.00", -1))
+    _fill_cart(client, {product_id: 4})
+
+    response = client.post("/orders/checkout")
+    assert response.status_code == 400
+    assert response.json()["detail"] == f"Insufficient stock for product {product_id}. Requested 4, only 3 available."
+    _assert_refused(client, product_id, {batch_id: 3, expired: 5})
+
+
+def test_checkout_refuses_unknown_products(client, user_id, make_product):
+    product_id, (batch_id,) = make_product((3, "1.00", 10))
+    _fill_cart(client, {product_id: 1, 999999: 1})
+
+    response = client.post("/orders/checkout")
+    assert (response.status_code, response.json()["detail"]) == (400, "Products not found: [999999]")
+    _assert_refused(client, product_id, {batch_id: 3})
+
+
+def test_checkout_refuses_non_positive_quantities(client, user_id, make_product):
+    product_id, (batch_id,) = make_product((3, "1.00", 10))
+    other_id, (other_batch,) = make_product((3, "1.00", 10))
+    _fill_cart(client, {product_id: 1, other_id: 1})
+    client.post("/cart/add", json={"product_id": other_id, "quantity": -1})
+
+    response = client.post("/orders/checkout")
+    assert (response.status_code, response.json()["detail"]) == (400, f"Quantities must be positive for products: [{other_id}]")
+    _assert_refused(client, product_id, {batch_id: 3})
+
+
+def test_checkout_refuses_an_empty_cart(client, user_id):
+    response = client.post("/orders/checkout")
+    assert (response.status_code, response.json()["detail"]) == (400, "Cart is empty")
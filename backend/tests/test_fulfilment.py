@@ -0,0 +1,185 @@
+# backend/tests/test_fulfilment.py
+"""
+Order status transitions and the fulfilment claim queue (services/fulfilment.py).
+
+The queue hands out the oldest waiting orders of the whole database, so each test inserts its
+orders further back in time than any before it (they are first in line) and closes them when it
+is done, so they are not handed to later tests.
+"""
+import itertools
+import threading
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import insert, select, update
+from database import SessionLocal, engine
+from models.orders import Order, OrderDelivery
+from services import fulfilment
+from services.fulfilment import TRANSITIONS, STATUSES, claim_orders, transition_orders
+from services.order_summaries import refresh_order_summaries
+
+_minutes_back = itertools.count(1)
+
+
+@pytest.fixture
+def db(client):
+    db = SessionLocal()
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def make_orders(client):
+    """
+    make_orders(db, count, status=..., delivery=True, driver=None) inserts `count` orders at
+    `status` (home deliveries unless delivery=False), committed and older than every order
+    inserted before. Returns their ids, oldest first.
+    """
+    created = []
+
+    def make(db, count, status=fulfilment.PAID, delivery=True, driver=None):
+        start = datetime(2000, 1, 1) - timedelta(minutes=next(_minutes_back) * 1000)
+        order_ids = [
+            db.execute(insert(Order).values(
+                user_id=1, total_amount=1.0, current_status=status, created_at=start + timedelta(seconds=i),
+                delivery_method="Home Delivery" if delivery else "Store Pickup",
+            ).returning(Order.id)).scalar_one()
+            for i in range(count)
+        ]
+        if delivery:
+            db.execute(insert(OrderDelivery), [
+                {"order_id": order_id, "customer_name": "Ann", "delivery_address": "1 Main St", "driver_name": driver}
+                for order_id in order_ids
+            ])
+        refresh_order_summaries(db, order_ids)
+        db.commit()
+        created.extend(order_ids)
+        return order_ids
+
+    yield make
+    # Out of the queue: whatever a test left waiting would be the next claim of every other test
+    db = SessionLocal()
+    try:
+        db.execute(update(Order).where(Order.id.in_(created)).values(
+            current_status=fulfilment.DELIVERED, claimed_by=None, claimed_at=None,
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _status(db, order_id):
+    return db.scalar(select(Order.current_status).where(Order.id == order_id))
+
+
+@pytest.mark.parametrize("from_status", STATUSES)
+@pytest.mark.parametrize("to_status", STATUSES)
+def test_transition_table(db, make_orders, from_status, to_status):
+    (order_id,) = make_orders(db, 1, status=from_status, driver="Dan")
+
+    moved, rejected = transition_orders(db, [order_id], to_status)
+    db.commit()
+    if to_status in TRANSITIONS[from_status]:
+        assert (moved, rejected) == ([order_id], {})
+        assert _status(db, order_id) == to_status
+    else:
+        assert (moved, rejected) == ([], {order_id: f"Cannot move from '{from_status}' to '{to_status}'"})
+        assert _status(db, order_id) == from_status
+
+
+def test_bulk_status_moves_what_it_can_and_says_why_not(client, db, make_orders):
+    (paid,) = make_orders(db, 1)
+    (pickup,) = make_orders(db, 1, status=fulfilment.PACKED, delivery=False)
+    (no_driver,) = make_orders(db, 1, status=fulfilment.PACKED)
+    (with_driver,) = make_orders(db, 1, status=fulfilment.PACKED, driver="Dan")
+
+    result = client.post("/orders/status", json={
+        "orderIds": [paid, pickup, no_driver, with_driver, 999999], "status": "Out for Delivery",
+    }).json()
+    assert result["updated"] == [with_driver]
+    assert {r["orderId"]: r["reason"] for r in result["rejected"]} == {
+        paid: "Cannot move from 'Paid' to 'Out for Delivery'",
+        pickup: "Needs a delivery address and a driver",
+        no_driver: "Needs a delivery address and a driver",
+        999999: "Order not found",
+    }
+
+    # Naming the driver in the request assigns it
+    result = client.post("/orders/status", json={"orderIds": [no_driver], "status": "Out for Delivery", "driverName": "Eve"}).json()
+    assert (result["updated"], result["rejected"]) == ([no_driver], [])
+    assert db.scalar(select(OrderDelivery.driver_name).where(OrderDelivery.order_id == no_driver)) == "Eve"
+
+
+def test_single_status_change_answers_404_and_409(client, db, make_orders):
+    (order_id,) = make_orders(db, 1)
+    assert client.post("/orders/999999/status", json={"status": "Packed"}).status_code == 404
+    response = client.post(f"/orders/{order_id}/status", json={"status": "Delivered"})
+    assert (response.status_code, response.json()["detail"]) == (409, "Cannot move from 'Paid' to 'Delivered'")
+    response = client.post(f"/orders/{order_id}/status", json={"status": "Packed"})
+    assert (response.status_code, response.json()["status"]) == (200, "Packed")
+    assert [h["status"] for h in response.json()["history"]] == ["Packed"]
+
+
+def test_claims_take_the_oldest_orders_once(client, db, make_orders):
+    order_ids = make_orders(db, 3)
+
+    first = client.post("/orders/fulfilment/claim", json={"worker": "packer-1", "stage": "pack", "limit": 2}).json()
+    second = client.post("/orders/fulfilment/claim", json={"worker": "packer-2", "stage": "pack", "limit": 2}).json()
+    assert [o["orderId"] for o in first] == order_ids[:2]
+    assert [o["orderId"] for o in second][:1] == order_ids[2:]
+
+
+def test_concurrent_claims_never_share_an_order(client, make_orders):
+    setup = SessionLocal()
+    try:
+        order_ids = make_orders(setup, 20)
+    finally:
+        setup.close()
+    claimed, errors = {}, []
+    start = threading.Barrier(4)
+
+    def claim(worker):
+        db = SessionLocal()
+        try:
+            start.wait()
+            claimed[worker] = claim_orders(db, worker, "pack", 5)
+            db.commit()
+        except Exception as e:  # Reported below; a thread's exception would be lost
+            errors.append(e)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=claim, args=(f"packer-{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    every_claim = [order_id for ids in claimed.values() for order_id in ids]
+    assert every_claim and len(every_claim) == len(set(every_claim))
+    if engine.dialect.name == "postgresql":
+        # SKIP LOCKED: each worker passes over the rows the others hold and takes the next ones
+        assert sorted(every_claim) == order_ids
+    else:
+        # No row locks: a worker that lost the race for its candidates may come back short
+        assert set(every_claim) <= set(order_ids)
+
+
+def test_a_claim_expires(db, make_orders, monkeypatch):
+    (order_id,) = make_orders(db, 1, status=fulfilment.PACKED)
+    assert claim_orders(db, "driver-1", "deliver", 1) == [order_id]
+    db.commit()
+    assert db.scalar(select(OrderDelivery.driver_name).where(OrderDelivery.order_id == order_id)) == "driver-1"
+
+    # While the lease runs, nobody else gets the order or may move it on
+    assert order_id not in claim_orders(db, "driver-2", "deliver", 1)
+    moved, rejected = transition_orders(db, [order_id], fulfilment.OUT_FOR_DELIVERY, worker="driver-2")
+    assert (moved, rejected) == ([], {order_id: "Claimed by driver-1"})
+    db.rollback()
+
+    monkeypatch.setattr(fulfilment, "CLAIM_SECONDS", 0)
+    assert claim_orders(db, "driver-2", "deliver", 1) == [order_id]
+    moved, rejected = transition_orders(db, [order_id], fulfilment.OUT_FOR_DELIVERY, worker="driver-2")
+    db.commit()
+    assert (moved, rejected) == ([order_id], {})
+    assert db.scalar(select(OrderDelivery.driver_name).where(OrderDelivery.order_id == order_id)) == "driver-2"
@@ -0,0 +1,100 @@
+# backend/tests/test_idempotency.py
+"""
+Idempotency-Key on checkout and ledger entries: a retry replays the first response without
+writing again, a key reused for another request is refused, and an expired key starts over.
+"""
+import uuid
+import pytest
+from sqlalchemy import func, select
+from database import SessionLocal
+from models.idempotency import IdempotencyKey
+from services import idempotency
+
+
+def _order_count(client):
+    return len(client.get("/orders/").json())
+
+
+def _key():
+    return uuid.uuid4().hex
+
+
+def test_repeated_checkout_replays_the_first_order(client, user_id, make_product):
+    product_id, _ = make_product((10, "1.00", 10))
+    client.post("/cart/add", json={"product_id": product_id, "quantity": 2})
+    headers = {"Idempotency-Key": _key()}
+
+    first = client.post("/orders/checkout", headers=headers)
+    assert first.status_code == 200 and "Idempotent-Replayed" not in first.headers
+    # The shopper fills a new cart; the retry still must not turn it into an order
+    client.post("/cart/add", json={"product_id": product_id, "quantity": 3})
+    retry = client.post("/orders/checkout", headers=headers)
+
+    assert (retry.status_code, retry.content) == (200, first.content)
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert _order_count(client) == 1
+    assert client.get("/api/batches/", params={"productId": product_id}).json()[0]["currentQuantity"] == 8
+    assert client.get("/cart/").json()["items"] == [{"product_id": product_id, "quantity": 3}]
+
+
+def test_repeated_ledger_entry_moves_the_stock_once(client, make_product):
+    product_id, (batch_id,) = make_product((10, "1.00", 10))
+    entry = {"batchId": batch_id, "transactionType": "sale", "quantity": 4, "recordedBy": "Till 1"}
+    headers = {"Idempotency-Key": _key()}
+
+    first = client.post("/api/transactions/", json=entry, headers=headers)
+    retry = client.post("/api/transactions/", json=entry, headers=headers)
+    assert (first.status_code, retry.status_code) == (201, 201)
+    assert retry.json() == first.json()
+    assert client.get("/api/batches/", params={"productId": product_id}).json()[0]["currentQuantity"] == 6
+    assert len(client.get("/api/transactions/", params={"batchId": batch_id, "transactionType": "sale"}).json()) == 1
+
+
+def test_key_reused_for_a_different_request_is_refused(client, user_id, make_product):
+    product_id, (batch_id,) = make_product((10, "1.00", 10))
+    headers = {"Idempotency-Key": _key()}
+    client.post("/api/transactions/", json={"batchId": batch_id, "transactionType": "sale", "quantity": 1, "recordedBy": "Till 1"}, headers=headers)
+
+    response = client.post("/api/transactions/", json={"batchId": batch_id, "transactionType": "sale", "quantity": 2, "recordedBy": "Till 1"}, headers=headers)
+    assert response.status_code == 422
+    assert client.get("/api/batches/", params={"productId": product_id}).json()[0]["currentQuantity"] == 9
+
+    # Same for checkout: a home delivery is not a retry of a store pickup
+    client.post("/cart/add", json={"product_id": product_id, "quantity": 1})
+    headers = {"Idempotency-Key": _key()}
+    assert client.post("/orders/checkout", headers=headers).status_code == 200
+    client.post("/cart/add", json={"product_id": product_id, "quantity": 1})
+    response = client.post("/orders/checkout", json={"customerName": "Ann", "deliveryAddress": "1 Main St"}, headers=headers)
+    assert response.status_code == 422
+    assert _order_count(client) == 1
+
+
+@pytest.mark.parametrize("key", ["", "k" * (idempotency.MAX_KEY_LENGTH + 1)])
+def test_key_length_is_checked(client, make_product, key):
+    product_id, (batch_id,) = make_product((10, "1.00", 10))
+    entry = {"batchId": batch_id, "transactionType": "sale", "quantity": 1, "recordedBy": "Till 1"}
+    assert client.post("/api/transactions/", json=entry, headers={"Idempotency-Key": key}).status_code == 400
+
+
+def test_expired_key_runs_again_and_is_purged(client, user_id, make_product, monkeypatch):
+    # Records (and their cached copies) expire as soon as they are written
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_TTL_SECONDS", -1)
+    monkeypatch.setattr(idempotency.results, "ttl", 0)
+    product_id, _ = make_product((10, "1.00", 10))
+    key = _key()
+
+    order_ids = []
+    for body in (None, {"customerName": "Ann", "deliveryAddress": "1 Main St"}):
+        client.post("/cart/add", json={"product_id": product_id, "quantity": 1})
+        response = client.post("/orders/checkout", json=body, headers={"Idempotency-Key": key})
+        assert response.status_code == 200 and "Idempotent-Replayed" not in response.headers
+        order_ids.append(response.json()["order_id"])
+    assert order_ids[0] != order_ids[1]
+    assert _order_count(client) == 2
+
+    db = SessionLocal()
+    try:
+        assert idempotency.purge_expired(db) >= 1
+        assert db.scalar(select(func.count()).select_from(IdempotencyKey).where(IdempotencyKey.key == key)) == 0
+    finally:
+        db.close()
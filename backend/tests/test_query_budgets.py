@@ -0,0 +1,258 @@
+# backend/tests/test_query_budgets.py
+"""
+Per-route SQL statement budgets: the N+1 guard for every route in APIs/.
+
+Seeds a small catalog through the API itself (several categories, products in each, batches,
+ledger rows, a cart and an order), so a relationship loaded once per row shows up as extra
+statements. Every route is then called with strict loading on (DB_RAISE_ON_LAZY_LOAD, so a
+relationship that was not eager-loaded fails the request outright) and the X-SQL-Statements
+header of each call is checked against ROUTE_BUDGETS.
+
+Fails when a route goes over its budget, answers with a 5xx, is not exercised, or has no budget
+at all (new routes must add one here).
+
+Run from backend/ (defaults to a throwaway SQLite file, see conftest.py; point DATABASE_URL at an
+empty scratch database to check Postgres, with user 1 present for the cart/checkout routes):
+    python -m pytest tests/test_query_budgets.py
+"""
+import json
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi.testclient import TestClient
+from database import engine
+from main import app, userManagement
+from migrations import upgrade
+from services.query_stats import STATEMENT_HEADER
+from services.recommendations import flush_pending
+
+# Maximum statements per call. Set from measured counts on SQLite and Postgres; raising one
+# should come with a reason (a new feature), never with an N+1 loop.
+ROUTE_BUDGETS = {
+    ("GET", "/"): 0,
+    ("GET", "/test-db"): 1,
+    ("GET", "/metrics"): 0,
+    ("GET", "/health/live"): 0,
+    ("GET", "/health/ready"): 1,
+    # Catalog
+    ("GET", "/api/categories/"): 1,
+    ("POST", "/api/categories/"): 2,
+    ("GET", "/api/products/"): 1,
+    ("POST", "/api/products/"): 2,
+    ("PUT", "/api/products/{product_id}"): 3,
+    ("DELETE", "/api/products/{product_id}"): 5,
+    ("GET", "/api/products/search"): 4,
+    ("GET", "/api/products/suggest"): 1,
+    ("GET", "/api/products/{product_id}/recommendations"): 2,      # 1 unless the product has none (existence check)
+    ("POST", "/api/products/bulk"): 2,
+    ("GET", "/api/cache/catalog"): 0,
+    ("DELETE", "/api/cache/catalog"): 0,
+    # Stock
+    ("GET", "/api/batches/"): 1,
+    ("POST", "/api/batches/"): 5,
+    ("POST", "/api/batches/bulk"): 5,
+    ("GET", "/api/transactions/"): 1,
+    ("POST", "/api/transactions/"): 7,      # +2 with an Idempotency-Key (lookup, stored response)
+    ("PUT", "/api/transactions/{transaction_id}"): 8,      # +2 carrying the edit into stock snapshots
+    ("DELETE", "/api/transactions/{transaction_id}"): 0,
+    ("GET", "/api/stock-levels"): 3,      # 1 without ?as_of= (snapshot lookup, replay)
+    ("POST", "/api/stock-levels/reconcile"): 3,
+    ("POST", "/api/stock-levels/snapshots"): 4,
+    # Cart and orders (checkout includes flushing the write-behind cart, the order summary and
+    # the idempotency record)
+    ("POST", "/cart/add"): 1,
+    ("GET", "/cart/"): 1,
+    ("PUT", "/cart/update"): 1,
+    ("DELETE", "/cart/remove/{product_id}"): 1,
+    ("POST", "/orders/checkout"): 21,
+    ("GET", "/orders/"): 1,
+    ("GET", "/orders/{order_id}"): 1,
+    # Status changes: update, history, driver, summary refresh (4 reads + upsert), rejections
+    ("POST", "/orders/{order_id}/status"): 9,
+    ("POST", "/orders/status"): 9,
+    ("POST", "/orders/fulfilment/claim"): 9,
+    # Forecasting and alerts (batch jobs: counts grow with shards / chunks, not rows)
+    ("GET", "/api/forecast"): 1,
+    ("GET", "/api/forecast/{product_id}"): 2,
+    ("POST", "/api/forecast/refresh"): 4,
+    ("GET", "/api/alerts"): 3,
+    ("GET", "/api/alerts/reorder"): 1,
+    ("GET", "/api/alerts/expiring"): 1,
+    ("GET", "/api/alerts/markdowns"): 1,
+    ("GET", "/api/alerts/thresholds/{product_id}"): 2,
+    ("PUT", "/api/alerts/thresholds/{product_id}"): 5,
+    ("DELETE", "/api/alerts/thresholds/{product_id}"): 6,
+    ("POST", "/api/alerts/rebuild"): 3,
+}
+
+CATEGORIES = 5
+PRODUCTS_PER_CATEGORY = 4
+
+
+class Recorder:
+    def __init__(self, client: TestClient):
+        self.client = client
+        self.calls = {}     # (method, route) -> [statement counts]
+        self.failures = []
+
+    def __call__(self, method: str, route: str, url: str = None, **kwargs):
+        response = self.client.request(method, url or route, **kwargs)
+        self.calls.setdefault((method, route), []).append(int(response.headers.get(STATEMENT_HEADER, -1)))
+        if response.status_code >= 500:
+            self.failures.append(f"{method} {url or route} -> {response.status_code}")
+        return response
+
+
+def ndjson(rows):
+    return {"content": "\n".join(json.dumps(r) for r in rows), "headers": {"Content-Type": "application/x-ndjson"}}
+
+
+def exercise(call: Recorder):
+    expiry = datetime.now(timezone.utc) + timedelta(days=3)
+
+    # Catalog: products spread over several categories
+    category_ids = [call("POST", "/api/categories/", json={"name": f"QC category {i}"}).json()["id"] for i in range(CATEGORIES)]
+    product_ids = [
+        call("POST", "/api/products/", json={
+            "productName": f"QC item {c}-{i}", "sku": f"QC-{c}-{i}", "unit": "pcs", "supplierName": "QC",
+            "categoryId": category_id,
+        }).json()["id"]
+        for c, category_id in enumerate(category_ids) for i in range(PRODUCTS_PER_CATEGORY)
+    ]
+    call("POST", "/api/products/bulk", **ndjson([
+        {"productName": f"QC bulk {i}", "sku": f"QC-B-{i}", "unit": "kg", "supplierName": "QC", "categoryId": category_ids[i % CATEGORIES]}
+        for i in range(20)
+    ]))
+    call("PUT", "/api/products/{product_id}", f"/api/products/{product_ids[0]}", json={
+        "productName": "QC item renamed", "sku": "QC-0-0", "unit": "pcs", "supplierName": "QC", "categoryId": category_ids[1],
+    })
+
+    # Stock: a batch per product, more by bulk delivery, ledger rows
+    batch_ids = [
+        call("POST", "/api/batches/", json={
+            "productId": pid, "batchNumber": f"QC-{pid}", "currentQuantity": 50, "retailPrice": "2.50", "expiryDate": expiry.isoformat(),
+        }).json()["id"]
+        for pid in product_ids
+    ]
+    call("POST", "/api/batches/bulk", **ndjson([
+        {"productId": pid, "batchNumber": f"QC-{pid}-2", "currentQuantity": 20, "retailPrice": "2.00", "expiryDate": (expiry + timedelta(days=30)).isoformat()}
+        for pid in product_ids
+    ]))
+    transaction_ids = [
+        call("POST", "/api/transactions/", json={"batchId": batch_id, "transactionType": "sale", "quantity": 2, "recordedBy": "QC till"}).json()["id"]
+        for batch_id in batch_ids[:5]
+    ]
+    # A till retrying a sale with its Idempotency-Key: the replay runs no SQL
+    for _ in range(2):
+        call("POST", "/api/transactions/", json={"batchId": batch_ids[5], "transactionType": "sale", "quantity": 1, "recordedBy": "QC till"},
+             headers={"Idempotency-Key": "qc-sale-1"})
+    call("POST", "/api/stock-levels/snapshots")
+    call("PUT", "/api/transactions/{transaction_id}", f"/api/transactions/{transaction_ids[0]}", json={"quantity": 3})
+    call("DELETE", "/api/transactions/{transaction_id}", f"/api/transactions/{transaction_ids[0]}")
+
+    # Catalog and stock reads: first read of a page misses the cache, the second may hit it
+    for _ in range(2):
+        call("GET", "/api/categories/")
+        call("GET", "/api/products/")
+    call("GET", "/api/products/", params={"categoryId": category_ids[0]})
+    call("GET", "/api/batches/")
+    call("GET", "/api/batches/", params={"productId": product_ids[0]})
+    call("GET", "/api/transactions/")
+    call("GET", "/api/stock-levels")
+    call("GET", "/api/stock-levels", params={"as_of": datetime.now(timezone.utc).isoformat()})
+    call("POST", "/api/stock-levels/reconcile")
+    call("GET", "/api/products/search", params={"q": "qc item"})
+    call("GET", "/api/products/suggest", params={"q": "qc"})
+    call("GET", "/api/cache/catalog")
+    call("DELETE", "/api/cache/catalog")
+
+    # Cart and checkout
+    for pid in product_ids[:3]:
+        call("POST", "/cart/add", json={"product_id": pid, "quantity": 2})
+    call("GET", "/cart/")
+    call("PUT", "/cart/update", json={"product_id": product_ids[0], "quantity": 4})
+    call("DELETE", "/cart/remove/{product_id}", f"/cart/remove/{product_ids[2]}")
+    order_id = call("POST", "/orders/checkout", headers={"Idempotency-Key": "qc-checkout-1"}).json()["order_id"]
+    call("POST", "/orders/checkout", headers={"Idempotency-Key": "qc-checkout-1"})
+    call("GET", "/orders/")
+    call("GET", "/orders/", params={"status": "Paid", "limit": 1})
+    call("GET", "/orders/{order_id}", f"/orders/{order_id}")
+
+    # Recommendations from that order (folded in now rather than by the background cycle)
+    flush_pending()
+    for pid in (product_ids[0], product_ids[-1]):
+        call("GET", "/api/products/{product_id}/recommendations", f"/api/products/{pid}/recommendations")
+
+    # Fulfilment: more orders (home deliveries), packed in bulk, claimed by a driver, delivered
+    for pid in product_ids[3:6]:
+        call("POST", "/cart/add", json={"product_id": pid, "quantity": 1})
+        call("POST", "/orders/checkout", json={"customerName": "QC", "deliveryAddress": "1 QC Street"})
+    packed = [o["orderId"] for o in call("POST", "/orders/fulfilment/claim", json={"worker": "QC packer", "stage": "pack", "limit": 10}).json()]
+    call("POST", "/orders/status", json={"orderIds": packed + [order_id], "status": "Packed", "worker": "QC packer"})
+    delivering = [o["orderId"] for o in call("POST", "/orders/fulfilment/claim", json={"worker": "QC driver", "stage": "deliver", "limit": 10}).json()]
+    call("POST", "/orders/{order_id}/status", f"/orders/{order_id}/status", json={"status": "Delivered"})
+    for delivery_id in delivering:
+        call("POST", "/orders/{order_id}/status", f"/orders/{delivery_id}/status", json={"status": "Out for Delivery", "worker": "QC driver"})
+    call("POST", "/orders/status", json={"orderIds": delivering + [order_id], "status": "Delivered"})
+
+    # Forecasting and alerts
+    call("POST", "/api/forecast/refresh", params={"wait": "true"})
+    call("GET", "/api/forecast")
+    call("GET", "/api/forecast/{product_id}", f"/api/forecast/{product_ids[0]}")
+    call("GET", "/api/alerts")
+    call("PUT", "/api/alerts/thresholds/{product_id}", f"/api/alerts/thresholds/{product_ids[1]}", json={"reorderPoint": 100, "reorderQuantity": 20})
+    call("GET", "/api/alerts/thresholds/{product_id}", f"/api/alerts/thresholds/{product_ids[1]}")
+    call("GET", "/api/alerts/reorder")
+    call("GET", "/api/alerts/expiring")
+    call("GET", "/api/alerts/markdowns")
+    call("DELETE", "/api/alerts/thresholds/{product_id}", f"/api/alerts/thresholds/{product_ids[1]}")
+    call("POST", "/api/alerts/rebuild")
+
+    # A product without batches can be deleted
+    spare = call("POST", "/api/products/", json={
+        "productName": "QC spare", "sku": "QC-SPARE", "unit": "pcs", "supplierName": "QC", "categoryId": category_ids[0],
+    }).json()["id"]
+    call("DELETE", "/api/products/{product_id}", f"/api/products/{spare}")
+
+    call("GET", "/")
+    call("GET", "/test-db")
+    call("GET", "/metrics")
+    call("GET", "/health/live")
+    call("GET", "/health/ready")
+
+
+@pytest.fixture(scope="module")
+def recorded():
+    upgrade(engine)
+    with TestClient(app) as client:
+        call = Recorder(client)
+        exercise(call)
+    return call
+
+
+def served_routes():
+    routes = {(method.upper(), path) for path, ops in app.openapi()["paths"].items() for method in ops}
+    # Routes of the untracked user-management module (see main.py) are not budgeted here
+    if userManagement is not None:
+        routes -= {(method, route.path) for route in userManagement.router.routes for method in route.methods}
+    return routes
+
+
+def test_every_route_has_a_budget():
+    assert sorted(served_routes() - ROUTE_BUDGETS.keys()) == []
+
+
+def test_every_budget_is_a_route():
+    assert sorted(ROUTE_BUDGETS.keys() - served_routes()) == []
+
+
+def test_no_server_errors(recorded):
+    assert recorded.failures == []
+
+
+@pytest.mark.parametrize("method, path", sorted(ROUTE_BUDGETS, key=lambda route: (route[1], route[0])))
+def test_route_within_budget(recorded, method, path):
+    counts = recorded.calls.get((method, path))
+    assert counts, f"{method} {path} is not exercised"
+    assert min(counts) >= 0, f"{method} {path} answered without {STATEMENT_HEADER}"
+    budget = ROUTE_BUDGETS[method, path]
+    assert max(counts) <= budget, f"{method} {path}: {max(counts)} statements, budget {budget} ({engine.dialect.name})"
@@ -0,0 +1,32 @@
+# backend/tests/test_recommendations.py
+"""
+Fold-ins after a rebuild (services/recommendations.py): an order the rebuild read is not counted
+twice, and one it did not read is counted even when its id is below the highest id it saw.
+"""
+from sqlalchemy import update
+from database import SessionLocal
+from models.orders import Order
+from services.recommendations import fold_in, rebuild_recommendations
+
+
+def test_fold_in_counts_exactly_the_orders_the_rebuild_missed(client, user_id, make_product):
+    product_ids = [make_product((10, "1.00", 10))[0] for _ in range(2)]
+    order_ids = []
+    for _ in range(3):
+        for product_id in product_ids:
+            client.post("/cart/add", json={"product_id": product_id, "quantity": 1}).raise_for_status()
+        order_ids.append(client.post("/orders/checkout").json()["order_id"])
+    first, unread, last = order_ids
+
+    db = SessionLocal()
+    try:
+        # Stands in for a checkout still uncommitted while the rebuild read: it does not see the
+        # middle order, but does see one with a higher id
+        db.execute(update(Order).where(Order.id == unread).values(current_status="Abort"))
+        db.commit()
+        rebuild_recommendations(db)
+
+        assert fold_in(db, [(first, product_ids), (last, product_ids)]) == {"orders": 0, "products": 0}
+        assert fold_in(db, [(first, product_ids), (unread, product_ids), (last + 1, product_ids)]) == {"orders": 2, "products": 2}
+    finally:
+        db.close()
@@ -0,0 +1,5 @@
+#!/bin/sh
+# Lets db-replica (docker-compose.prod.yml) stream from this server. Like every script in
+# docker-entrypoint-initdb.d it only runs when the data volume is initialised: on an existing
+# volume, add the line to pg_hba.conf by hand and reload.
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
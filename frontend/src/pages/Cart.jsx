@@ -4,6 +4,7 @@ import React, { useState, useEffect } from 'react';
 function Cart() {
   const [cartItems, setCartItems] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [suggestions, setSuggestions] = useState([]);
 
   // This runs automatically when the page loads
   useEffect(() => {
@@ -17,12 +18,47 @@ function Cart() {
       const data = await response.json();
       setCartItems(data.items || []);
       setLoading(false);
+      fetchSuggestions(data.items || []);
     } catch (error) {
       console.error("Error fetching cart:", error);
       setLoading(false);
     }
   };
 
+  // "Frequently bought together": each cart product's top partners, best first, minus what is already in the cart
+  const fetchSuggestions = async (items) => {
+    const inCart = new Set(items.map(item => item.product_id));
+    try {
+      const lists = await Promise.all(items.map(item =>
+        fetch(`http://localhost:8000/api/products/${item.product_id}/recommendations?limit=3`)
+          .then(response => response.ok ? response.json() : [])
+      ));
+      const merged = new Map();
+      lists.flat().forEach(product => {
+        if (inCart.has(product.productId)) return;
+        const seen = merged.get(product.productId);
+        if (!seen || seen.orders < product.orders) merged.set(product.productId, product);
+      });
+      setSuggestions([...merged.values()].sort((a, b) => b.orders - a.orders).slice(0, 4));
+    } catch (error) {
+      console.error("Error fetching suggestions:", error);
+    }
+  };
+
+  const handleAddSuggestion = async (productId) => {
+    try {
+      // Calls your POST /cart/add endpoint, then reloads the cart (and with it the suggestions)
+      await fetch('http://localhost:8000/cart/add', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ product_id: productId, quantity: 1 })
+      });
+      fetchCart();
+    } catch (error) {
+      console.error("Failed to add to cart:", error);
+    }
+  };
+
   const handleCheckout = async () => {
     try {
       // Calls your POST /orders/checkout endpoint
@@ -34,6 +70,7 @@ function Cart() {
       if (response.ok) {
         alert("Success! " + data.message + " Order ID: " + data.order_id);
         setCartItems([]); // Empty the cart on the screen
+        setSuggestions([]);
       } else {
         alert("Checkout failed: " + data.detail);
       }
@@ -71,6 +108,26 @@ function Cart() {
           >
             💳 Pay & Checkout
           </button>
+
+          {suggestions.length > 0 && (
+            <div style={{ marginTop: '30px' }}>
+              <h3>Frequently bought together</h3>
+              <div style={{ display: 'flex', gap: '20px', flexWrap: 'wrap' }}>
+                {suggestions.map(product => (
+                  <div key={product.productId} style={{ border: '1px solid #ccc', padding: '15px', borderRadius: '8px', textAlign: 'center' }}>
+                    <h4 style={{ margin: '0 0 8px' }}>{product.productName}</h4>
+                    {product.defaultPrice != null && <p>Rs. {product.defaultPrice.toFixed(2)}</p>}
+                    <button
+                      onClick={() => handleAddSuggestion(product.productId)}
+                      style={{ backgroundColor: '#4CAF50', color: 'white', padding: '8px', border: 'none', borderRadius: '5px', cursor: 'pointer' }}
+                    >
+                      Add to Cart
+                    </button>
+                  </div>
+                ))}
+              </div>
+            </div>
+          )}
         </div>
       )}
     </div>